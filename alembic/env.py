@@ -1,4 +1,5 @@
 import asyncio
+import re
 from logging.config import fileConfig
 
 from alembic import context
@@ -24,6 +25,13 @@ fileConfig(config.config_file_name)  # type: ignore
 
 target_metadata = Base.metadata
 
+# Monthly partitions are created and dropped by `app/services/partitions.py`, not by migrations
+PARTITION_NAME = re.compile(r"^inter_user_payment_(\d{4}_\d{2}|default)$")
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    return not (type_ == "table" and reflected and PARTITION_NAME.match(name))
+
 
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
@@ -55,6 +63,7 @@ def run_migrations_offline():
         dialect_opts={"paramstyle": "named"},
         compare_type=True,
         compare_server_default=True,
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -63,7 +72,10 @@ def run_migrations_offline():
 
 def do_run_migrations(connection):
     context.configure(
-        connection=connection, target_metadata=target_metadata, compare_type=True
+        connection=connection,
+        target_metadata=target_metadata,
+        compare_type=True,
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -0,0 +1,138 @@
+"""User balance ledger
+
+Revision ID: c41f7a9e02b6
+Revises: 8e5a2f0c9d14
+Create Date: 2026-10-18 13:05:31.402977
+
+"""
+import sqlalchemy as sa
+import sqlalchemy_utils
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c41f7a9e02b6"
+down_revision = "8e5a2f0c9d14"
+branch_labels = None
+depends_on = None
+
+APPLY_DELTA = """
+    INSERT INTO user_balance AS balance (from_user_id, to_user_id, currency, amount)
+    SELECT delta.from_user_id, delta.to_user_id, payment.currency, SUM(delta.sign * payment.sum::numeric(20, 4))
+    FROM ({rows}) AS delta
+    JOIN payment ON payment.id = delta.payment_id
+    WHERE NOT delta.completed AND delta.from_user_id IS NOT NULL AND delta.to_user_id IS NOT NULL
+    GROUP BY delta.from_user_id, delta.to_user_id, payment.currency
+    HAVING SUM(delta.sign * payment.sum::numeric(20, 4)) <> 0
+    ON CONFLICT (from_user_id, to_user_id, currency) DO UPDATE SET amount = balance.amount + EXCLUDED.amount;
+"""
+NEW_ROWS = "SELECT from_user_id, to_user_id, payment_id, completed, 1 AS sign FROM new_rows"
+OLD_ROWS = "SELECT from_user_id, to_user_id, payment_id, completed, -1 AS sign FROM old_rows"
+
+FUNCTIONS = {
+    "user_balance_on_inter_user_payment_insert": APPLY_DELTA.format(rows=NEW_ROWS),
+    "user_balance_on_inter_user_payment_update": APPLY_DELTA.format(rows=f"{OLD_ROWS} UNION ALL {NEW_ROWS}"),
+    "user_balance_on_inter_user_payment_delete": APPLY_DELTA.format(rows=OLD_ROWS),
+    "user_balance_on_payment_update": """
+    INSERT INTO user_balance AS balance (from_user_id, to_user_id, currency, amount)
+    SELECT inter_user_payment.from_user_id, inter_user_payment.to_user_id, delta.currency, SUM(delta.amount)
+    FROM (
+        SELECT id, currency, -sum::numeric(20, 4) AS amount FROM old_rows
+        UNION ALL
+        SELECT id, currency, sum::numeric(20, 4) AS amount FROM new_rows
+    ) AS delta
+    JOIN inter_user_payment ON inter_user_payment.payment_id = delta.id
+    WHERE NOT inter_user_payment.completed
+        AND inter_user_payment.from_user_id IS NOT NULL
+        AND inter_user_payment.to_user_id IS NOT NULL
+    GROUP BY inter_user_payment.from_user_id, inter_user_payment.to_user_id, delta.currency
+    HAVING SUM(delta.amount) <> 0
+    ON CONFLICT (from_user_id, to_user_id, currency) DO UPDATE SET amount = balance.amount + EXCLUDED.amount;
+""",
+}
+
+# Rows removed by `ON DELETE CASCADE` from `payment` are settled here: once the payment row is gone
+# the `inter_user_payment` delete trigger can no longer see its sum and skips them.
+PAYMENT_DELETE_FUNCTION = """
+CREATE FUNCTION user_balance_on_payment_delete() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO user_balance AS balance (from_user_id, to_user_id, currency, amount)
+    SELECT from_user_id, to_user_id, OLD.currency, -COUNT(*) * OLD.sum::numeric(20, 4)
+    FROM inter_user_payment
+    WHERE payment_id = OLD.id AND NOT completed AND from_user_id IS NOT NULL AND to_user_id IS NOT NULL
+    GROUP BY from_user_id, to_user_id
+    ON CONFLICT (from_user_id, to_user_id, currency) DO UPDATE SET amount = balance.amount + EXCLUDED.amount;
+    RETURN OLD;
+END
+$$;
+"""
+
+TRIGGERS = (
+    ("inter_user_payment", "INSERT", "NEW TABLE AS new_rows", "user_balance_on_inter_user_payment_insert"),
+    (
+        "inter_user_payment",
+        "UPDATE",
+        "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+        "user_balance_on_inter_user_payment_update",
+    ),
+    ("inter_user_payment", "DELETE", "OLD TABLE AS old_rows", "user_balance_on_inter_user_payment_delete"),
+    ("payment", "UPDATE", "OLD TABLE AS old_rows NEW TABLE AS new_rows", "user_balance_on_payment_update"),
+)
+
+BACKFILL = """
+INSERT INTO user_balance (from_user_id, to_user_id, currency, amount)
+SELECT inter_user_payment.from_user_id, inter_user_payment.to_user_id, payment.currency,
+    SUM(payment.sum::numeric(20, 4))
+FROM inter_user_payment
+JOIN payment ON payment.id = inter_user_payment.payment_id
+WHERE NOT inter_user_payment.completed
+    AND inter_user_payment.from_user_id IS NOT NULL
+    AND inter_user_payment.to_user_id IS NOT NULL
+GROUP BY inter_user_payment.from_user_id, inter_user_payment.to_user_id, payment.currency
+"""
+
+
+def upgrade():
+    op.create_table(
+        "user_balance",
+        sa.Column("from_user_id", sa.Integer(), nullable=False),
+        sa.Column("to_user_id", sa.Integer(), nullable=False),
+        sa.Column(
+            "currency",
+            sqlalchemy_utils.types.currency.CurrencyType(length=3),
+            nullable=False,
+        ),
+        sa.Column("amount", sa.Numeric(precision=20, scale=4), nullable=False),
+        sa.PrimaryKeyConstraint("from_user_id", "to_user_id", "currency"),
+    )
+    op.create_index(
+        "ix_user_balance_to_user_id", "user_balance", ["to_user_id"], unique=False
+    )
+
+    for name, body in FUNCTIONS.items():
+        op.execute(
+            f"CREATE FUNCTION {name}() RETURNS trigger LANGUAGE plpgsql AS $$\n"
+            f"BEGIN\n{body}    RETURN NULL;\nEND\n$$;"
+        )
+    for table, event, transition_tables, function in TRIGGERS:
+        op.execute(
+            f"CREATE TRIGGER {function} AFTER {event} ON {table} "
+            f"REFERENCING {transition_tables} FOR EACH STATEMENT EXECUTE FUNCTION {function}()"
+        )
+    op.execute(PAYMENT_DELETE_FUNCTION)
+    op.execute(
+        "CREATE TRIGGER user_balance_on_payment_delete BEFORE DELETE ON payment "
+        "FOR EACH ROW EXECUTE FUNCTION user_balance_on_payment_delete()"
+    )
+
+    op.execute(BACKFILL)
+
+
+def downgrade():
+    op.execute("DROP TRIGGER user_balance_on_payment_delete ON payment")
+    for table, _, _, function in TRIGGERS:
+        op.execute(f"DROP TRIGGER {function} ON {table}")
+    for name in (*FUNCTIONS, "user_balance_on_payment_delete"):
+        op.execute(f"DROP FUNCTION {name}()")
+
+    op.drop_index("ix_user_balance_to_user_id", table_name="user_balance")
+    op.drop_table("user_balance")
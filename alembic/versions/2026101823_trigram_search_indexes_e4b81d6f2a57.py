@@ -0,0 +1,41 @@
+"""Trigram search indexes
+
+Revision ID: e4b81d6f2a57
+Revises: a7c2e94d1f38
+Create Date: 2026-10-18 16:23:41.208516
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e4b81d6f2a57"
+down_revision = "a7c2e94d1f38"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # Indexes of a partitioned table cannot be built concurrently, the build blocks writes to the payments
+    op.create_index(
+        "ix_inter_user_payment_title_trgm",
+        "inter_user_payment",
+        ["title"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"title": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_user_username_trgm",
+        "user",
+        ["username"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"username": "gin_trgm_ops"},
+    )
+
+
+def downgrade():
+    op.drop_index("ix_user_username_trgm", table_name="user")
+    op.drop_index("ix_inter_user_payment_title_trgm", table_name="inter_user_payment")
+    # The extension is left installed, other objects of the database may depend on it
@@ -0,0 +1,31 @@
+"""Exchange rates
+
+Revision ID: 9b3e6d2c7f15
+Revises: e4b81d6f2a57
+Create Date: 2026-10-18 17:40:12.930481
+
+"""
+import sqlalchemy as sa
+import sqlalchemy_utils
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "9b3e6d2c7f15"
+down_revision = "e4b81d6f2a57"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "exchange_rate",
+        sa.Column("currency", sqlalchemy_utils.types.currency.CurrencyType(length=3), nullable=False),
+        sa.Column("rate", sa.Numeric(precision=20, scale=10), nullable=False),
+        sa.Column("created", sa.DateTime(), server_default=sa.text("now()"), nullable=False),
+        sa.Column("updated", sa.DateTime(), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("currency"),
+    )
+
+
+def downgrade():
+    op.drop_table("exchange_rate")
@@ -0,0 +1,278 @@
+"""Inter-user payment partitioning
+
+Revision ID: a7c2e94d1f38
+Revises: 5d7e3b1a9c60
+Create Date: 2026-10-18 14:58:12.604113
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "a7c2e94d1f38"
+down_revision = "5d7e3b1a9c60"
+branch_labels = None
+depends_on = None
+
+COLUMNS = "id, created, updated, title, from_user_id, to_user_id, payment_id, reminder_id, completed"
+ARCHIVED_COLUMNS = "id, created, updated, title, from_user_id, to_user_id, payment_id, reminder_id"
+
+# Partitions from the month of the oldest payment up to three months ahead, kept ahead by `app.services.partitions`
+CREATE_PARTITIONS = """
+DO $$
+DECLARE
+    month timestamp;
+BEGIN
+    FOR month IN
+        SELECT generate_series(
+            date_trunc('month', coalesce((SELECT min(created) FROM inter_user_payment_unpartitioned), now())),
+            date_trunc('month', now()) + interval '3 months',
+            interval '1 month'
+        )
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF inter_user_payment FOR VALUES FROM (%L) TO (%L)',
+            'inter_user_payment_' || to_char(month, 'YYYY_MM'), month, month + interval '1 month'
+        );
+    END LOOP;
+END
+$$;
+"""
+
+INDEXES = (
+    ("ix_inter_user_payment_id", ["id"]),
+    ("ix_inter_user_payment_title", ["title"]),
+    ("ix_inter_user_payment_from_user_id_id", ["from_user_id", "id"]),
+    ("ix_inter_user_payment_to_user_id_id", ["to_user_id", "id"]),
+)
+
+# Foreign keys of the plain and the partitioned table, both are named `inter_user_payment_<column>_fkey`
+FOREIGN_KEYS = (
+    ("from_user_id", "user"),
+    ("to_user_id", "user"),
+    ("payment_id", "payment"),
+    ("reminder_id", "reminder"),
+)
+
+# Functions of the `user_balance_ledger` migration, which are kept, only their triggers are recreated
+LEDGER_TRIGGERS = (
+    ("INSERT", "NEW TABLE AS new_rows", "user_balance_on_inter_user_payment_insert"),
+    ("UPDATE", "OLD TABLE AS old_rows NEW TABLE AS new_rows", "user_balance_on_inter_user_payment_update"),
+    ("DELETE", "OLD TABLE AS old_rows", "user_balance_on_inter_user_payment_delete"),
+)
+
+# Replaces `ON DELETE CASCADE` of the outbox foreign key, which cannot reference `id` of a partitioned table alone
+OUTBOX_DELETE_FUNCTION = """
+CREATE FUNCTION outbox_notification_on_inter_user_payment_delete() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    DELETE FROM outbox_notification WHERE inter_user_payment_id IN (SELECT id FROM old_rows);
+    RETURN NULL;
+END
+$$;
+"""
+
+
+def foreign_keys():
+    return [
+        sa.ForeignKeyConstraint(
+            [column], [f"{table}.id"], name=f"inter_user_payment_{column}_fkey", ondelete="CASCADE"
+        )
+        for column, table in FOREIGN_KEYS
+    ]
+
+
+def drop_foreign_keys():
+    """Frees the names of the foreign keys for the table which replaces `inter_user_payment`"""
+    for column, _ in FOREIGN_KEYS:
+        op.drop_constraint(f"inter_user_payment_{column}_fkey", "inter_user_payment", type_="foreignkey")
+
+
+def create_triggers():
+    for event, transition_tables, function in LEDGER_TRIGGERS:
+        op.execute(
+            f"CREATE TRIGGER {function} AFTER {event} ON inter_user_payment "
+            f"REFERENCING {transition_tables} FOR EACH STATEMENT EXECUTE FUNCTION {function}()"
+        )
+
+
+def upgrade():
+    # The table is copied while the migration holds its lock, plan a maintenance window for large tables
+    op.drop_constraint(
+        "outbox_notification_inter_user_payment_id_fkey",
+        "outbox_notification",
+        type_="foreignkey",
+    )
+
+    # Dropping the old table drops its ledger triggers, the sequence is handed over to the new one
+    for name, _ in INDEXES:
+        op.drop_index(name, table_name="inter_user_payment")
+    drop_foreign_keys()
+    op.execute("ALTER SEQUENCE inter_user_payment_id_seq OWNED BY NONE")
+    op.rename_table("inter_user_payment", "inter_user_payment_unpartitioned")
+    op.execute(
+        "ALTER TABLE inter_user_payment_unpartitioned "
+        "RENAME CONSTRAINT inter_user_payment_pkey TO inter_user_payment_unpartitioned_pkey"
+    )
+
+    op.create_table(
+        "inter_user_payment",
+        sa.Column(
+            "id",
+            sa.Integer(),
+            server_default=sa.text("nextval('inter_user_payment_id_seq'::regclass)"),
+            nullable=False,
+        ),
+        sa.Column(
+            "created", sa.DateTime(), server_default=sa.text("now()"), nullable=False
+        ),
+        sa.Column(
+            "updated", sa.DateTime(), server_default=sa.text("now()"), nullable=False
+        ),
+        sa.Column("title", sa.String(length=255), nullable=False),
+        sa.Column("from_user_id", sa.Integer(), nullable=True),
+        sa.Column("to_user_id", sa.Integer(), nullable=True),
+        sa.Column("payment_id", sa.Integer(), nullable=True),
+        sa.Column("reminder_id", sa.Integer(), nullable=True),
+        sa.Column("completed", sa.Boolean(), nullable=False),
+        *foreign_keys(),
+        sa.PrimaryKeyConstraint("id", "created"),
+        postgresql_partition_by="RANGE (created)",
+    )
+    op.execute("ALTER SEQUENCE inter_user_payment_id_seq OWNED BY inter_user_payment.id")
+    op.execute(CREATE_PARTITIONS)
+    op.execute("CREATE TABLE inter_user_payment_default PARTITION OF inter_user_payment DEFAULT")
+
+    # Copied before the indexes and the ledger triggers exist: the ledger already holds these rows
+    op.execute(
+        f"INSERT INTO inter_user_payment ({COLUMNS}) "
+        f"SELECT {COLUMNS} FROM inter_user_payment_unpartitioned"
+    )
+    op.drop_table("inter_user_payment_unpartitioned")
+
+    for name, columns in INDEXES:
+        op.create_index(name, "inter_user_payment", columns, unique=False)
+    op.create_index(
+        "ix_inter_user_payment_reminder_id_open",
+        "inter_user_payment",
+        ["reminder_id"],
+        unique=False,
+        postgresql_where=sa.text("NOT completed"),
+    )
+    create_triggers()
+    op.execute(OUTBOX_DELETE_FUNCTION)
+    op.execute(
+        "CREATE TRIGGER outbox_notification_on_inter_user_payment_delete AFTER DELETE ON inter_user_payment "
+        "REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT "
+        "EXECUTE FUNCTION outbox_notification_on_inter_user_payment_delete()"
+    )
+    op.execute("ANALYZE inter_user_payment")
+
+    op.create_table(
+        "inter_user_payment_archive",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("created", sa.DateTime(), nullable=False),
+        sa.Column("updated", sa.DateTime(), nullable=False),
+        sa.Column("title", sa.String(length=255), nullable=False),
+        sa.Column("from_user_id", sa.Integer(), nullable=True),
+        sa.Column("to_user_id", sa.Integer(), nullable=True),
+        sa.Column("payment_id", sa.Integer(), nullable=True),
+        sa.Column("reminder_id", sa.Integer(), nullable=True),
+        sa.Column(
+            "archived", sa.DateTime(), server_default=sa.text("now()"), nullable=False
+        ),
+        sa.ForeignKeyConstraint(["from_user_id"], ["user.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["payment_id"], ["payment.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["reminder_id"], ["reminder.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["to_user_id"], ["user.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_inter_user_payment_archive_from_user_id_id",
+        "inter_user_payment_archive",
+        ["from_user_id", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_inter_user_payment_archive_to_user_id_id",
+        "inter_user_payment_archive",
+        ["to_user_id", "id"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.execute(
+        "DROP TRIGGER outbox_notification_on_inter_user_payment_delete ON inter_user_payment"
+    )
+    op.execute("DROP FUNCTION outbox_notification_on_inter_user_payment_delete()")
+
+    # Partitions and their indexes are dropped with the partitioned table
+    op.drop_index("ix_inter_user_payment_reminder_id_open", table_name="inter_user_payment")
+    for name, _ in INDEXES:
+        op.drop_index(name, table_name="inter_user_payment")
+    drop_foreign_keys()
+    op.execute("ALTER SEQUENCE inter_user_payment_id_seq OWNED BY NONE")
+    op.rename_table("inter_user_payment", "inter_user_payment_partitioned")
+    op.execute(
+        "ALTER TABLE inter_user_payment_partitioned "
+        "RENAME CONSTRAINT inter_user_payment_pkey TO inter_user_payment_partitioned_pkey"
+    )
+
+    op.create_table(
+        "inter_user_payment",
+        sa.Column(
+            "id",
+            sa.Integer(),
+            server_default=sa.text("nextval('inter_user_payment_id_seq'::regclass)"),
+            nullable=False,
+        ),
+        sa.Column(
+            "created", sa.DateTime(), server_default=sa.text("now()"), nullable=False
+        ),
+        sa.Column(
+            "updated", sa.DateTime(), server_default=sa.text("now()"), nullable=False
+        ),
+        sa.Column("title", sa.String(length=255), nullable=False),
+        sa.Column("from_user_id", sa.Integer(), nullable=True),
+        sa.Column("to_user_id", sa.Integer(), nullable=True),
+        sa.Column("payment_id", sa.Integer(), nullable=True),
+        sa.Column("reminder_id", sa.Integer(), nullable=True),
+        sa.Column("completed", sa.Boolean(), nullable=False),
+        *foreign_keys(),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.execute("ALTER SEQUENCE inter_user_payment_id_seq OWNED BY inter_user_payment.id")
+
+    # Archived payments are completed and therefore not part of the ledger either
+    op.execute(
+        f"INSERT INTO inter_user_payment ({COLUMNS}) "
+        f"SELECT {COLUMNS} FROM inter_user_payment_partitioned "
+        f"UNION ALL SELECT {ARCHIVED_COLUMNS}, true FROM inter_user_payment_archive"
+    )
+    op.drop_table("inter_user_payment_partitioned")
+    op.drop_index(
+        "ix_inter_user_payment_archive_to_user_id_id",
+        table_name="inter_user_payment_archive",
+    )
+    op.drop_index(
+        "ix_inter_user_payment_archive_from_user_id_id",
+        table_name="inter_user_payment_archive",
+    )
+    op.drop_table("inter_user_payment_archive")
+
+    for name, columns in INDEXES:
+        op.create_index(name, "inter_user_payment", columns, unique=False)
+    create_triggers()
+
+    op.execute(
+        "DELETE FROM outbox_notification WHERE inter_user_payment_id IS NOT NULL "
+        "AND inter_user_payment_id NOT IN (SELECT id FROM inter_user_payment)"
+    )
+    op.create_foreign_key(
+        "outbox_notification_inter_user_payment_id_fkey",
+        "outbox_notification",
+        "inter_user_payment",
+        ["inter_user_payment_id"],
+        ["id"],
+        ondelete="CASCADE",
+    )
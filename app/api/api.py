@@ -1,6 +1,28 @@
 from fastapi import APIRouter
 
-from app.api.endpoints import user
+from app.api.endpoints import (
+    balance,
+    calendar,
+    exchange_rate,
+    export,
+    metrics,
+    payment,
+    payment_import,
+    report,
+    search,
+    settlement,
+    user,
+)
 
 api_router = APIRouter()
 api_router.include_router(user.router, prefix="", tags=["users"])
+api_router.include_router(payment.router, prefix="", tags=["payments"])
+api_router.include_router(balance.router, prefix="", tags=["balances"])
+api_router.include_router(settlement.router, prefix="", tags=["balances"])
+api_router.include_router(calendar.router, prefix="", tags=["calendar"])
+api_router.include_router(report.router, prefix="", tags=["reports"])
+api_router.include_router(exchange_rate.router, prefix="", tags=["reports"])
+api_router.include_router(search.router, prefix="", tags=["search"])
+api_router.include_router(export.router, prefix="", tags=["export"])
+api_router.include_router(payment_import.router, prefix="", tags=["import"])
+api_router.include_router(metrics.router, prefix="", tags=["metrics"])
@@ -0,0 +1,48 @@
+"""
+Conditional requests with strong ETags.
+
+The ETag of an entity is derived from its `(id, updated)` pair, and the ETag of a page from the pairs of its items
+and the next cursor, so a client can check whether its copy is still current without the server serializing
+and sending the body again (`If-None-Match` -> 304), and an update can be made conditional on the version the client
+has seen (`If-Match` -> 412 when it has changed since).
+"""
+
+import hashlib
+from datetime import datetime
+from typing import Any, Iterable, Optional
+
+from fastapi import HTTPException
+from starlette import status
+
+
+def make_etag(*parts: Any) -> str:
+    return '"' + hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest() + '"'
+
+
+def entity_etag(id: Any, updated: datetime) -> str:
+    return make_etag(str(id), updated.isoformat())
+
+
+def page_etag(items: Iterable[Any], next_cursor: Optional[str]) -> str:
+    return make_etag(*((str(item.id), item.updated.isoformat()) for item in items), next_cursor)
+
+
+def etag_matches(header: Optional[str], etag: str, weak: bool = True) -> bool:
+    """
+    Whether an `If-None-Match` (weak comparison) or `If-Match` (strong comparison) header value lists the ETag.
+    Our ETags are always strong, so a weak tag from the client can only match with the weak comparison.
+    """
+    if not header:
+        return False
+    for tag in (tag.strip() for tag in header.split(",")):
+        if tag == "*" or tag == etag or (weak and tag.startswith("W/") and tag[2:] == etag):
+            return True
+    return False
+
+
+def not_modified(etag: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+
+def precondition_failed() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="Precondition failed")
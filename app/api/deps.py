@@ -1,43 +1,160 @@
+import math
+import uuid
 from typing import Optional, AsyncGenerator
 
 from fastapi import HTTPException, Depends
 from fastapi.requests import Request
 from fastapi.security import HTTPBearer
-from sqlalchemy import select
+from sqlalchemy import select, event
 from sqlalchemy.ext.asyncio import AsyncSession
-from starlette.status import HTTP_401_UNAUTHORIZED
+from sqlalchemy.orm import Session, object_session
+from starlette.status import HTTP_401_UNAUTHORIZED, HTTP_429_TOO_MANY_REQUESTS, HTTP_503_SERVICE_UNAVAILABLE
 
-from app.core.session import async_session
+from app.config.settings import settings
+from app.core.admission import LoadShedder, TitleRateLimiter
+from app.core.cache import TTLCache
+from app.core.invalidation import invalidation_bus
+from app.core.session import LazySession, pool_metrics, replica_set
+from app.core.singleflight import load_entity
 from app.models import AuthToken
 from app.utils import is_valid_uuid4
 
+authentication_token_cache: TTLCache[AuthToken] = TTLCache(
+    max_size=settings.AUTH_TOKEN_CACHE_MAX_SIZE,
+    ttl=settings.AUTH_TOKEN_CACHE_TTL,
+    miss_ttl=settings.AUTH_TOKEN_CACHE_MISS_TTL,
+)
+invalidation_bus.register(AuthToken.__tablename__, authentication_token_cache, key=str.lower)
 
-async def get_session() -> AsyncGenerator[AsyncSession, None]:
-    async with async_session() as session:
-        yield session
+# Clients which wrote recently, their reads go to the primary so that they see their own writes
+primary_stickiness: TTLCache[bool] = TTLCache(
+    max_size=settings.DATABASE_REPLICA_STICKINESS_MAX_CLIENTS, ttl=settings.DATABASE_REPLICA_STICKINESS
+)
+
+token_rate_limiter = TitleRateLimiter(
+    rate=settings.RATE_LIMIT_RATE, burst=settings.RATE_LIMIT_BURST, by_title=settings.RATE_LIMIT_BY_TITLE
+)
+
+load_shedder = LoadShedder(pool_metrics, max_wait=settings.LOAD_SHEDDING_MAX_WAIT)
+
+SAFE_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+
+
+def get_client_key(request: Request) -> str:
+    return request.headers.get("Authorization") or (request.client.host if request.client else "")
+
+
+async def get_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Yields a lazy session, which takes a pool connection only when the request runs its first statement.
+    Sessions are registered on the request so that `SessionReleasingRoute` can release them early.
+
+    Safe requests use a read replica when one is configured and healthy, unless the same client wrote
+    within the last `DATABASE_REPLICA_STICKINESS` seconds. Stickiness is tracked per worker process.
+    """
+    client = get_client_key(request)
+    safe = request.method in SAFE_METHODS
+    read_only = safe and bool(replica_set.engines) and not primary_stickiness.get(client)[0]
+
+    session = LazySession(read_only=read_only)
+    request.state.database_sessions = [*getattr(request.state, "database_sessions", []), session]
+    # Marked before the write as well, the cleanup below may run only after the client got the response
+    if not safe:
+        primary_stickiness.set(client, True)
+    try:
+        yield session  # type: ignore
+    finally:
+        if not safe:
+            primary_stickiness.set(client, True)
+        await session.release()
 
 
 async def get_authentication_token(session: AsyncSession, token: str) -> Optional[AuthToken]:
-    auth_token: Optional[AuthToken] = (await session.execute(select(AuthToken).where(AuthToken.id == token))).first()
+    """
+    Concurrent lookups of a token which is not cached share one query when single-flight reads are enabled.
+    A read replica may not have replayed the creation of a token yet, so tokens which are not found
+    by a read-only session are looked up on the primary before the miss is cached.
+    """
+    key = token.lower()
+    if settings.AUTH_TOKEN_CACHE_ENABLED:
+        found, auth_token = authentication_token_cache.get(key)
+        if found:
+            return auth_token
+
+    auth_token = await find_authentication_token(session, key)
+    if auth_token is None and getattr(session, "read_only", False):
+        primary = LazySession()
+        try:
+            auth_token = await find_authentication_token(primary, key)
+        finally:
+            await primary.release()
+
+    if settings.AUTH_TOKEN_CACHE_ENABLED:
+        if auth_token:
+            authentication_token_cache.set(key, auth_token)
+        else:
+            authentication_token_cache.set_miss(key)
     return auth_token
 
 
+async def find_authentication_token(session: AsyncSession, token: str) -> Optional[AuthToken]:
+    if settings.SINGLE_FLIGHT_ENABLED:
+        return await load_entity(AuthToken, uuid.UUID(token), session)
+    return (await session.execute(select(AuthToken).where(AuthToken.id == token))).scalars().first()
+
+
+def invalidate_authentication_token(token: str) -> None:
+    authentication_token_cache.invalidate(str(token).lower())
+
+
+@event.listens_for(AuthToken, "after_update")
+@event.listens_for(AuthToken, "after_delete")
+def _invalidate_changed_authentication_token(mapper, connection, target: AuthToken) -> None:
+    invalidate_authentication_token(target.id)
+    # A concurrent request may still read the old row and cache it again until the change is committed
+    if (session := object_session(target)) is not None:
+        session.info.setdefault("changed_authentication_tokens", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_authentication_tokens(session: Session) -> None:
+    for token in session.info.pop("changed_authentication_tokens", ()):
+        invalidate_authentication_token(token)
+
+
 class BearerTokenAuthentication(HTTPBearer):
+    """
+    Admits requests as well: while the database connection pool is saturated, requests are rejected with 503
+    before they look the token up, and a token which exceeds its rate limit is rejected with 429.
+    Both responses tell the client when to retry in `Retry-After`.
+    """
+
     async def __call__(
             self, request: Request, session: AsyncSession = Depends(get_session)
     ) -> AuthToken:
         authorization_credentials = await super(BearerTokenAuthentication, self).__call__(request=request)
-        if (
+        if settings.LOAD_SHEDDING_ENABLED and (retry_after := load_shedder.retry_after()) is not None:
+            raise HTTPException(
+                status_code=HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Service overloaded",
+                headers={"Retry-After": str(retry_after)},
+            )
+        if not (
                 is_valid_uuid4(authorization_credentials.credentials)
                 and (token := await get_authentication_token(session, authorization_credentials.credentials))
         ):
-            return token
-        else:
             raise HTTPException(
                 status_code=HTTP_401_UNAUTHORIZED,
                 detail="Not authenticated",
                 headers={"WWW-Authenticate": "Bearer"},
             )
+        if settings.RATE_LIMIT_ENABLED and (wait := token_rate_limiter.acquire(token.id, token.title)):
+            raise HTTPException(
+                status_code=HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests",
+                headers={"Retry-After": str(max(1, math.ceil(wait)))},
+            )
+        return token
 
 
 authentication_scheme = BearerTokenAuthentication()
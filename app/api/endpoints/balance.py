@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+from app.api.deps import get_session, authentication_scheme
+from app.api.routers import SessionReleasingRoute
+from app.schemas.balance import PairBalanceSchema, UserBalanceSchema
+from app.services.ledger import get_pair_balances, get_user_balances
+
+router = APIRouter(route_class=SessionReleasingRoute, dependencies=[Depends(authentication_scheme)])
+
+
+@router.get("/balance/{user_id}", response_model=list[UserBalanceSchema], status_code=status.HTTP_200_OK)
+async def user_balances(user_id: int, session: AsyncSession = Depends(get_session)):
+    """Open debts of the user and to the user per counterpart and currency"""
+    return await get_user_balances(session, user_id)
+
+
+@router.get(
+    "/balance/{user_id}/{counterpart_id}", response_model=list[PairBalanceSchema], status_code=status.HTTP_200_OK
+)
+async def pair_balances(user_id: int, counterpart_id: int, session: AsyncSession = Depends(get_session)):
+    """Net debt of the user to the counterpart per currency"""
+    balances = await get_pair_balances(session, user_id, counterpart_id)
+    return [{"currency": currency, "amount": amount} for currency, amount in balances.items()]
@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+from app.api.deps import get_session, authentication_scheme
+from app.api.routers import SessionReleasingRoute
+from app.config.settings import settings
+from app.core.streaming import NDJSON_MEDIA_TYPE, ndjson_line
+from app.services.calendar import iter_calendar
+from app.utils import to_naive_utc
+
+router = APIRouter(route_class=SessionReleasingRoute)
+
+
+@router.get("/calendar", response_class=StreamingResponse, dependencies=[Depends(authentication_scheme)])
+async def calendar(
+        start: datetime,
+        end: datetime,
+        user_id: Optional[int] = None,
+        include_completed: bool = False,
+        session: AsyncSession = Depends(get_session),
+):
+    """Streams payments due within `[start, end)` as NDJSON, one entry per reminder occurrence"""
+    start, end = to_naive_utc(start), to_naive_utc(end)
+    if not start < end <= start + timedelta(days=settings.CALENDAR_MAX_WINDOW_DAYS):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"end must be after start and within {settings.CALENDAR_MAX_WINDOW_DAYS} days of it",
+        )
+
+    async def content():
+        async for entries in iter_calendar(
+                session, start, end, user_id, include_completed, chunk_size=settings.CALENDAR_CHUNK_SIZE
+        ):
+            yield b"".join(ndjson_line(entry) for entry in entries)
+
+    return StreamingResponse(content(), media_type=NDJSON_MEDIA_TYPE)
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+from app.api.deps import get_session, authentication_scheme
+from app.api.routers import SessionReleasingRoute
+from app.models import ExchangeRate
+from app.schemas.exchange_rate import ExchangeRateSchema
+from app.services.exchange_rates import upsert_exchange_rates
+
+router = APIRouter(route_class=SessionReleasingRoute, dependencies=[Depends(authentication_scheme)])
+
+
+@router.get("/exchange-rate", response_model=list[ExchangeRateSchema], status_code=status.HTTP_200_OK)
+async def list_exchange_rates(session: AsyncSession = Depends(get_session)):
+    """Values of one unit of every currency in the base currency"""
+    return (await session.execute(select(ExchangeRate).order_by(ExchangeRate.currency))).scalars().all()
+
+
+@router.put("/exchange-rate", response_model=list[ExchangeRateSchema], status_code=status.HTTP_200_OK)
+async def put_exchange_rates(rates: list[ExchangeRateSchema], session: AsyncSession = Depends(get_session)):
+    """Creates or updates the rates of the currencies, every worker uses them from its next report on"""
+    await upsert_exchange_rates(session, {rate.currency: rate.rate for rate in rates})
+    await session.commit()
+    return sorted(rates, key=lambda rate: rate.currency)
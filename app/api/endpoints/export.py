@@ -0,0 +1,49 @@
+from datetime import datetime
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_session, authentication_scheme
+from app.api.routers import SessionReleasingRoute
+from app.config.settings import settings
+from app.core.streaming import CSV_MEDIA_TYPE, NDJSON_MEDIA_TYPE, csv_lines, gzip_stream, ndjson_line
+from app.services.export import EXPORT_FIELDS, iter_export_rows
+from app.utils import to_naive_utc
+
+router = APIRouter(route_class=SessionReleasingRoute)
+
+
+@router.get("/export/payments", response_class=StreamingResponse, dependencies=[Depends(authentication_scheme)])
+async def export_payments(
+        start: datetime,
+        end: datetime,
+        format: Literal["ndjson", "csv"] = "ndjson",
+        gzip: bool = False,
+        after_id: Optional[int] = None,
+        session: AsyncSession = Depends(get_session),
+):
+    """
+    Streams inter-user payments created within `[start, end)` joined with their payments and reminders,
+    ordered by id. Pass the last received id as `after_id` to resume an interrupted export.
+    """
+    start, end = to_naive_utc(start), to_naive_utc(end)
+
+    async def content():
+        if format == "csv" and after_id is None:
+            yield csv_lines([EXPORT_FIELDS])
+        async for rows in iter_export_rows(session, start, end, after_id, chunk_size=settings.EXPORT_CHUNK_SIZE):
+            if format == "csv":
+                yield csv_lines(rows)
+            else:
+                yield b"".join(ndjson_line(dict(zip(EXPORT_FIELDS, row))) for row in rows)
+
+    headers = {"Content-Disposition": f"attachment; filename=payments.{format}"}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        gzip_stream(content()) if gzip else content(),
+        media_type=CSV_MEDIA_TYPE if format == "csv" else NDJSON_MEDIA_TYPE,
+        headers=headers,
+    )
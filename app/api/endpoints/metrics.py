@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import authentication_scheme, get_session
+from app.config.settings import settings
+from app.core.metrics import registry
+from app.core.session import pool_metrics, replica_set
+
+
+async def metrics_authentication(request: Request, session: AsyncSession = Depends(get_session)) -> None:
+    """
+    Requires a token unless `METRICS_PUBLIC` is set. Authentication sheds requests while the connection pool is
+    saturated and needs the database for tokens which are not cached, exactly when the metrics are wanted most,
+    so deployments which scrape from a private listener may turn it off.
+    """
+    if not settings.METRICS_PUBLIC:
+        await authentication_scheme(request, session)
+
+
+router = APIRouter(dependencies=[Depends(metrics_authentication)])
+
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Request, SQL and connection pool metrics of this worker process in Prometheus text format"""
+    return PlainTextResponse(registry.render(), media_type=PROMETHEUS_MEDIA_TYPE)
+
+
+@router.get("/metrics/pool")
+async def pool():
+    """Database connection pool state of this worker process"""
+    return {**pool_metrics.snapshot(), "replicas": replica_set.snapshot()}
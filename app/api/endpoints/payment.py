@@ -0,0 +1,30 @@
+from fastapi import APIRouter
+from sqlalchemy.orm import joinedload, selectinload
+
+from app.api.deps import get_session, authentication_scheme
+from app.api.routers import KeysetPaginatedCRUDRouter, SessionReleasingRoute
+from app.models import InterUserPayment
+from app.schemas.payment import (
+    InterUserPaymentExpandedSchema,
+    InterUserPaymentFilterSchema,
+    InterUserPaymentRequestSchema,
+    InterUserPaymentSchema,
+)
+
+router = APIRouter(route_class=SessionReleasingRoute)
+
+inter_user_payment_crud_router = KeysetPaginatedCRUDRouter(
+    prefix="inter-user-payment",
+    model=InterUserPayment,
+    identifier_type=int,
+    get_session=get_session,
+    get_authentication=authentication_scheme,
+    request_schema=InterUserPaymentRequestSchema,
+    response_schema=InterUserPaymentSchema,
+    retrieve_response_schema=InterUserPaymentExpandedSchema,
+    list_filter_schema=InterUserPaymentFilterSchema,
+    # Users are shared between many payments of a page and are loaded once each, payments and reminders are not
+    expandable={"from_user": selectinload, "to_user": selectinload, "payment": joinedload, "reminder": joinedload},
+)
+
+router.include_router(inter_user_payment_crud_router.api_router)
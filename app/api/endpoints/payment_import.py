@@ -0,0 +1,34 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_session, authentication_scheme
+from app.api.routers import SessionReleasingRoute
+from app.config.settings import settings
+from app.core.streaming import gunzip_stream
+from app.schemas.payment import PaymentImportReportSchema
+from app.services.payment_import import import_payment_stream
+
+router = APIRouter(route_class=SessionReleasingRoute)
+
+
+@router.post(
+    "/import/payments", response_model=PaymentImportReportSchema, dependencies=[Depends(authentication_scheme)]
+)
+async def import_payments(
+        request: Request,
+        format: Literal["ndjson", "csv"] = "ndjson",
+        session: AsyncSession = Depends(get_session),
+):
+    """
+    Imports inter-user payments with their payments and reminders, in the format of the export, from the request
+    body streamed as CSV with a header line or as NDJSON, gzipped with `Content-Encoding: gzip`.
+    Valid records are imported in one transaction, rejected ones are reported with their row number.
+    """
+    chunks = request.stream()
+    if request.headers.get("Content-Encoding") == "gzip":
+        chunks = gunzip_stream(chunks)
+    report = await import_payment_stream(session, chunks, format, batch_size=settings.PAYMENT_IMPORT_BATCH_SIZE)
+    await session.commit()
+    return report
@@ -0,0 +1,75 @@
+from datetime import date
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+from app.api.deps import get_session, authentication_scheme
+from app.api.routers import SessionReleasingRoute
+from app.config.settings import settings
+from app.schemas.report import CounterpartTotalSchema, MonthTotalSchema, TotalSchema
+from app.services.exchange_rates import MissingExchangeRateError, exchange_rates
+from app.services.reports import Converter, counterpart_report, monthly_report, user_report
+
+router = APIRouter(route_class=SessionReleasingRoute, dependencies=[Depends(authentication_scheme)])
+
+
+def missing_rate(error: MissingExchangeRateError) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
+
+
+async def get_converter(
+        currency: str = Query(default=settings.EXCHANGE_RATE_BASE_CURRENCY, min_length=3, max_length=3),
+        exact: bool = False,
+) -> Converter:
+    """Converts into `currency`, with `exact` in minor units instead of floats"""
+    try:
+        return Converter(await exchange_rates.get(), currency.upper(), exact)
+    except MissingExchangeRateError as e:
+        raise missing_rate(e)
+
+
+@router.get("/report/{user_id}", response_model=TotalSchema, status_code=status.HTTP_200_OK)
+async def user_total(
+        user_id: int, converter: Converter = Depends(get_converter), session: AsyncSession = Depends(get_session)
+):
+    """Open debts of the user and to the user in one currency"""
+    try:
+        return await user_report(session, user_id, converter)
+    except MissingExchangeRateError as e:
+        raise missing_rate(e)
+
+
+@router.get(
+    "/report/{user_id}/counterpart", response_model=list[CounterpartTotalSchema], status_code=status.HTTP_200_OK
+)
+async def counterpart_totals(
+        user_id: int, converter: Converter = Depends(get_converter), session: AsyncSession = Depends(get_session)
+):
+    """Open debts of the user and to the user in one currency per counterpart"""
+    try:
+        return await counterpart_report(session, user_id, converter)
+    except MissingExchangeRateError as e:
+        raise missing_rate(e)
+
+
+@router.get("/report/{user_id}/month", response_model=list[MonthTotalSchema], status_code=status.HTTP_200_OK)
+async def monthly_totals(
+        user_id: int,
+        start: date,
+        end: date,
+        include_completed: bool = False,
+        converter: Converter = Depends(get_converter),
+        session: AsyncSession = Depends(get_session),
+):
+    """Debts of the user and to the user in one currency per month of the payments created from `start` to `end`"""
+    months = (end.year - start.year) * 12 + end.month - start.month + 1
+    if not 1 <= months <= settings.REPORT_MAX_MONTHS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"end must not be before start and within {settings.REPORT_MAX_MONTHS} months of it",
+        )
+    try:
+        return await monthly_report(session, user_id, start, end, include_completed, converter)
+    except MissingExchangeRateError as e:
+        raise missing_rate(e)
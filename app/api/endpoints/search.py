@@ -0,0 +1,56 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+from app.api.deps import get_session, authentication_scheme
+from app.api.pagination import paginate_ranked
+from app.api.routers import SessionReleasingRoute
+from app.config.settings import settings
+from app.models import InterUserPayment, User
+from app.schemas.base import PageSchema
+from app.schemas.payment import InterUserPaymentSchema
+from app.schemas.user import UserSchema
+from app.services.search import (
+    MIN_QUERY_LENGTH,
+    configure_search,
+    payment_search_statement,
+    user_search_statement,
+)
+
+router = APIRouter(route_class=SessionReleasingRoute, dependencies=[Depends(authentication_scheme)])
+
+
+@router.get(
+    "/search/inter-user-payment",
+    response_model=PageSchema[InterUserPaymentSchema],  # type: ignore
+    status_code=status.HTTP_200_OK,
+)
+async def search_payments(
+        user_id: int,
+        query: str = Query(min_length=MIN_QUERY_LENGTH, max_length=255),
+        limit: int = Query(default=settings.PAGINATION_DEFAULT_LIMIT, ge=1, le=settings.PAGINATION_MAX_LIMIT),
+        cursor: Optional[str] = None,
+        session: AsyncSession = Depends(get_session),
+):
+    """
+    Inter-user payments of the user, as debtor or creditor, whose title contains `query` or a word similar to it.
+    The most similar titles come first, newer payments first among equally similar ones.
+    """
+    await configure_search(session, settings.SEARCH_SIMILARITY_THRESHOLD)
+    statement, rank = payment_search_statement(user_id, query)
+    return await paginate_ranked(session, statement, rank, InterUserPayment.id, limit, cursor)
+
+
+@router.get("/search/user", response_model=PageSchema[UserSchema], status_code=status.HTTP_200_OK)  # type: ignore
+async def search_users(
+        query: str = Query(min_length=MIN_QUERY_LENGTH, max_length=255),
+        limit: int = Query(default=settings.PAGINATION_DEFAULT_LIMIT, ge=1, le=settings.PAGINATION_MAX_LIMIT),
+        cursor: Optional[str] = None,
+        session: AsyncSession = Depends(get_session),
+):
+    """Users whose username contains `query` or is similar to it, the most similar first"""
+    await configure_search(session, settings.SEARCH_SIMILARITY_THRESHOLD)
+    statement, rank = user_search_statement(query)
+    return await paginate_ranked(session, statement, rank, User.id, limit, cursor)
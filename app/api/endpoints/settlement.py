@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+from app.api.deps import get_session, authentication_scheme
+from app.api.routers import SessionReleasingRoute
+from app.config.settings import settings
+from app.schemas.settlement import SettlementRequestSchema, TransferSchema
+from app.services.settlement import settle_group
+
+router = APIRouter(route_class=SessionReleasingRoute)
+
+
+@router.post(
+    "/settlement",
+    response_model=list[TransferSchema],
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(authentication_scheme)],
+)
+async def settlement(data: SettlementRequestSchema, session: AsyncSession = Depends(get_session)):
+    """Transfers which settle all open debts between the group members, per currency"""
+    return await settle_group(
+        session, list(set(data.user_ids)), exact_max_users=settings.SETTLEMENT_EXACT_MAX_USERS, currency=data.currency
+    )
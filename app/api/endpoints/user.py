@@ -1,13 +1,36 @@
-from facrud_router import ModelCRUDRouter
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
 
 from app.api.deps import get_session, authentication_scheme
+from app.api.routers import KeysetPaginatedCRUDRouter, SessionReleasingRoute
+from app.config.settings import settings
 from app.models import User
-from app.schemas.user import UserSchema, UserUpdateRequestSchema
+from app.schemas.user import UserSchema, UserUpdateRequestSchema, UserBulkUpsertResultSchema
+from app.services.user import bulk_upsert_users
 
-router = APIRouter()
+router = APIRouter(route_class=SessionReleasingRoute)
 
-user_crud_router = ModelCRUDRouter(
+
+@router.post(
+    "/user/bulk",
+    response_model=list[UserBulkUpsertResultSchema],
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(authentication_scheme)],
+)
+async def bulk_upsert(users: list[UserSchema], session: AsyncSession = Depends(get_session)):
+    """Creates or updates users in one transaction and reports what happened to every record"""
+    if len(users) > settings.USER_BULK_UPSERT_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.USER_BULK_UPSERT_MAX_SIZE} users can be upserted at once",
+        )
+    statuses = await bulk_upsert_users(session, users, chunk_size=settings.USER_BULK_UPSERT_CHUNK_SIZE)
+    await session.commit()
+    return [{"id": user.id, "status": statuses[user.id]} for user in users]
+
+
+user_crud_router = KeysetPaginatedCRUDRouter(
     prefix="user",
     model=User,
     identifier_type=int,
@@ -15,7 +38,8 @@ user_crud_router = ModelCRUDRouter(
     get_authentication=authentication_scheme,
     request_schema=UserSchema,
     update_request_schema=UserUpdateRequestSchema,
-    response_schema=UserSchema
+    response_schema=UserSchema,
+    pagination_keys=("created", "id"),
 )
 
 router.include_router(user_crud_router.api_router)
@@ -0,0 +1,85 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are ordered by a unique tuple of columns and the cursor holds the values of the last item,
+so every page is an index seek regardless of its depth. Cursors are opaque to clients.
+"""
+
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, Optional, Sequence
+
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+from starlette import status
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    payload = json.dumps([value.isoformat() if isinstance(value, (date, datetime)) else value for value in values])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_value(value: Any, column) -> Any:
+    """Value of `column` from a cursor, which must be of the column type so that the database does not reject it"""
+    python_type = column.type.python_type
+    if python_type in (date, datetime):
+        return python_type.fromisoformat(value)
+    if python_type is float and type(value) is int:
+        return float(value)
+    if type(value) is not python_type:
+        raise ValueError(f"{python_type.__name__} expected")
+    return value
+
+
+def decode_cursor(cursor: str, columns: Sequence) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError("cursor does not match the page ordering")
+        return [decode_value(value, column) for column, value in zip(columns, values)]
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+async def paginate(
+        session: AsyncSession, statement: Select, columns: Sequence, limit: int, cursor: Optional[str] = None
+) -> dict:
+    """
+    Returns a page of `statement` ordered by `columns`, which must identify a row uniquely
+    and should be covered by an index together with the statement filters.
+    """
+    if cursor:
+        statement = statement.where(tuple_(*columns) > tuple_(*decode_cursor(cursor, columns)))
+    statement = statement.order_by(*columns).limit(limit + 1)
+
+    items = (await session.execute(statement)).scalars().all()
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor([getattr(items[-1], column.key) for column in columns])
+    return {"items": items, "next_cursor": next_cursor}
+
+
+async def paginate_ranked(
+        session: AsyncSession, statement: Select, rank, key, limit: int, cursor: Optional[str] = None
+) -> dict:
+    """
+    Returns a page of `statement` ordered by `rank` and then by the unique `key`, both descending.
+    Unlike the order of `paginate`, the rank is not backed by an index: it is computed for every row
+    the statement matches on every page, the cursor saves fetching the rows of the previous pages.
+    """
+    columns = (rank, key)
+    if cursor:
+        statement = statement.where(tuple_(*columns) < tuple_(*decode_cursor(cursor, columns)))
+    statement = statement.add_columns(rank).order_by(rank.desc(), key.desc()).limit(limit + 1)
+
+    rows = (await session.execute(statement)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        item, last_rank = rows[-1]
+        next_cursor = encode_cursor([last_rank, getattr(item, key.key)])
+    return {"items": [item for item, _ in rows], "next_cursor": next_cursor}
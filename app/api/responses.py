@@ -0,0 +1,139 @@
+"""
+Fast JSON responses.
+
+FastAPI validates whatever an endpoint returns against its response model, converts the result with
+`jsonable_encoder` and renders it with `json.dumps`, walking every value in Python three times. For data which
+comes from the database this is redundant: its types are known and the columns already satisfy the schema.
+
+`serializer(schema)` compiles a schema into a function which builds the response content straight from
+ORM rows, dicts or models: values of plain types are taken as they are, only fields with validators of their own
+run them, e.g. to turn a phone number object into a string. `FastJSONResponse` renders the content with orjson.
+Endpoints which return a `FastJSONResponse` skip FastAPI's serialization altogether, see `fast_response`.
+"""
+
+import dataclasses
+import decimal
+import functools
+import typing
+import uuid
+from datetime import date, datetime, time
+from typing import Any, Callable, Collection, Optional
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, ValidationError
+from pydantic.error_wrappers import ErrorWrapper
+from pydantic.fields import SHAPE_LIST, SHAPE_SEQUENCE, SHAPE_SET, SHAPE_SINGLETON, SHAPE_TUPLE_ELLIPSIS, ModelField
+
+# Values of these types are rendered by orjson as they are, from the database they need no validation
+PLAIN_TYPES = (str, int, float, bool, datetime, date, time, uuid.UUID)
+SEQUENCE_SHAPES = frozenset((SHAPE_LIST, SHAPE_SEQUENCE, SHAPE_SET, SHAPE_TUPLE_ELLIPSIS))
+
+
+def default(value: Any) -> Any:
+    """Types orjson does not render, encoded the way `jsonable_encoder` does"""
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, BaseModel):
+        return value.dict(by_alias=True)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if dataclasses.is_dataclass(value):
+        return dataclasses.asdict(value)
+    return str(value)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+@functools.lru_cache(maxsize=None)
+def dataclass_fields(cls: type) -> frozenset[str]:
+    return frozenset(field.name for field in dataclasses.fields(cls))
+
+
+def set_names(source: Any) -> Optional[Collection[str]]:
+    """
+    Names of the values FastAPI would consider set, None when every attribute counts.
+    ORM rows are converted with `asdict` by FastAPI, so their relationships are not set.
+    """
+    if isinstance(source, BaseModel):
+        return source.__fields_set__
+    if dataclasses.is_dataclass(source):
+        return dataclass_fields(type(source))
+    return None
+
+
+def is_plain(field: ModelField) -> bool:
+    if field.class_validators or (field.sub_fields and field.shape == SHAPE_SINGLETON):
+        return False
+    if typing.get_origin(field.type_) is typing.Literal or field.type_ is Any:
+        return True
+    return isinstance(field.type_, type) and issubclass(field.type_, PLAIN_TYPES)
+
+
+def field_serializer(
+        field: ModelField, schema: type[BaseModel], exclude_unset: bool
+) -> Optional[Callable[[Any], Any]]:
+    """Conversion of a value which is not None, None when the value is rendered as it is"""
+    if isinstance(field.type_, type) and issubclass(field.type_, BaseModel) and not field.class_validators:
+        nested = serializer(field.type_, exclude_unset)
+        if field.shape == SHAPE_SINGLETON:
+            return nested
+        if field.shape in SEQUENCE_SHAPES:
+            return lambda value: [nested(item) for item in value]
+
+    if field.shape in (SHAPE_SINGLETON, *SEQUENCE_SHAPES) and is_plain(field):
+        return None if field.shape == SHAPE_SINGLETON else list
+
+    def validated(value: Any) -> Any:
+        value, errors = field.validate(value, {}, loc=field.alias, cls=schema)  # type: ignore
+        if errors:
+            raise ValidationError([errors] if isinstance(errors, ErrorWrapper) else errors, schema)
+        return value
+
+    return validated
+
+
+@functools.lru_cache(maxsize=None)
+def serializer(schema: type[BaseModel], exclude_unset: bool = False) -> Callable[[Any], dict]:
+    """
+    Function building the content of `schema` from an ORM row, a dict or a model, keyed by the field aliases
+    like `response_model` does. With `exclude_unset`, fields which the source does not have are left out.
+    """
+    if schema.__pre_root_validators__ or schema.__post_root_validators__:
+        def validated(source: Any) -> dict:
+            if dataclasses.is_dataclass(source):
+                source = dataclasses.asdict(source)
+            return schema.parse_obj(source).dict(by_alias=True, exclude_unset=exclude_unset)
+
+        return validated
+
+    fields = [
+        (field.name, field.alias, field_serializer(field, schema, exclude_unset), field.get_default())
+        for field in schema.__fields__.values()
+    ]
+
+    def serialize(source: Any) -> dict:
+        mapping = isinstance(source, dict)
+        names = source if mapping else set_names(source)
+        content = {}
+        for name, alias, convert, default_value in fields:
+            key = alias if mapping else name
+            if names is not None and key not in names:
+                if not exclude_unset:
+                    content[alias] = default_value
+                continue
+            value = source[key] if mapping else getattr(source, key)
+            content[alias] = value if convert is None or value is None else convert(value)
+        return content
+
+    return serialize
+
+
+def fast_response(
+        schema: type[BaseModel], content: Any, status_code: int = 200, exclude_unset: bool = False
+) -> FastJSONResponse:
+    """Response of `content` rendered as `schema` without FastAPI's validation and encoding"""
+    return FastJSONResponse(serializer(schema, exclude_unset)(content), status_code=status_code)
@@ -0,0 +1,288 @@
+from dataclasses import fields
+from typing import Any, Callable, Coroutine, Mapping, Optional, Sequence
+
+from facrud_router import ModelCRUDRouter
+from facrud_router.generics import Authentication
+from facrud_router.logger import logger
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.requests import Request
+from fastapi.responses import Response, StreamingResponse
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+from starlette import status
+
+from app.api.conditional import entity_etag, etag_matches, not_modified, page_etag, precondition_failed
+from app.api.pagination import paginate
+from app.api.responses import fast_response
+from app.config.settings import settings
+from app.core.singleflight import load_entity
+from app.schemas.base import EmptySchema, PageSchema
+
+
+class SessionReleasingRoute(APIRoute):
+    """
+    Returns the request database connections to the pool as soon as the response is rendered,
+    instead of holding them while the response is sent to a slow client.
+    Streaming responses keep their sessions until the stream is finished.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[None, None, Response]]:
+        handler = super().get_route_handler()
+
+        async def session_releasing_handler(request: Request) -> Response:
+            response = await handler(request)
+            if not isinstance(response, StreamingResponse):
+                for session in getattr(request.state, "database_sessions", ()):
+                    await session.release()
+            return response
+
+        return session_releasing_handler
+
+
+class ETagRoute(SessionReleasingRoute):
+    """Sets the `ETag` response header from `request.state.etag`, which handlers may set"""
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[None, None, Response]]:
+        handler = super().get_route_handler()
+
+        async def etag_handler(request: Request) -> Response:
+            response = await handler(request)
+            if etag := getattr(request.state, "etag", None):
+                response.headers["ETag"] = etag
+            return response
+
+        return etag_handler
+
+
+class KeysetPaginatedCRUDRouter(ModelCRUDRouter):
+    """
+    `ModelCRUDRouter` which lists entities page by page with opaque cursors over `pagination_keys`
+    instead of returning the whole table. Fields of `list_filter_schema` become equality filters.
+
+    Models with an `updated` column get ETags on retrieval, listing and updates: `If-None-Match` is answered
+    with 304, checked against the `updated` column alone for single entities, and `If-Match` makes updates
+    and deletes fail with 412 when the entity has changed since.
+
+    Concurrent retrievals of the same entity share one query, see `app/core/singleflight.py`.
+
+    With `FAST_RESPONSES_ENABLED`, retrieval and listing build their responses straight from the rows,
+    see `app/api/responses.py`.
+
+    Relationships listed in `expandable` with their loader option (`selectinload`, `joinedload`) can be included
+    in retrieval and listing with `expand=from_user,payment`, so a page costs one query per expanded relation
+    at most instead of one per item. Expanded responses have no ETags, since related entities may change without
+    touching the entity itself.
+    """
+
+    pagination_keys: Sequence[str]
+    list_filter_schema: BaseModel.__class__
+    expandable: Mapping[str, Callable[[Any], Any]]
+
+    def __init__(
+            self,
+            *args,
+            pagination_keys: Sequence[str] = ("id",),
+            list_filter_schema: BaseModel.__class__ = EmptySchema,
+            expandable: Optional[Mapping[str, Callable[[Any], Any]]] = None,
+            **kwargs
+    ):
+        self.pagination_keys = pagination_keys
+        self.list_filter_schema = list_filter_schema
+        self.expandable = dict(expandable or {})
+        kwargs.setdefault("api_router", APIRouter(route_class=ETagRoute))
+        super().__init__(*args, **kwargs)
+
+    @property
+    def versioned(self) -> bool:
+        return hasattr(self.model, "updated")
+
+    async def check_if_match(self, id, session: AsyncSession, request: Request) -> None:
+        """Locks the entity until the end of the transaction when its ETag matches `If-Match`, raises 412 otherwise"""
+        if not self.versioned or not (if_match := request.headers.get("If-Match")):
+            return
+        updated = (
+            await session.execute(select(self.model.updated).where(self.model.id == id).with_for_update())
+        ).scalar()
+        if updated is None or not etag_matches(if_match, entity_etag(id, updated), weak=False):
+            raise precondition_failed()
+
+    async def set_entity_etag(self, session: AsyncSession, instance, request: Request) -> None:
+        if self.versioned:
+            # `updated` is set by the database and is expired until it is loaded again
+            await session.refresh(instance, ["updated"])
+            request.state.etag = entity_etag(instance.id, instance.updated)
+
+    def get_expand(self) -> Callable[..., tuple[str, ...]]:
+        """Dependency parsing the `expand` query parameter, which routers without expandable relations do not have"""
+        if not self.expandable:
+            def no_expand() -> tuple[str, ...]:
+                return ()
+
+            return no_expand
+
+        def expand(
+                expand: Optional[str] = Query(
+                    default=None, description=f"Comma separated relations to include: {', '.join(self.expandable)}"
+                )
+        ) -> tuple[str, ...]:
+            names = tuple(dict.fromkeys(name.strip() for name in (expand or "").split(",") if name.strip()))
+            if unknown := [name for name in names if name not in self.expandable]:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown relations to expand: {', '.join(unknown)}"
+                )
+            return names
+
+        return expand
+
+    def with_expanded(self, statement: Select, expand: Sequence[str]) -> Select:
+        return statement.options(*(self.expandable[name](getattr(self.model, name)) for name in expand))
+
+    @staticmethod
+    def expanded(instance, expand: Sequence[str]) -> dict:
+        """
+        Response content with the loaded relations, which the dataclass serialization of the entity leaves out.
+        Related entities are left as they are, both FastAPI and the fast responses serialize dataclasses.
+        """
+        content = {field.name: getattr(instance, field.name) for field in fields(instance)}
+        for name in expand:
+            content[name] = getattr(instance, name)
+        return content
+
+    async def perform_retrieve(
+            self, id, session: AsyncSession, *args, request: Request, expand: Sequence[str] = (), **kwargs
+    ):
+        if expand:
+            statement = self.with_expanded(select(self.model).where(self.model.id == id), expand)
+            if instance := (await session.execute(statement)).scalars().first():
+                return self.expanded(instance, expand)
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+
+        if self.versioned and (if_none_match := request.headers.get("If-None-Match")):
+            updated = (await session.execute(select(self.model.updated).where(self.model.id == id))).scalar()
+            if updated is not None and etag_matches(if_none_match, etag := entity_etag(id, updated)):
+                raise not_modified(etag)
+
+        if settings.SINGLE_FLIGHT_ENABLED:
+            instance = await load_entity(self.model, id, session)
+            if instance is None:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+        else:
+            instance = await super().perform_retrieve(id, session, *args, request=request, **kwargs)
+        if self.versioned:
+            request.state.etag = entity_etag(instance.id, instance.updated)
+        return instance
+
+    async def perform_create(self, data: BaseModel, session: AsyncSession, *args, request: Request, **kwargs):
+        instance = await super().perform_create(data, session, *args, request=request, **kwargs)
+        await self.set_entity_etag(session, instance, request)
+        return instance
+
+    async def perform_update(self, id, data: BaseModel, session: AsyncSession, *args, request: Request, **kwargs):
+        await self.check_if_match(id, session, request)
+        instance = await super().perform_update(id, data, session, *args, request=request, **kwargs)
+        await self.set_entity_etag(session, instance, request)
+        return instance
+
+    async def perform_partial_update(
+            self, id, data: BaseModel, session: AsyncSession, *args, request: Request, **kwargs
+    ):
+        await self.check_if_match(id, session, request)
+        instance = await super().perform_partial_update(id, data, session, *args, request=request, **kwargs)
+        await self.set_entity_etag(session, instance, request)
+        return instance
+
+    async def perform_delete(self, id, session: AsyncSession, *args, request: Request, **kwargs):
+        await self.check_if_match(id, session, request)
+        await super().perform_delete(id, session, *args, request=request, **kwargs)
+
+    async def perform_list(
+            self,
+            session: AsyncSession,
+            limit: int,
+            cursor: Optional[str],
+            filters: BaseModel,
+            *args,
+            request: Request,
+            expand: Sequence[str] = (),
+            **kwargs
+    ) -> dict:
+        statement = self.with_expanded(select(self.model), expand)
+        for key, value in filters.dict(exclude_none=True).items():
+            statement = statement.where(getattr(self.model, key) == value)
+        columns = [getattr(self.model, key) for key in self.pagination_keys]
+        page = await paginate(session, statement, columns, limit, cursor)
+
+        if expand:
+            page["items"] = [self.expanded(instance, expand) for instance in page["items"]]
+        elif self.versioned:
+            etag = page_etag(page["items"], page["next_cursor"])
+            if etag_matches(request.headers.get("If-None-Match"), etag):
+                raise not_modified(etag)
+            request.state.etag = etag
+        return page
+
+    def register_retrieve_action(self, *args, **kwargs):
+        async def retrieve(
+                request: Request,
+                id: self.identifier_type,  # type: ignore
+                expand: tuple[str, ...] = Depends(self.get_expand()),
+                session: AsyncSession = Depends(self.get_session),
+                authentication: Authentication = Depends(self.get_authentication)  # type: ignore
+        ) -> self.retrieve_response_schema:  # type: ignore
+            logger.info(f"Received a request to retrieve an entity of type {self.model} with id {id}")
+            try:
+                response = await self.perform_retrieve(
+                    id=id, session=session, request=request, authentication=authentication, expand=expand,
+                    *args, **kwargs
+                )
+            except HTTPException as e:
+                raise e
+            except Exception as e:
+                logger.error(f"Error when retrieving an object of type {self.model}: {e}")
+                raise e
+            logger.info(f"An object of type {self.model} with id {id} was successfully retrieved: {response}")
+            if settings.FAST_RESPONSES_ENABLED:
+                return fast_response(self.retrieve_response_schema, response, exclude_unset=bool(self.expandable))
+            return response
+
+        # Relations which were not expanded are left out of the response instead of being rendered as null
+        self.api_router.get(
+            path=self.retrieve_url_pattern, response_model=self.retrieve_response_schema,
+            response_model_exclude_unset=bool(self.expandable), status_code=status.HTTP_200_OK
+        )(retrieve)
+
+    def register_list_action(self, *args, **kwargs):
+        self.list_response_schema = PageSchema[self.retrieve_response_schema]  # type: ignore
+
+        async def list(
+                request: Request,
+                limit: int = Query(default=settings.PAGINATION_DEFAULT_LIMIT, ge=1, le=settings.PAGINATION_MAX_LIMIT),
+                cursor: Optional[str] = None,
+                filters: self.list_filter_schema = Depends(),  # type: ignore
+                expand: tuple[str, ...] = Depends(self.get_expand()),
+                session: AsyncSession = Depends(self.get_session),
+                authentication: Authentication = Depends(self.get_authentication)  # type: ignore
+        ) -> self.list_response_schema:  # type: ignore
+            logger.info(f"Received a request to get a page of entities of type {self.model}")
+            try:
+                response = await self.perform_list(
+                    session=session, limit=limit, cursor=cursor, filters=filters, request=request,
+                    authentication=authentication, expand=expand, *args, **kwargs
+                )
+            except HTTPException as e:
+                raise e
+            except Exception as e:
+                logger.error(f"Error when getting a page of objects of type {self.model}: {e}")
+                raise e
+            logger.info(f"Page of objects of type {self.model} was successfully received")
+            if settings.FAST_RESPONSES_ENABLED:
+                return fast_response(self.list_response_schema, response, exclude_unset=bool(self.expandable))
+            return response
+
+        self.api_router.get(
+            path=self.list_url_pattern, response_model=self.list_response_schema,
+            response_model_exclude_unset=bool(self.expandable), status_code=status.HTTP_200_OK
+        )(list)
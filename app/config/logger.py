@@ -1,5 +1,7 @@
 from pydantic import BaseModel
 
+from app.config.settings import settings
+
 
 class LoggerConfig(BaseModel):
     """Logging configuration to be set for the server"""
@@ -16,12 +18,18 @@ class LoggerConfig(BaseModel):
             "fmt": LOG_FORMAT,
             "datefmt": "%Y-%m-%d %H:%M:%S",
         },
+        "json": {
+            "()": "app.core.log_queue.JsonFormatter",
+            "datefmt": "%Y-%m-%dT%H:%M:%S",
+        },
     }
+    # Records are formatted and written on a background thread, see `app/core/log_queue.py`
     handlers = {
         "default": {
-            "formatter": "default",
-            "class": "logging.StreamHandler",
+            "formatter": "json" if settings.LOG_JSON else "default",
+            "()": "app.core.log_queue.QueueLogHandler",
             "stream": "ext://sys.stderr",
+            "max_size": settings.LOG_QUEUE_SIZE,
         },
     }
     loggers = {
@@ -8,7 +8,7 @@ Pydantic priority ordering:
 2. `.env` file in root folder of project
 3. Default values
 
-For project name, version, description we use pyproject.toml
+For project name, version, description we use pyproject.toml, read on first use (see `project_metadata`)
 For the rest, we use file `.env` (gitignored), see `.env.example`
 
 `DEFAULT_SQLALCHEMY_DATABASE_URI` and `TEST_SQLALCHEMY_DATABASE_URI`:
@@ -21,14 +21,28 @@ See https://pydantic-docs.helpmanual.io/usage/settings/
 Note, complex types like lists are read as json-encoded strings.
 """
 
+from functools import cache
 from pathlib import Path
-from typing import Literal
+from typing import Literal, Optional
 
-import toml
 from pydantic import BaseSettings, AnyHttpUrl
 
 PROJECT_DIR = Path(__file__).parent.parent.parent
-PYPROJECT_CONTENT = toml.load(f"{PROJECT_DIR}/pyproject.toml")["tool"]["poetry"]
+
+
+@cache
+def project_metadata() -> dict:
+    """
+    The [tool.poetry] table of pyproject.toml. Only the OpenAPI schema needs it, which the startup warm-up
+    builds, so importing and running the TOML parser is left out of the import of the settings.
+    """
+    try:
+        import tomllib
+    except ModuleNotFoundError:  # Python < 3.11
+        import toml as tomllib
+
+    with open(PROJECT_DIR / "pyproject.toml") as file:
+        return tomllib.loads(file.read())["tool"]["poetry"]
 
 
 class Settings(BaseSettings):
@@ -37,10 +51,10 @@ class Settings(BaseSettings):
     BACKEND_CORS_ORIGINS: list[AnyHttpUrl] = []
     ALLOWED_HOSTS: list[str] = ["localhost", "127.0.0.1"]
 
-    # PROJECT NAME, VERSION AND DESCRIPTION
-    PROJECT_NAME: str = PYPROJECT_CONTENT["name"]
-    VERSION: str = PYPROJECT_CONTENT["version"]
-    DESCRIPTION: str = PYPROJECT_CONTENT["description"]
+    # PROJECT NAME, VERSION AND DESCRIPTION, taken from `project_metadata` unless set
+    PROJECT_NAME: Optional[str] = None
+    VERSION: Optional[str] = None
+    DESCRIPTION: Optional[str] = None
 
     # POSTGRESQL DEFAULT DATABASE
     DATABASE_HOSTNAME: str = "localhost"
@@ -49,6 +63,127 @@ class Settings(BaseSettings):
     DATABASE_PORT: str = "5432"
     DATABASE_DB: str = "postgres"
     DATABASE_URI: str = f"postgresql+asyncpg://{DATABASE_USER}:{DATABASE_PASSWORD}@{DATABASE_HOSTNAME}:{DATABASE_PORT}/{DATABASE_DB}"
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_TIMEOUT: float = 30.0
+    # Connections opened at startup, at most `DATABASE_POOL_SIZE`
+    DATABASE_POOL_PREWARM: int = 5
+
+    # READ REPLICAS, safe requests are routed to them when configured
+    DATABASE_REPLICA_URIS: list[str] = []
+    DATABASE_REPLICA_CONNECT_TIMEOUT: float = 2.0
+    DATABASE_REPLICA_HEALTH_CHECK_INTERVAL: float = 5.0
+    # Replicas lagging behind the primary by more seconds are not used
+    DATABASE_REPLICA_MAX_LAG: float = 10.0
+    # Requests of a client go to the primary for this many seconds after its last write
+    DATABASE_REPLICA_STICKINESS: float = 5.0
+    DATABASE_REPLICA_STICKINESS_MAX_CLIENTS: int = 100_000
+
+    # PAGINATION
+    PAGINATION_DEFAULT_LIMIT: int = 100
+    PAGINATION_MAX_LIMIT: int = 1000
+
+    # AUTHENTICATION TOKEN CACHE
+    AUTH_TOKEN_CACHE_ENABLED: bool = True
+    AUTH_TOKEN_CACHE_TTL: float = 60.0
+    AUTH_TOKEN_CACHE_MISS_TTL: float = 5.0
+    AUTH_TOKEN_CACHE_MAX_SIZE: int = 10_000
+
+    # CACHE INVALIDATION, rows changed by one worker are evicted from the caches of every worker via LISTEN/NOTIFY
+    CACHE_INVALIDATION_ENABLED: bool = True
+    CACHE_INVALIDATION_CHANNEL: str = "cache_invalidation"
+    # Notifications arriving within this many seconds are evicted together
+    CACHE_INVALIDATION_COALESCE_DELAY: float = 0.01
+    # Beyond this many pending invalidations the caches are flushed instead
+    CACHE_INVALIDATION_MAX_PENDING: int = 10_000
+    CACHE_INVALIDATION_RECONNECT_DELAY: float = 1.0
+    # The listening connection is checked this often, so that a silently dropped connection is noticed
+    CACHE_INVALIDATION_KEEPALIVE_INTERVAL: float = 30.0
+
+    # RATE LIMITS, token bucket per authentication token: sustained requests per second and burst size
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_RATE: float = 50.0
+    RATE_LIMIT_BURST: int = 100
+    # Limits of the tokens with these titles, e.g. '{"bot": [5, 10]}', a rate of 0 disables the limit
+    RATE_LIMIT_BY_TITLE: dict[str, tuple[float, int]] = {}
+
+    # LOAD SHEDDING, requests are rejected with 503 when they would wait longer for a database connection
+    LOAD_SHEDDING_ENABLED: bool = True
+    LOAD_SHEDDING_MAX_WAIT: float = 1.0
+
+    # RESPONSES, JSON is rendered with orjson and the CRUD routers build their responses without re-validation
+    FAST_RESPONSES_ENABLED: bool = False
+
+    # SINGLE-FLIGHT READS, concurrent reads of the same entity share one query
+    SINGLE_FLIGHT_ENABLED: bool = True
+
+    # REMINDER SCHEDULER
+    REMINDER_SCHEDULER_BATCH_SIZE: int = 1000
+    REMINDER_SCHEDULER_LOOKAHEAD: int = 1000
+    REMINDER_SCHEDULER_MAX_SLEEP: float = 30.0
+
+    # NOTIFICATION OUTBOX
+    NOTIFICATION_BATCH_SIZE: int = 1000
+    NOTIFICATION_CONCURRENCY: int = 100
+    # Token bucket per recipient: sustained notifications per second and burst size
+    NOTIFICATION_RECIPIENT_RATE: float = 1.0
+    NOTIFICATION_RECIPIENT_BURST: int = 3
+    NOTIFICATION_MAX_ATTEMPTS: int = 8
+    NOTIFICATION_BACKOFF_BASE: float = 5.0
+    NOTIFICATION_BACKOFF_MAX: float = 3600.0
+    # Claimed notifications are retried by any dispatcher once the lease expires
+    NOTIFICATION_LEASE: float = 300.0
+    NOTIFICATION_POLL_INTERVAL: float = 1.0
+
+    # PAYMENT CALENDAR
+    CALENDAR_MAX_WINDOW_DAYS: int = 400
+    CALENDAR_CHUNK_SIZE: int = 10_000
+
+    # PAYMENT PARTITIONS
+    # Monthly partitions of `inter_user_payment` are created this many months ahead
+    PARTITION_MONTHS_AHEAD: int = 3
+    PARTITION_MAINTENANCE_INTERVAL: float = 3600.0
+    # Completed payments created this many months before the current month are archived, 0 disables archival
+    PAYMENT_ARCHIVE_AFTER_MONTHS: int = 0
+    PAYMENT_ARCHIVE_BATCH_SIZE: int = 10_000
+
+    # SEARCH, titles and usernames also match when a word of them is similar to the query by at least this much
+    SEARCH_SIMILARITY_THRESHOLD: float = 0.5
+
+    # EXCHANGE RATES, of one unit of a currency in the base currency, reloaded from the table this often
+    EXCHANGE_RATE_BASE_CURRENCY: str = "RUB"
+    EXCHANGE_RATE_REFRESH_INTERVAL: float = 300.0
+
+    # REPORTS, monthly reports span at most this many months
+    REPORT_MAX_MONTHS: int = 36
+
+    # PAYMENT EXPORT
+    EXPORT_CHUNK_SIZE: int = 5_000
+
+    # PAYMENT IMPORT, records are validated and copied into the staging table in batches of this size
+    PAYMENT_IMPORT_BATCH_SIZE: int = 10_000
+
+    # USER BULK UPSERT
+    USER_BULK_UPSERT_MAX_SIZE: int = 10_000
+    USER_BULK_UPSERT_CHUNK_SIZE: int = 5_000
+
+    # DEBT SETTLEMENT
+    SETTLEMENT_MAX_USERS: int = 10_000
+    SETTLEMENT_EXACT_MAX_USERS: int = 12
+
+    # LOGGING
+    # Log records as JSON objects instead of text lines
+    LOG_JSON: bool = False
+    # Records waiting to be written, further records are dropped
+    LOG_QUEUE_SIZE: int = 10_000
+
+    # METRICS
+    METRICS_ENABLED: bool = True
+    # Serve the metrics endpoints without a token, only for workers whose listener is not reachable publicly
+    METRICS_PUBLIC: bool = False
+
+    # STARTUP
+    STARTUP_WARMUP_ENABLED: bool = True
 
     class Config:
         case_sensitive = True
@@ -0,0 +1,97 @@
+"""
+Admission control: token bucket rate limits and load shedding.
+
+Both work per worker process. Rate limits keep a single client from taking the capacity of everyone else,
+load shedding rejects requests early when the database connection pool is saturated, so that clients retry
+later instead of waiting for a connection until the pool timeout.
+"""
+
+import math
+import time
+from typing import Hashable, Optional
+
+from app.core.session import PoolMetrics
+
+
+class RateLimiter:
+    """Token bucket per key, buckets which refilled completely are dropped by `prune`"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.buckets: dict[Hashable, tuple[float, float]] = {}
+
+    def acquire(self, key: Hashable, now: float) -> float:
+        """Takes a token, returns 0 on success or the number of seconds until a token is available"""
+        tokens, updated = self.buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens >= 1:
+            self.buckets[key] = (tokens - 1, now)
+            return 0.0
+        self.buckets[key] = (tokens, now)
+        return (1 - tokens) / self.rate
+
+    def prune(self, now: float) -> None:
+        full = self.burst / self.rate
+        self.buckets = {key: bucket for key, bucket in self.buckets.items() if now - bucket[1] < full}
+
+
+class TitleRateLimiter:
+    """
+    Token bucket per key with the rate and burst of its title, titles without limits of their own share
+    the default ones. A rate of 0 disables the limit.
+    """
+
+    PRUNE_INTERVAL = 60.0
+
+    def __init__(self, rate: float, burst: int, by_title: dict[str, tuple[float, int]]):
+        self.default = RateLimiter(rate, burst)
+        self.by_title = {title: RateLimiter(*limits) for title, limits in by_title.items()}
+        self.rejected = 0
+
+        self._pruned = time.monotonic()
+
+    def acquire(self, key: Hashable, title: str, now: Optional[float] = None) -> float:
+        now = time.monotonic() if now is None else now
+        if now - self._pruned >= self.PRUNE_INTERVAL:
+            for limiter in (self.default, *self.by_title.values()):
+                if limiter.rate:
+                    limiter.prune(now)
+            self._pruned = now
+
+        limiter = self.by_title.get(title, self.default)
+        if not limiter.rate:
+            return 0.0
+        if wait := limiter.acquire(key, now):
+            self.rejected += 1
+        return wait
+
+
+class LoadShedder:
+    """
+    Rejects requests which would wait for a database connection for longer than `max_wait` seconds.
+
+    With every connection of the pool in use, a new request waits until the requests already waiting
+    and itself got a connection. Connections are handed over at about `capacity / hold time` per second,
+    so the wait is estimated from the number of waiting requests and the average time a connection is held.
+    The estimate follows the workload: the slower the queries get, the fewer waiting requests are accepted.
+    """
+
+    def __init__(self, pool_metrics: PoolMetrics, max_wait: float):
+        self.pool_metrics = pool_metrics
+        self.max_wait = max_wait
+        self.rejected = 0
+
+    def expected_wait(self) -> float:
+        pool = self.pool_metrics.pool
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        if pool.checkedout() < capacity:
+            return 0.0
+        return (self.pool_metrics.waiting + 1) * self.pool_metrics.hold_time / capacity
+
+    def retry_after(self) -> Optional[int]:
+        """Seconds after which a rejected request should be retried, None when the request is admitted"""
+        if (wait := self.expected_wait()) <= self.max_wait:
+            return None
+        self.rejected += 1
+        return max(1, math.ceil(wait))
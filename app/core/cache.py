@@ -0,0 +1,66 @@
+"""In-process TTL/LRU caches"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Generic, Hashable, Optional, Tuple, TypeVar
+
+V = TypeVar("V")
+
+MISSING: Any = object()
+
+
+class TTLCache(Generic[V]):
+    """
+    Bounded LRU cache with per-entry expiration.
+
+    Negative results are cached too: `set_miss` remembers that a key does not exist for `miss_ttl` seconds,
+    `get` then returns `(True, None)`. A `(False, None)` result means the key is unknown and must be loaded.
+    """
+
+    def __init__(self, max_size: int, ttl: float, miss_ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.miss_ttl = ttl if miss_ttl is None else miss_ttl
+
+        self.hits = 0
+        self.misses = 0
+
+        self._data: OrderedDict[Hashable, Tuple[float, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Tuple[bool, Optional[V]]:
+        entry = self._data.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return True, None if value is MISSING else value
+            del self._data[key]
+        self.misses += 1
+        return False, None
+
+    def set(self, key: Hashable, value: V) -> None:
+        self._store(key, value, self.ttl)
+
+    def set_miss(self, key: Hashable) -> None:
+        self._store(key, MISSING, self.miss_ttl)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+    def _store(self, key: Hashable, value: Any, ttl: float) -> None:
+        if self.max_size <= 0 or ttl <= 0:
+            return
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
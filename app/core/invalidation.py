@@ -0,0 +1,225 @@
+"""
+Cache invalidation across worker processes.
+
+Every worker keeps caches of its own, e.g. of authentication tokens, which go stale when another worker changes
+a row. Rows of models built by `app.models.base.model` which are updated or deleted through an ORM session are
+published as `table:pk pk ...` notifications with `pg_notify` when the session flushes. Postgres delivers them
+only once the transaction commits, drops them when it is rolled back and collapses duplicates within it.
+Bulk `UPDATE`/`DELETE` statements and raw SQL bypass the ORM events, their callers publish the changed rows
+with `invalidation_statements`.
+
+Each worker listens on one dedicated asyncpg connection outside the pool and evicts the notified keys from the
+caches registered for the table. Notifications arriving in a burst are coalesced and evicted together, when
+too many are pending the caches are flushed instead. Notifications sent while the worker did not listen are lost,
+so the caches are flushed whenever the connection is lost and again once it is re-established.
+The worker receives its own notifications as well, which evicts entries read between its flush and its commit.
+"""
+
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Any, Callable, Hashable, Iterable, Optional, Protocol
+
+import asyncpg
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Mapper, Session, object_session
+from sqlalchemy.sql import Select
+
+from app.config.settings import settings
+from app.core.metrics import Counter, Gauge, registry
+from app.core.session import async_engine
+from app.models.base import Base
+
+logger = logging.getLogger("app.core.invalidation")
+
+# Payloads of NOTIFY must be shorter than 8000 bytes
+MAX_PAYLOAD_SIZE = 7_900
+
+CONNECTION_ERRORS = (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError)
+
+
+class Cache(Protocol):
+    def invalidate(self, key: Hashable) -> None:
+        ...
+
+    def clear(self) -> None:
+        ...
+
+
+def payloads(table: str, pks: list[str]) -> list[str]:
+    """Notification payloads of the changed primary keys of a table, split to fit the size limit"""
+    result, batch, size = [], [], len(table) + 1
+    for pk in pks:
+        if batch and size + len(pk) + 1 > MAX_PAYLOAD_SIZE:
+            result.append(f"{table}:{' '.join(batch)}")
+            batch, size = [], len(table) + 1
+        batch.append(pk)
+        size += len(pk) + 1
+    result.append(f"{table}:{' '.join(batch)}")
+    return result
+
+
+class InvalidationBus:
+    """Caches of the worker by table, kept in sync with the changes notified on `channel` while running"""
+
+    def __init__(
+            self,
+            dsn: str,
+            channel: str,
+            coalesce_delay: float,
+            max_pending: int,
+            reconnect_delay: float,
+            keepalive_interval: float,
+    ):
+        self.dsn = dsn
+        self.channel = channel
+        self.coalesce_delay = coalesce_delay
+        self.max_pending = max_pending
+        self.reconnect_delay = reconnect_delay
+        self.keepalive_interval = keepalive_interval
+        self.caches: dict[str, list[tuple[Cache, Callable[[str], Hashable]]]] = defaultdict(list)
+
+        self.connected = False
+        self.notifications = 0
+        self.evictions = 0
+        self.flushes = 0
+
+        self._pending: set[tuple[str, str]] = set()
+        self._overflowed = False
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, table: str, cache: Cache, key: Callable[[str], Hashable] = str) -> None:
+        """Evicts the rows of `table` from `cache`, `key` turns the notified primary key into the cache key"""
+        self.caches[table].append((cache, key))
+
+    def evict(self, table: str, pk: str) -> None:
+        for cache, key in self.caches.get(table, ()):
+            cache.invalidate(key(pk))
+            self.evictions += 1
+
+    def flush(self) -> None:
+        self._pending.clear()
+        self._overflowed = False
+        for caches in self.caches.values():
+            for cache, _ in caches:
+                cache.clear()
+        self.flushes += 1
+
+    def receive(self, payload: str) -> None:
+        table, _, pks = payload.partition(":")
+        self.notifications += 1
+        if self._overflowed or len(self._pending) >= self.max_pending:
+            self._overflowed = True
+        else:
+            self._pending.update((table, pk) for pk in pks.split())
+        self._wakeup.set()
+
+    async def evict_pending(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(self.coalesce_delay)
+            self._wakeup.clear()
+            if self._overflowed:
+                self.flush()
+                continue
+            pending, self._pending = self._pending, set()
+            for table, pk in pending:
+                self.evict(table, pk)
+
+    async def listen(self) -> None:
+        """Listens until the connection is lost"""
+        connection = await asyncpg.connect(self.dsn, timeout=self.keepalive_interval)
+        try:
+            lost = asyncio.get_running_loop().create_future()
+            connection.add_termination_listener(lambda _: lost.done() or lost.set_result(None))
+            await connection.add_listener(self.channel, lambda _, pid, channel, payload: self.receive(payload))
+            self.connected = True
+            # Changes committed before the connection listened were not notified
+            self.flush()
+            while not lost.done():
+                try:
+                    await asyncio.wait_for(asyncio.shield(lost), self.keepalive_interval)
+                except asyncio.TimeoutError:
+                    await connection.execute("SELECT 1", timeout=self.keepalive_interval)
+        finally:
+            self.connected = False
+            connection.terminate()
+
+    async def run(self) -> None:
+        evictions = asyncio.create_task(self.evict_pending())
+        try:
+            while True:
+                try:
+                    await self.listen()
+                    logger.warning("Cache invalidation connection was closed")
+                except CONNECTION_ERRORS as e:
+                    logger.warning(f"Cache invalidation connection failed: {e!r}")
+                self.flush()
+                await asyncio.sleep(self.reconnect_delay)
+        finally:
+            evictions.cancel()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def collect(self) -> list:
+        connected = Gauge("cache_invalidation_connected", "Whether the worker listens for cache invalidations")
+        connected.set(int(self.connected))
+        metrics: list[Any] = [connected]
+        for name, documentation, value in (
+                ("notifications", "Cache invalidation notifications received", self.notifications),
+                ("evictions", "Cache entries evicted by invalidation notifications", self.evictions),
+                ("flushes", "Flushes of every cache after a lost connection or a burst of invalidations", self.flushes),
+        ):
+            counter = Counter(f"cache_invalidation_{name}_total", documentation)
+            counter.inc(amount=value)
+            metrics.append(counter)
+        return metrics
+
+
+invalidation_bus = InvalidationBus(
+    async_engine.url.set(drivername="postgresql").render_as_string(hide_password=False),
+    channel=settings.CACHE_INVALIDATION_CHANNEL,
+    coalesce_delay=settings.CACHE_INVALIDATION_COALESCE_DELAY,
+    max_pending=settings.CACHE_INVALIDATION_MAX_PENDING,
+    reconnect_delay=settings.CACHE_INVALIDATION_RECONNECT_DELAY,
+    keepalive_interval=settings.CACHE_INVALIDATION_KEEPALIVE_INTERVAL,
+)
+registry.register_collector(invalidation_bus.collect)
+
+
+@event.listens_for(Mapper, "after_update")
+@event.listens_for(Mapper, "after_delete")
+def _record_invalidation(mapper, connection, target) -> None:
+    table = mapper.local_table.name
+    if (
+            settings.CACHE_INVALIDATION_ENABLED
+            and mapper.registry is Base
+            and table in invalidation_bus.caches
+            and (session := object_session(target)) is not None
+    ):
+        pk = ",".join(str(value) for value in mapper.primary_key_from_instance(target))
+        session.info.setdefault("invalidations", defaultdict(set))[table].add(pk)
+
+
+def invalidation_statements(table: str, pks: Iterable[str]) -> list[Select]:
+    """Statements publishing changed rows of `table`, for changes which bypass the ORM events"""
+    return [select(func.pg_notify(invalidation_bus.channel, payload)) for payload in payloads(table, sorted(pks))]
+
+
+@event.listens_for(Session, "after_flush")
+def _publish_invalidations(session: Session, flush_context) -> None:
+    for table, pks in session.info.pop("invalidations", {}).items():
+        for statement in invalidation_statements(table, pks):
+            session.connection().execute(statement)
@@ -0,0 +1,195 @@
+"""
+Non-blocking logging.
+
+`QueueLogHandler` only copies a record into a bounded queue on the calling thread, a background thread formats
+and writes it, so log calls in the event loop never wait for stderr. When the writer cannot keep up and the queue
+is full, records are dropped and counted instead of stalling the loop; the count is logged by the writer once it
+catches up and exported as `log_records_dropped_total`.
+
+Queued records are written before the process exits: `logging.shutdown`, which runs at exit, flushes and closes
+every handler, and closing the handler drains its queue.
+"""
+
+import json
+import logging
+import queue
+import threading
+import time
+import weakref
+from logging.handlers import QueueHandler
+from typing import Iterable, Optional, TextIO
+
+from app.config.settings import settings
+from app.core.metrics import Counter, registry
+
+# Attributes every record has, the others were passed in `extra`
+RECORD_ATTRIBUTES = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as a single line JSON object including the `extra` attributes"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "logger": record.name,
+            "function": record.funcName,
+            "line": record.lineno,
+            "message": record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in RECORD_ATTRIBUTES)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class QueueLogWriter:
+    """
+    Writes the queued records of a handler on a thread of its own. Whatever is queued when the thread wakes up
+    is written with one flush, and the thread lingers before taking the next batch unless the queue fills up,
+    so a steady stream of records costs few wake-ups of the thread and few writes.
+    """
+
+    BATCH_SIZE = 1_000
+    LINGER = 0.01
+
+    STOP = object()
+
+    def __init__(self, handler: "QueueLogHandler"):
+        self.handler = handler
+        self.reported = 0
+
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self.run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Writes the queued records and stops the thread"""
+        self.handler.queue.put(self.STOP)
+        self._thread.join()
+        self._thread = None
+
+    def flush(self) -> None:
+        """Waits until the records queued so far are written"""
+        written = threading.Event()
+        self.handler.queue.put(written)
+        written.wait()
+
+    def run(self) -> None:
+        items_queue = self.handler.queue
+        while True:
+            items = [items_queue.get()]
+            while len(items) < self.BATCH_SIZE:
+                try:
+                    items.append(items_queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            # Besides records, the queue carries the markers of `stop` and `flush`
+            records, flushes, stopping = [], [], False
+            for item in items:
+                if item is self.STOP:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    flushes.append(item)
+                else:
+                    records.append(item)
+            self.write(records)
+            for written in flushes:
+                written.set()
+
+            if stopping:
+                return
+            if items_queue.qsize() < self.BATCH_SIZE:
+                time.sleep(self.LINGER)
+
+    def write(self, records: list[logging.LogRecord]) -> None:
+        if (dropped := self.handler.dropped) > self.reported:
+            message = f"Dropped {dropped - self.reported} log records, the log queue was full"
+            records.append(logging.LogRecord(__name__, logging.WARNING, __file__, 0, message, None, None, "write"))
+            self.reported = dropped
+
+        target = self.handler.target
+        lines = []
+        for record in records:
+            try:
+                lines.append(target.format(record) + target.terminator)
+            except Exception:
+                target.handleError(record)
+        if not lines:
+            return
+        target.acquire()
+        try:
+            target.stream.write("".join(lines))
+            target.stream.flush()
+        except Exception:
+            target.handleError(records[-1])
+        finally:
+            target.release()
+
+
+class QueueLogHandler(QueueHandler):
+    """
+    Writes records to `stream` on a background thread, the formatter set on this handler is used there.
+    At most `max_size` records wait to be written, further records are dropped until there is room again.
+    """
+
+    instances: "weakref.WeakSet[QueueLogHandler]" = weakref.WeakSet()
+
+    def __init__(self, stream: Optional[TextIO] = None, max_size: int = settings.LOG_QUEUE_SIZE):
+        # Created first so that `logging.shutdown`, which goes through handlers in reverse order, closes it last
+        self.target = logging.StreamHandler(stream)
+        # `queue.SimpleQueue` takes a record several times faster than a bounded `queue.Queue`
+        super().__init__(queue.SimpleQueue())  # type: ignore
+        self.max_size = max_size
+        self.dropped = 0
+        self.writer = QueueLogWriter(self)
+        self.writer.start()
+        self.instances.add(self)
+
+    def setFormatter(self, fmt: Optional[logging.Formatter]) -> None:
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The arguments are merged now since they may change before the record is formatted,
+        # formatting and the traceback are left to the background thread. A copy, since other handlers get it too.
+        prepared = object.__new__(type(record))
+        prepared.__dict__ = {**vars(record), "msg": record.getMessage(), "args": None}
+        return prepared
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        # Called with the handler lock held, so the size check and the count need no lock of their own
+        if self.queue.qsize() >= self.max_size:
+            self.dropped += 1
+        else:
+            self.queue.put_nowait(record)
+
+    def flush(self) -> None:
+        """Waits until the queued records are written"""
+        if self.writer.running:
+            self.writer.flush()
+        self.target.flush()
+
+    def close(self) -> None:
+        if self.writer.running:
+            self.writer.stop()
+        self.target.close()
+        super().close()
+
+
+def collect() -> Iterable[Counter]:
+    counter = Counter("log_records_dropped_total", "Log records dropped because the log queue was full")
+    counter.inc(amount=sum(handler.dropped for handler in QueueLogHandler.instances))
+    return [counter]
+
+
+registry.register_collector(collect)
@@ -1,16 +1,318 @@
 """SQLAlchemy async engine and sessions tools"""
 
-from typing import TYPE_CHECKING
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Callable, Optional
 
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy import event, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm.session import sessionmaker
 
 from app.config.settings import settings
+from app.core.metrics import Counter, Gauge, Histogram, instrument_engine, registry
+
+logger = logging.getLogger("app.core.session")
 
 sqlalchemy_database_uri = settings.DATABASE_URI
 
-async_engine = create_async_engine(sqlalchemy_database_uri, pool_pre_ping=True)
+async_engine = create_async_engine(
+    sqlalchemy_database_uri,
+    pool_pre_ping=True,
+    pool_size=settings.DATABASE_POOL_SIZE,
+    max_overflow=settings.DATABASE_MAX_OVERFLOW,
+    pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+)
+instrument_engine(async_engine)
 async_session = sessionmaker(async_engine, expire_on_commit=False, class_=AsyncSession)  # type: ignore
 
 if TYPE_CHECKING:
     async_session: sessionmaker[AsyncSession]  # type: ignore
+
+
+class PoolMetrics:
+    """
+    Connection pool usage: live pool state plus counters and connection acquire times collected since start.
+    Acquiring a connection covers waiting for the pool as well as connecting, the pre-ping and BEGIN.
+    """
+
+    ACQUIRE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    # Weight of the latest connection in the moving average of the time connections are held
+    HOLD_TIME_WEIGHT = 0.05
+
+    def __init__(self, engine):
+        self.pool = engine.sync_engine.pool
+        self.checkouts = 0
+        self.connects = 0
+        self.waiting = 0
+        self.acquire_count = 0
+        self.acquire_sum = 0.0
+        self.acquire_max = 0.0
+        self.acquire_buckets = [0] * len(self.ACQUIRE_BUCKETS)
+        self.hold_time = 0.0
+
+        event.listen(self.pool, "checkout", self._on_checkout)
+        event.listen(self.pool, "checkin", self._on_checkin)
+        event.listen(self.pool, "connect", self._on_connect)
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        self.checkouts += 1
+        connection_record.info["checked_out"] = time.perf_counter()
+
+    def _on_checkin(self, dbapi_connection, connection_record) -> None:
+        if (checked_out := connection_record.info.pop("checked_out", None)) is not None:
+            held = time.perf_counter() - checked_out
+            self.hold_time += (held - self.hold_time) * self.HOLD_TIME_WEIGHT
+
+    def _on_connect(self, *args) -> None:
+        self.connects += 1
+
+    def record_acquire(self, seconds: float) -> None:
+        self.acquire_count += 1
+        self.acquire_sum += seconds
+        self.acquire_max = max(self.acquire_max, seconds)
+        for i, bound in enumerate(self.ACQUIRE_BUCKETS):
+            if seconds <= bound:
+                self.acquire_buckets[i] += 1
+                break
+
+    def snapshot(self) -> dict:
+        return {
+            "size": self.pool.size(),
+            "checked_out": self.pool.checkedout(),
+            "checked_in": self.pool.checkedin(),
+            "overflow": max(self.pool.overflow(), 0),
+            "max_overflow": self.pool._max_overflow,
+            "waiting": self.waiting,
+            "hold_time_seconds": self.hold_time,
+            "checkouts": self.checkouts,
+            "connects": self.connects,
+            "acquire_count": self.acquire_count,
+            "acquire_sum_seconds": self.acquire_sum,
+            "acquire_max_seconds": self.acquire_max,
+            "acquire_buckets": dict(zip(self.ACQUIRE_BUCKETS, self.acquire_buckets)),
+        }
+
+    def collect(self) -> list:
+        """Prometheus metrics built from the current snapshot"""
+        snapshot = self.snapshot()
+        metrics = []
+        for name, documentation in (
+                ("size", "Configured size of the database connection pool"),
+                ("checked_out", "Database connections in use"),
+                ("checked_in", "Idle database connections in the pool"),
+                ("overflow", "Database connections opened above the pool size"),
+                ("waiting", "Sessions waiting for a database connection"),
+        ):
+            gauge = Gauge(f"db_pool_{name}", documentation)
+            gauge.set(snapshot[name])
+            metrics.append(gauge)
+        for name, documentation in (
+                ("checkouts", "Database connection checkouts"),
+                ("connects", "Database connections opened"),
+        ):
+            counter = Counter(f"db_pool_{name}_total", documentation)
+            counter.inc(amount=snapshot[name])
+            metrics.append(counter)
+
+        acquire = Histogram(
+            "db_pool_acquire_seconds",
+            "Time spent acquiring a database connection, including connecting, the pre-ping and BEGIN",
+            buckets=self.ACQUIRE_BUCKETS,
+        )
+        acquire.values[()] = [
+            [*self.acquire_buckets, self.acquire_count - sum(self.acquire_buckets)], self.acquire_sum, self.acquire_count
+        ]
+        metrics.append(acquire)
+        return metrics
+
+
+pool_metrics = PoolMetrics(async_engine)
+registry.register_collector(pool_metrics.collect)
+
+
+# Zero when the replica has replayed everything it received, otherwise the age of the last replayed transaction
+REPLICATION_LAG = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp())
+END
+"""
+
+CONNECTION_ERRORS = (OSError, asyncio.TimeoutError, SQLAlchemyError)
+
+
+class ReplicaSet:
+    """
+    Read replica engines and their health. Replicas are checked periodically in the background
+    and marked unhealthy as soon as a connection to them fails, callers fall back to the primary
+    when no replica is healthy.
+    """
+
+    def __init__(self, uris: list[str], check_interval: float, max_lag: float, connect_timeout: float):
+        self.engines = [
+            create_async_engine(
+                uri,
+                pool_pre_ping=True,
+                pool_size=settings.DATABASE_POOL_SIZE,
+                max_overflow=settings.DATABASE_MAX_OVERFLOW,
+                pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+                connect_args={"timeout": connect_timeout},
+            )
+            for uri in uris
+        ]
+        for engine in self.engines:
+            instrument_engine(engine)
+        self.check_interval = check_interval
+        self.max_lag = max_lag
+        self.healthy = [True] * len(self.engines)
+        self.lag: list[Optional[float]] = [None] * len(self.engines)
+
+        self._next = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def choose(self) -> Optional[AsyncEngine]:
+        """Next healthy replica in round-robin order"""
+        for offset in range(len(self.engines)):
+            index = (self._next + offset) % len(self.engines)
+            if self.healthy[index]:
+                self._next = index + 1
+                return self.engines[index]
+        return None
+
+    def set_health(self, index: int, healthy: bool, reason: str = "") -> None:
+        if self.healthy[index] != healthy:
+            state = "healthy" if healthy else f"unhealthy: {reason}"
+            getattr(logger, "info" if healthy else "warning")(f"Read replica {index} is {state}")
+        self.healthy[index] = healthy
+
+    def mark_unhealthy(self, engine: AsyncEngine, error: Exception) -> None:
+        self.set_health(self.engines.index(engine), False, repr(error))
+
+    async def check(self, index: int) -> None:
+        try:
+            async with self.engines[index].connect() as connection:
+                lag = (await connection.execute(text(REPLICATION_LAG))).scalar()
+        except CONNECTION_ERRORS as e:
+            self.lag[index] = None
+            self.set_health(index, False, repr(e))
+            return
+        self.lag[index] = float(lag or 0)
+        self.set_health(index, self.lag[index] <= self.max_lag, f"lag is {self.lag[index]:.1f}s")
+
+    async def check_all(self) -> None:
+        await asyncio.gather(*(self.check(index) for index in range(len(self.engines))))
+
+    async def run_health_checks(self) -> None:
+        while True:
+            await self.check_all()
+            await asyncio.sleep(self.check_interval)
+
+    def start(self) -> None:
+        if self.engines and self._task is None:
+            self._task = asyncio.create_task(self.run_health_checks())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for engine in self.engines:
+            await engine.dispose()
+
+    def snapshot(self) -> list[dict]:
+        return [
+            {"healthy": healthy, "lag_seconds": lag, "checked_out": engine.sync_engine.pool.checkedout()}
+            for engine, healthy, lag in zip(self.engines, self.healthy, self.lag)
+        ]
+
+    def collect(self) -> list:
+        healthy = Gauge("db_replica_healthy", "Whether the read replica is used", ("replica",))
+        lag = Gauge("db_replica_lag_seconds", "Replication lag measured by the last health check", ("replica",))
+        for index, state in enumerate(self.snapshot()):
+            healthy.set(int(state["healthy"]), (str(index),))
+            if state["lag_seconds"] is not None:
+                lag.set(state["lag_seconds"], (str(index),))
+        return [healthy, lag]
+
+
+replica_set = ReplicaSet(
+    settings.DATABASE_REPLICA_URIS,
+    check_interval=settings.DATABASE_REPLICA_HEALTH_CHECK_INTERVAL,
+    max_lag=settings.DATABASE_REPLICA_MAX_LAG,
+    connect_timeout=settings.DATABASE_REPLICA_CONNECT_TIMEOUT,
+)
+if replica_set.engines:
+    registry.register_collector(replica_set.collect)
+
+
+class LazySession:
+    """
+    Stand-in for `AsyncSession` which creates the session only when it is first used and checks out
+    a pool connection only for the first statement. `release` returns the connection to the pool
+    as soon as the caller is done with the database, the session can still be used afterwards.
+
+    Read-only sessions are bound to a healthy read replica when there is one, and are moved
+    to the primary when connecting to the replica fails.
+    """
+
+    CONNECTING_METHODS = frozenset(
+        ("execute", "scalar", "scalars", "stream", "stream_scalars", "get", "merge", "refresh", "flush", "commit")
+    )
+
+    def __init__(self, session_factory: Callable[..., AsyncSession] = async_session, read_only: bool = False):
+        self._session_factory = session_factory
+        self._session: Optional[AsyncSession] = None
+        self._replica: Optional[AsyncEngine] = None
+        self.read_only = read_only
+
+    @property
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            self._replica = replica_set.choose() if self.read_only else None
+            self._session = self._session_factory(bind=self._replica) if self._replica else self._session_factory()
+        return self._session
+
+    @property
+    def on_replica(self) -> bool:
+        return self._replica is not None
+
+    @property
+    def is_active(self) -> bool:
+        return self._session is not None
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self.session, name)
+        if name not in self.CONNECTING_METHODS:
+            return attribute
+
+        async def connected(*args, **kwargs):
+            await self._connect()
+            # The session may have been replaced when its replica was unavailable
+            return await getattr(self.session, name)(*args, **kwargs)
+
+        return connected
+
+    async def _connect(self) -> None:
+        if not self.session.in_transaction():
+            started = time.perf_counter()
+            # Only waits for a connection of the primary, which load shedding is based on
+            waiting = 0 if self.on_replica else 1
+            pool_metrics.waiting += waiting
+            try:
+                await self.session.connection()
+            except CONNECTION_ERRORS as e:
+                if self._replica is None:
+                    raise
+                replica_set.mark_unhealthy(self._replica, e)
+                await self.release()
+                self.read_only = False
+                await self.session.connection()
+            finally:
+                pool_metrics.waiting -= waiting
+            pool_metrics.record_acquire(time.perf_counter() - started)
+
+    async def release(self) -> None:
+        if self._session is not None:
+            session, self._session = self._session, None
+            await session.close()
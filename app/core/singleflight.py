@@ -0,0 +1,123 @@
+"""
+Single-flight reads.
+
+Concurrent identical reads share one call and its outcome: the first caller runs the call itself and every
+caller with the same key which comes while it is in flight waits for its outcome, so a burst of requests for
+the same entity costs one query. Nothing is cached once the call has finished.
+
+A waiting caller which is cancelled stops waiting without affecting the others. When the caller running
+the call is cancelled, the call is cancelled with it and the waiting callers start over, so a call never
+outlives its caller and may use the caller's resources, e.g. its database session. Exceptions of the call
+are raised to every caller.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Generic, Hashable, Optional, Type, TypeVar
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Mapper, Session, object_session
+
+V = TypeVar("V")
+
+
+class Abandoned(Exception):
+    """Outcome of a flight whose caller was cancelled before the call finished"""
+
+
+class Flight:
+    def __init__(self):
+        self.outcome: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class SingleFlight(Generic[V]):
+    def __init__(self):
+        self.calls = 0
+        self.shared = 0
+
+        self._flights: dict[Hashable, Flight] = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[V]]) -> V:
+        """Result of `func`, or of the call of another caller with the same key which is still in flight"""
+        self.calls += 1
+        if key in self._flights:
+            self.shared += 1
+        while (flight := self._flights.get(key)) is not None:
+            try:
+                return await asyncio.shield(flight.outcome)
+            except Abandoned:
+                continue
+
+        flight = self._flights[key] = Flight()
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            self._finish(key, flight, Abandoned())
+            raise
+        except Exception as e:
+            self._finish(key, flight, e)
+            raise
+        self._finish(key, flight, result=result)
+        return result
+
+    def forget(self, key: Hashable) -> None:
+        """Callers from now on start a new flight, e.g. after the data was changed, current callers are not affected"""
+        self._flights.pop(key, None)
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._flights), "calls": self.calls, "shared": self.shared}
+
+    def _finish(self, key: Hashable, flight: Flight, error: Optional[BaseException] = None, result: Any = None) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if error is None:
+            flight.outcome.set_result(result)
+        else:
+            flight.outcome.set_exception(error)
+            # Marks the exception as retrieved when no caller waits for it
+            flight.outcome.exception()
+
+
+entity_reads: SingleFlight[Any] = SingleFlight()
+
+
+async def load_entity(model: Type[V], id: Any, session: AsyncSession) -> Optional[V]:
+    """
+    Loads an entity by its `id` with concurrent loads of the same entity sharing one query.
+    The query runs in the session of the caller which starts it, so a load takes no connection besides
+    the one of that caller. Loads are shared only between sessions of the same kind, read-only sessions
+    may read from a replica. Loaded instances are detached, shared between the callers and must not be modified.
+    """
+
+    async def load() -> Optional[V]:
+        instance = (await session.execute(select(model).where(model.id == id))).scalars().first()  # type: ignore
+        if instance is not None:
+            session.expunge(instance)
+        return instance
+
+    return await entity_reads.do((model, id, getattr(session, "read_only", False)), load)
+
+
+def forget_entity(model: type, id: Any) -> None:
+    for read_only in (False, True):
+        entity_reads.forget((model, id, read_only))
+
+
+# Reads which start after a change must not join a flight which started before it: flights are forgotten
+# when the change is flushed, and once more when it is committed since a flight may start in between.
+@event.listens_for(Mapper, "after_update")
+@event.listens_for(Mapper, "after_delete")
+def _forget_changed_entity(mapper, connection, target) -> None:
+    key = (mapper.class_, getattr(target, "id", None))
+    forget_entity(*key)
+    if (session := object_session(target)) is not None:
+        session.info.setdefault("changed_entities", set()).add(key)
+
+
+@event.listens_for(Session, "after_commit")
+def _forget_committed_entities(session: Session) -> None:
+    for key in session.info.pop("changed_entities", ()):
+        forget_entity(*key)
@@ -0,0 +1,56 @@
+"""Helpers for streamed responses"""
+
+import csv
+import io
+import json
+import zlib
+from typing import Any, AsyncIterator, Sequence
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+CSV_MEDIA_TYPE = "text/csv"
+
+
+def ndjson_line(item: Any) -> bytes:
+    return (json.dumps(item, default=str, separators=(",", ":")) + "\n").encode()
+
+
+def csv_lines(rows: Sequence[Sequence[Any]]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode()
+
+
+async def gzip_stream(chunks: AsyncIterator[bytes], level: int = 6) -> AsyncIterator[bytes]:
+    """Compresses a byte stream on the fly into a single gzip member"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        if compressed := compressor.compress(chunk):
+            yield compressed
+    yield compressor.flush()
+
+
+async def gunzip_stream(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Decompresses a gzip byte stream on the fly"""
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        if decompressed := decompressor.decompress(chunk):
+            yield decompressed
+    yield decompressor.flush()
+
+
+async def complete_records(chunks: AsyncIterator[bytes], quoted: bool = False) -> AsyncIterator[bytes]:
+    """
+    Regroups a byte stream of newline separated records into blocks which end with a complete record.
+    With `quoted`, newlines within double quotes do not end a record, like in CSV.
+    """
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        end = buffer.rfind(b"\n")
+        while quoted and end >= 0 and buffer.count(b'"', 0, end) % 2:
+            end = buffer.rfind(b"\n", 0, end)
+        if end >= 0:
+            block, buffer = buffer[:end + 1], buffer[end + 1:]
+            yield block
+    if buffer:
+        yield buffer
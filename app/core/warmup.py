@@ -0,0 +1,88 @@
+"""
+Startup warm-up, run before the worker accepts traffic.
+
+Everything here would otherwise happen lazily during the first requests after a deploy: mapper configuration,
+compilation of the hot statements into the SQLAlchemy compiled cache, prepared statements on every pooled
+connection, the OpenAPI schema which walks all pydantic models of the routes, and the thread pool which
+runs sync dependencies such as the list filter schemas.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from contextlib import AsyncExitStack
+
+from fastapi import FastAPI
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from sqlalchemy.orm import configure_mappers
+from starlette.concurrency import run_in_threadpool
+
+from app.config.settings import settings
+from app.core.session import async_engine
+from app.models import AuthToken, InterUserPayment, User, UserBalance
+
+logger = logging.getLogger("app.core.warmup")
+
+
+def hot_statements() -> list:
+    """Statements of the most frequent requests: token lookup, retrieval and first pages of the CRUD routers"""
+    page_size = settings.PAGINATION_DEFAULT_LIMIT + 1
+    return [
+        select(AuthToken).where(AuthToken.id == uuid.UUID(int=0)),
+        select(User).where(User.id == 0),
+        select(User).order_by(User.created, User.id).limit(page_size),
+        select(InterUserPayment).where(InterUserPayment.id == 0),
+        select(InterUserPayment).order_by(InterUserPayment.id).limit(page_size),
+        select(UserBalance).where(UserBalance.from_user_id == 0),
+    ]
+
+
+async def warm_connection(connection: AsyncConnection, statements: list) -> None:
+    session = AsyncSession(bind=connection)
+    try:
+        for statement in statements:
+            (await session.execute(statement)).scalars().all()
+    finally:
+        await session.close()
+        await connection.rollback()
+
+
+async def prewarm_pool(connections: int) -> None:
+    """Opens `connections` pool connections at once and prepares the hot statements on each of them"""
+    statements = hot_statements()
+    async with AsyncExitStack() as stack:
+        opened = await asyncio.gather(
+            *(stack.enter_async_context(async_engine.connect()) for _ in range(connections))
+        )
+        await asyncio.gather(*(warm_connection(connection, statements) for connection in opened))
+
+
+async def warm_up(app: FastAPI) -> dict[str, float]:
+    """Runs the warm-up phases, returns the duration of each in seconds"""
+    timings = {}
+
+    started = time.perf_counter()
+    configure_mappers()
+    timings["mappers"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    app.openapi()
+    timings["openapi"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    await run_in_threadpool(lambda: None)
+    timings["threadpool"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    try:
+        await prewarm_pool(min(settings.DATABASE_POOL_PREWARM, settings.DATABASE_POOL_SIZE))
+    except (OSError, SQLAlchemyError) as exception:
+        # The database may come up later, connections are then opened on demand as usual
+        logger.warning(f"Connection pool warm-up failed: {exception}")
+    timings["pool"] = time.perf_counter() - started
+
+    logger.info("Warm-up finished: " + ", ".join(f"{phase}={seconds * 1000:.1f}ms" for phase, seconds in timings.items()))
+    return timings
@@ -4,22 +4,59 @@ from logging.config import dictConfig
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
+from fastapi.responses import JSONResponse
 
 from app.api.api import api_router
+from app.api.responses import FastJSONResponse
 from app.config.logger import logger_config
-from app.config.settings import settings
+from app.config.settings import project_metadata, settings
+from app.core.invalidation import invalidation_bus
+from app.core.metrics import MetricsMiddleware
+from app.core.session import replica_set
+from app.core.warmup import warm_up
+from app.services.exchange_rates import exchange_rates
 
 dictConfig(logger_config.dict())
 
 app = FastAPI(
-    title=settings.PROJECT_NAME,
-    version=settings.VERSION,
-    description=settings.DESCRIPTION,
     openapi_url="/openapi.json",
     docs_url="/docs",
+    default_response_class=FastJSONResponse if settings.FAST_RESPONSES_ENABLED else JSONResponse,
 )
 app.include_router(api_router)
 
+
+def openapi() -> dict:
+    """OpenAPI schema of the app, which is named after the project when the schema is first built"""
+    if app.openapi_schema is None:
+        metadata = project_metadata()
+        app.title = settings.PROJECT_NAME or metadata["name"]
+        app.version = settings.VERSION or metadata["version"]
+        app.description = settings.DESCRIPTION or metadata["description"]
+    return FastAPI.openapi(app)
+
+
+app.openapi = openapi  # type: ignore
+
+
+@app.on_event("startup")
+async def startup():
+    # Uvicorn starts accepting connections only after the startup handlers have finished
+    if settings.STARTUP_WARMUP_ENABLED:
+        await warm_up(app)
+    replica_set.start()
+    if settings.CACHE_INVALIDATION_ENABLED:
+        invalidation_bus.start()
+    exchange_rates.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await exchange_rates.stop()
+    await invalidation_bus.stop()
+    await replica_set.stop()
+
+
 # Sets all CORS enabled origins
 app.add_middleware(
     CORSMiddleware,
@@ -31,3 +68,7 @@ app.add_middleware(
 
 # Guards against HTTP Host Header attacks
 app.add_middleware(TrustedHostMiddleware, allowed_hosts=settings.ALLOWED_HOSTS)
+
+# Records per-route request metrics, outermost so that it also measures the other middlewares
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, routes=app.routes)
@@ -1,4 +1,7 @@
 from .authorization import AuthToken
-from .payment import Payment, InterUserPayment
+from .balance import UserBalance
+from .exchange_rate import ExchangeRate
+from .outbox import OutboxNotification
+from .payment import Payment, InterUserPayment, InterUserPaymentArchive
 from .reminder import Reminder
 from .user import User
@@ -0,0 +1,22 @@
+from dataclasses import field
+from decimal import Decimal
+
+from sqlalchemy import Column, Integer, Numeric, Index
+from sqlalchemy_utils import CurrencyType
+
+from app.models.base import model
+
+
+@model()
+class UserBalance:
+    """
+    Open debt of `from_user_id` to `to_user_id` in a currency, maintained by database triggers
+    on `inter_user_payment` and `payment`, see `app/services/ledger.py`
+    """
+
+    from_user_id: int = field(metadata={"sa": Column(Integer, primary_key=True)})
+    to_user_id: int = field(metadata={"sa": Column(Integer, primary_key=True)})
+    currency: str = field(metadata={"sa": Column(CurrencyType, primary_key=True)})
+    amount: Decimal = field(default=Decimal(0), metadata={"sa": Column(Numeric(20, 4), default=0, nullable=False)})
+
+    __table_args__ = (Index("ix_user_balance_to_user_id", "to_user_id"),)
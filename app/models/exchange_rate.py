@@ -0,0 +1,15 @@
+from dataclasses import field
+from decimal import Decimal
+
+from sqlalchemy import Column, Numeric
+from sqlalchemy_utils import CurrencyType
+
+from app.models.base import model, TimestampableMixin
+
+
+@model()
+class ExchangeRate(TimestampableMixin):
+    """Value of one unit of `currency` in `EXCHANGE_RATE_BASE_CURRENCY`, see `app/services/exchange_rates.py`"""
+
+    currency: str = field(metadata={"sa": Column(CurrencyType, primary_key=True)})
+    rate: Decimal = field(metadata={"sa": Column(Numeric(20, 10), nullable=False)})
@@ -0,0 +1,45 @@
+from dataclasses import field
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, Text, text
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app.models.base import model, IdentifiableMixin
+
+
+@model()
+class OutboxNotification(IdentifiableMixin):
+    """
+    Notification written in the same transaction as the state change it reports,
+    delivered later by the dispatcher, see `app/services/notifications.py`
+    """
+
+    PENDING = "pending"
+    DELIVERED = "delivered"
+    FAILED = "failed"
+
+    DUE_PAYMENT = "due_payment"
+
+    recipient_id: int = field(
+        metadata={"sa": Column(ForeignKey("user.id", ondelete="CASCADE"), nullable=False, index=True)}
+    )
+    kind: str = field(metadata={"sa": Column(String(32), nullable=False)})
+    payload: dict = field(metadata={"sa": Column(JSONB, nullable=False)})
+    next_attempt_at: datetime = field(metadata={"sa": Column(DateTime, nullable=False)})
+
+    # Not a foreign key, the partitioned `inter_user_payment` can only be referenced together with `created`.
+    # Notifications of deleted payments are removed by a trigger instead.
+    inter_user_payment_id: Optional[int] = field(default=None, metadata={"sa": Column(Integer, index=True)})
+    status: str = field(default=PENDING, metadata={"sa": Column(String(9), default=PENDING, nullable=False)})
+    attempts: int = field(default=0, metadata={"sa": Column(Integer, default=0, nullable=False)})
+    delivered_at: Optional[datetime] = field(default=None, metadata={"sa": Column(DateTime, nullable=True)})
+    last_error: Optional[str] = field(default=None, metadata={"sa": Column(Text, nullable=True)})
+
+    __table_args__ = (
+        Index(
+            "ix_outbox_notification_next_attempt_at_pending",
+            "next_attempt_at",
+            postgresql_where=text("status = 'pending'"),
+        ),
+    )
@@ -1,8 +1,9 @@
 from dataclasses import field
+from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import Column, String, ForeignKey, Float, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, ForeignKey, Float, Boolean, Index, Integer, DateTime, func, text
+from sqlalchemy.orm import declared_attr, relationship
 from sqlalchemy_utils import CurrencyType, PhoneNumberType
 
 from app.models.base import model, IdentifiableMixin, TimestampableMixin
@@ -22,6 +23,14 @@ class Payment(IdentifiableMixin):
 
 @model()
 class InterUserPayment(IdentifiableMixin, TimestampableMixin):
+    """
+    Partitioned by month of `created`, see `app/services/partitions.py`. The primary key has to include
+    the partition key, the mapper still identifies payments by `id` alone.
+    """
+
+    id: int = field(init=False, metadata={"sa": Column(Integer, primary_key=True, autoincrement=True, index=True)})
+    created = Column(DateTime(), server_default=func.now(), nullable=False, primary_key=True)
+
     title: str = field(metadata={"sa": Column(String(255), nullable=False, index=True)})
     from_user_id: int = field(metadata={"sa": Column(ForeignKey("user.id", ondelete="CASCADE"))})
     to_user_id: int = field(metadata={"sa": Column(ForeignKey("user.id", ondelete="CASCADE"))})
@@ -30,7 +39,50 @@ class InterUserPayment(IdentifiableMixin, TimestampableMixin):
 
     completed: bool = field(default=False, metadata={"sa": Column(Boolean, default=False, nullable=False)})
 
-    from_user: User = relationship(User, foreign_keys=[from_user_id.metadata["sa"]])  # type: ignore
-    to_user: User = relationship(User, foreign_keys=[to_user_id.metadata["sa"]])  # type: ignore
-    payment: Payment = relationship(Payment, foreign_keys=[payment_id.metadata["sa"]])  # type: ignore
-    reminder: Reminder = relationship(Reminder, foreign_keys=[reminder_id.metadata["sa"]])  # type: ignore
+    from_user = relationship(User, foreign_keys=[from_user_id.metadata["sa"]])  # type: User
+    to_user = relationship(User, foreign_keys=[to_user_id.metadata["sa"]])  # type: User
+    payment = relationship(Payment, foreign_keys=[payment_id.metadata["sa"]])  # type: Payment
+    reminder = relationship(Reminder, foreign_keys=[reminder_id.metadata["sa"]])  # type: Reminder
+
+    __table_args__ = (
+        Index("ix_inter_user_payment_from_user_id_id", "from_user_id", "id"),
+        Index("ix_inter_user_payment_to_user_id_id", "to_user_id", "id"),
+        Index("ix_inter_user_payment_reminder_id_open", "reminder_id", postgresql_where=text("NOT completed")),
+        Index(
+            "ix_inter_user_payment_title_trgm",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+        ),
+        {"postgresql_partition_by": "RANGE (created)"},
+    )
+
+    @declared_attr
+    def __mapper_args__(cls):
+        return {"primary_key": [cls.__table__.c.id]}
+
+
+@model()
+class InterUserPaymentArchive:
+    """
+    Completed inter-user payments moved out of the partitioned table by the archival job, keeping their identifiers.
+    Only the indexes needed to find the payments of a user are kept.
+    """
+
+    id: int = field(metadata={"sa": Column(Integer, primary_key=True, autoincrement=False)})
+    created: datetime = field(metadata={"sa": Column(DateTime, nullable=False)})
+    updated: datetime = field(metadata={"sa": Column(DateTime, nullable=False)})
+    title: str = field(metadata={"sa": Column(String(255), nullable=False)})
+    from_user_id: int = field(metadata={"sa": Column(ForeignKey("user.id", ondelete="CASCADE"))})
+    to_user_id: int = field(metadata={"sa": Column(ForeignKey("user.id", ondelete="CASCADE"))})
+    payment_id: int = field(metadata={"sa": Column(ForeignKey("payment.id", ondelete="CASCADE"))})
+    reminder_id: int = field(metadata={"sa": Column(ForeignKey("reminder.id", ondelete="CASCADE"))})
+
+    archived: Optional[datetime] = field(
+        default=None, metadata={"sa": Column(DateTime, server_default=func.now(), nullable=False)}
+    )
+
+    __table_args__ = (
+        Index("ix_inter_user_payment_archive_from_user_id_id", "from_user_id", "id"),
+        Index("ix_inter_user_payment_archive_to_user_id_id", "to_user_id", "id"),
+    )
@@ -2,7 +2,7 @@ from dataclasses import field
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import Column, DateTime, String
+from sqlalchemy import Column, DateTime, String, Index, text
 
 from app.models.base import model, IdentifiableMixin
 
@@ -14,6 +14,16 @@ class Reminder(IdentifiableMixin):
     MONTHLY = "monthly"
     YEARLY = "yearly"
 
+    REPEAT_TYPES = (DAILY, WEEKLY, MONTHLY, YEARLY)
+
     remind_at: datetime = field(metadata={"sa": Column(DateTime, nullable=False)})
 
     repeat: Optional[str] = field(default=None, metadata={"sa": Column(String(7))})
+    fired_at: Optional[datetime] = field(default=None, metadata={"sa": Column(DateTime, nullable=True)})
+    # First occurrence of a recurring reminder once the scheduler has moved `remind_at` past it,
+    # later occurrences are counted from it so that a day clamped to a shorter month is not carried over
+    first_remind_at: Optional[datetime] = field(default=None, metadata={"sa": Column(DateTime, nullable=True)})
+
+    __table_args__ = (
+        Index("ix_reminder_remind_at_pending", "remind_at", postgresql_where=text("fired_at IS NULL")),
+    )
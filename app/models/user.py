@@ -1,7 +1,7 @@
 from dataclasses import field
 from typing import Optional
 
-from sqlalchemy import Column, String, Integer
+from sqlalchemy import Column, String, Integer, Index
 
 from app.models.base import model, TimestampableMixin
 
@@ -18,3 +18,8 @@ class User(TimestampableMixin):
     language: str = field(default=None, metadata={"sa": Column(String(2), default="ru", nullable=False)})
 
     username: Optional[str] = field(default=None, metadata={"sa": Column(String(255), nullable=True, index=True)})
+
+    __table_args__ = (
+        Index("ix_user_created_id", "created", "id"),
+        Index("ix_user_username_trgm", "username", postgresql_using="gin", postgresql_ops={"username": "gin_trgm_ops"}),
+    )
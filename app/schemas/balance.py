@@ -0,0 +1,21 @@
+from decimal import Decimal
+
+from pydantic import BaseModel, Field, validator
+
+
+class CurrencySchema(BaseModel):
+    currency: str = Field(title="Currency", min_length=3, max_length=3)
+
+    @validator("currency", pre=True)
+    def currency_code(cls, value) -> str:
+        return str(value)
+
+
+class UserBalanceSchema(CurrencySchema):
+    from_user_id: int = Field(title="Debtor Identifier")
+    to_user_id: int = Field(title="Creditor Identifier")
+    amount: Decimal = Field(title="Open Amount")
+
+
+class PairBalanceSchema(CurrencySchema):
+    amount: Decimal = Field(title="Net Amount, negative when the counterpart is the debtor")
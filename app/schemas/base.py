@@ -1,5 +1,19 @@
+from typing import Generic, Optional, TypeVar
+
 from pydantic import BaseModel, Field
+from pydantic.generics import GenericModel
+
+ItemSchema = TypeVar("ItemSchema")
 
 
 class IdentifiableSchema(BaseModel):
     id: int = Field(title="Identifier")
+
+
+class EmptySchema(BaseModel):
+    pass
+
+
+class PageSchema(GenericModel, Generic[ItemSchema]):
+    items: list[ItemSchema] = Field(title="Items")
+    next_cursor: Optional[str] = Field(title="Cursor of the next page, absent on the last page")
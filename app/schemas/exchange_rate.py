@@ -0,0 +1,14 @@
+from decimal import Decimal
+
+from pydantic import Field, validator
+from sqlalchemy_utils import Currency
+
+from app.schemas.balance import CurrencySchema
+
+
+class ExchangeRateSchema(CurrencySchema):
+    rate: Decimal = Field(title="Value of One Unit in the Base Currency", gt=0)
+
+    @validator("currency")
+    def known_currency(cls, value: str) -> str:
+        return str(Currency(value.upper()))
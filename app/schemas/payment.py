@@ -0,0 +1,57 @@
+from typing import Optional
+
+from pydantic import BaseModel, Field, validator
+
+from app.schemas.balance import CurrencySchema
+from app.schemas.base import IdentifiableSchema
+from app.schemas.reminder import ReminderSchema
+from app.schemas.user import UserSchema
+
+
+class PaymentSchema(CurrencySchema, IdentifiableSchema):
+    sum: float = Field(title="Sum")
+    bank: str = Field(title="Bank", max_length=32)
+    phone_number: Optional[str] = Field(title="Phone Number")
+    card_number: Optional[str] = Field(title="Card Number", max_length=20)
+
+    @validator("phone_number", pre=True)
+    def phone_number_e164(cls, value) -> Optional[str]:
+        return getattr(value, "e164", value)
+
+
+class InterUserPaymentRequestSchema(BaseModel):
+    title: str = Field(title="Title", max_length=255)
+    from_user_id: int = Field(title="Debtor Identifier")
+    to_user_id: int = Field(title="Creditor Identifier")
+    payment_id: int = Field(title="Payment Identifier")
+    reminder_id: int = Field(title="Reminder Identifier")
+    completed: bool = Field(title="Completed", default=False)
+
+
+class InterUserPaymentSchema(InterUserPaymentRequestSchema, IdentifiableSchema):
+    pass
+
+
+class InterUserPaymentExpandedSchema(InterUserPaymentSchema):
+    """Related entities are present only when they were requested with `expand`"""
+
+    from_user: Optional[UserSchema] = Field(title="Debtor")
+    to_user: Optional[UserSchema] = Field(title="Creditor")
+    payment: Optional[PaymentSchema] = Field(title="Payment")
+    reminder: Optional[ReminderSchema] = Field(title="Reminder")
+
+
+class InterUserPaymentFilterSchema(BaseModel):
+    from_user_id: Optional[int] = Field(title="Debtor Identifier")
+    to_user_id: Optional[int] = Field(title="Creditor Identifier")
+    completed: Optional[bool] = Field(title="Completed")
+
+
+class PaymentImportErrorSchema(BaseModel):
+    row: int = Field(title="Row Number, the CSV header is not counted")
+    errors: dict[str, str] = Field(title="Error per Field")
+
+
+class PaymentImportReportSchema(BaseModel):
+    imported: int = Field(title="Imported Payments")
+    rejected: list[PaymentImportErrorSchema] = Field(title="Rejected Records")
@@ -0,0 +1,11 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import Field
+
+from app.schemas.base import IdentifiableSchema
+
+
+class ReminderSchema(IdentifiableSchema):
+    remind_at: datetime = Field(title="Remind At")
+    repeat: Optional[str] = Field(title="Repeat")
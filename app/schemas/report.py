@@ -0,0 +1,26 @@
+from datetime import date
+from decimal import Decimal
+
+from pydantic import Field
+
+from app.schemas.balance import CurrencySchema
+
+
+class CurrencyTotalSchema(CurrencySchema):
+    owed: Decimal = Field(title="Owed by the User")
+    receivable: Decimal = Field(title="Owed to the User")
+
+
+class TotalSchema(CurrencyTotalSchema):
+    """Amounts in the currency of the report, converted from the subtotals in the original currencies"""
+
+    net: Decimal = Field(title="Net Amount, negative when the user owes more than is owed to them")
+    currencies: list[CurrencyTotalSchema] = Field(title="Subtotals in the Original Currencies")
+
+
+class CounterpartTotalSchema(TotalSchema):
+    counterpart_id: int = Field(title="Counterpart Identifier")
+
+
+class MonthTotalSchema(TotalSchema):
+    month: date = Field(title="First Day of the Month")
@@ -0,0 +1,18 @@
+from decimal import Decimal
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+from app.config.settings import settings
+from app.schemas.balance import CurrencySchema
+
+
+class SettlementRequestSchema(BaseModel):
+    user_ids: list[int] = Field(title="Group Members", min_items=2, max_items=settings.SETTLEMENT_MAX_USERS)
+    currency: Optional[str] = Field(title="Currency", min_length=3, max_length=3)
+
+
+class TransferSchema(CurrencySchema):
+    from_user_id: int = Field(title="Payer Identifier")
+    to_user_id: int = Field(title="Recipient Identifier")
+    amount: Decimal = Field(title="Amount")
@@ -13,3 +13,7 @@ class UserUpdateRequestSchema(BaseModel):
 
 class UserSchema(UserUpdateRequestSchema, IdentifiableSchema):
     pass
+
+
+class UserBulkUpsertResultSchema(IdentifiableSchema):
+    status: Literal["created", "updated", "unchanged"] = Field(title="Status")
@@ -0,0 +1,75 @@
+"""Projection of payment reminders onto a calendar window"""
+
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+import numpy as np
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import InterUserPayment, Payment, Reminder
+from app.services.recurrence import expand_occurrences, repeat_codes
+
+
+def calendar_statement(start: datetime, end: datetime, user_id: Optional[int] = None, include_completed: bool = False):
+    # Recurring reminders moved forward by the scheduler are expanded from their first occurrence
+    first_remind_at = func.coalesce(Reminder.first_remind_at, Reminder.remind_at)
+    statement = (
+        select(
+            InterUserPayment.id,
+            InterUserPayment.title,
+            InterUserPayment.from_user_id,
+            InterUserPayment.to_user_id,
+            Payment.sum,
+            Payment.currency,
+            first_remind_at.label("remind_at"),
+            Reminder.repeat,
+        )
+        .join(Payment, Payment.id == InterUserPayment.payment_id)
+        .join(Reminder, Reminder.id == InterUserPayment.reminder_id)
+        .where(first_remind_at < end, or_(Reminder.repeat.is_not(None), Reminder.remind_at >= start))
+    )
+    if user_id is not None:
+        statement = statement.where(
+            or_(InterUserPayment.from_user_id == user_id, InterUserPayment.to_user_id == user_id)
+        )
+    if not include_completed:
+        statement = statement.where(InterUserPayment.completed.is_(False))
+    return statement
+
+
+async def iter_calendar(
+        session: AsyncSession,
+        start: datetime,
+        end: datetime,
+        user_id: Optional[int] = None,
+        include_completed: bool = False,
+        chunk_size: int = 10_000,
+) -> AsyncIterator[list[dict]]:
+    """
+    Streams due payments within `[start, end)` in chunks. Reminders are read with a server-side cursor
+    and every chunk is expanded at once, entries are ordered by `due_at` within a chunk only.
+    """
+    result = await session.stream(
+        calendar_statement(start, end, user_id, include_completed).execution_options(yield_per=chunk_size)
+    )
+    async for rows in result.partitions(chunk_size):
+        remind_at = np.array([row.remind_at for row in rows], dtype="M8[us]")
+        positions, occurrences = expand_occurrences(remind_at, repeat_codes(row.repeat for row in rows), start, end)
+        order = np.argsort(occurrences, kind="stable")
+        due_at = np.datetime_as_string(occurrences[order], unit="s")
+
+        entries = []
+        for position, moment in zip(positions[order].tolist(), due_at.tolist()):
+            row = rows[position]
+            entries.append({
+                "inter_user_payment_id": row.id,
+                "title": row.title,
+                "from_user_id": row.from_user_id,
+                "to_user_id": row.to_user_id,
+                "sum": row.sum,
+                "currency": str(row.currency),
+                "due_at": moment,
+            })
+        if entries:
+            yield entries
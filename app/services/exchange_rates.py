@@ -0,0 +1,139 @@
+"""
+Exchange rates.
+
+The `exchange_rate` table holds the value of one unit of every currency in `EXCHANGE_RATE_BASE_CURRENCY`,
+the base currency itself needs no row. Every worker keeps all rates in memory: they are reloaded every
+`EXCHANGE_RATE_REFRESH_INTERVAL` seconds, and on the next use once any worker has changed them.
+
+Rates can be loaded from a CSV file of `currency,rate` lines:
+python -m app.services.exchange_rates rates.csv
+"""
+
+import argparse
+import asyncio
+import csv
+import logging
+import time
+from decimal import Decimal
+from logging.config import dictConfig
+from typing import Callable, Hashable, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.logger import logger_config
+from app.config.settings import settings
+from app.core.invalidation import invalidation_bus, invalidation_statements
+from app.core.session import CONNECTION_ERRORS, async_session
+from app.models import ExchangeRate
+
+logger = logging.getLogger("app.services.exchange_rates")
+
+exchange_rate_table = ExchangeRate.__table__  # type: ignore
+
+
+class MissingExchangeRateError(LookupError):
+    def __init__(self, currency: str):
+        super().__init__(f"No exchange rate for {currency}")
+        self.currency = currency
+
+
+class ExchangeRateCache:
+    """Rates of every currency in the base currency, loaded at once and kept for `refresh_interval` seconds"""
+
+    def __init__(
+            self,
+            base_currency: str,
+            refresh_interval: float,
+            session_factory: Callable[[], AsyncSession] = async_session,
+    ):
+        self.base_currency = base_currency
+        self.refresh_interval = refresh_interval
+        self.session_factory = session_factory
+        self.rates: dict[str, Decimal] = {}
+        self.loaded_at: Optional[float] = None
+
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def fresh(self) -> bool:
+        return self.loaded_at is not None and time.monotonic() - self.loaded_at < self.refresh_interval
+
+    async def load(self) -> dict[str, Decimal]:
+        async with self.session_factory() as session:
+            rows = (await session.execute(select(ExchangeRate.currency, ExchangeRate.rate))).all()
+        rates = {str(currency): rate for currency, rate in rows}
+        rates[self.base_currency] = Decimal(1)
+        return rates
+
+    async def get(self) -> dict[str, Decimal]:
+        """Current rates, concurrent callers share one reload when they are stale"""
+        if not self.fresh:
+            async with self._lock:
+                if not self.fresh:
+                    loaded_at = time.monotonic()
+                    self.rates = await self.load()
+                    self.loaded_at = loaded_at
+        return self.rates
+
+    def invalidate(self, key: Hashable) -> None:
+        self.loaded_at = None
+
+    def clear(self) -> None:
+        self.loaded_at = None
+
+    async def run(self) -> None:
+        while True:
+            try:
+                self.invalidate(None)
+                await self.get()
+            except CONNECTION_ERRORS as e:
+                logger.warning(f"Exchange rates could not be loaded: {e!r}")
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+exchange_rates = ExchangeRateCache(
+    settings.EXCHANGE_RATE_BASE_CURRENCY, refresh_interval=settings.EXCHANGE_RATE_REFRESH_INTERVAL
+)
+invalidation_bus.register(ExchangeRate.__tablename__, exchange_rates)
+
+
+async def upsert_exchange_rates(session: AsyncSession, rates: dict[str, Decimal]) -> None:
+    """Inserts or updates the rates, other workers reload theirs once the caller commits"""
+    statement = insert(exchange_rate_table).values(
+        [{"currency": currency, "rate": rate} for currency, rate in rates.items()]
+    )
+    await session.execute(statement.on_conflict_do_update(
+        index_elements=[exchange_rate_table.c.currency],
+        set_={"rate": statement.excluded.rate, "updated": func.now()},
+    ))
+    if settings.CACHE_INVALIDATION_ENABLED:
+        for notification in invalidation_statements(ExchangeRate.__tablename__, rates):
+            await session.execute(notification)
+    exchange_rates.invalidate(None)
+
+
+async def main(path: str) -> None:
+    dictConfig(logger_config.dict())
+    with open(path, newline="") as file:
+        rates = {currency.strip().upper(): Decimal(rate) for currency, rate in csv.reader(file)}
+    async with async_session() as session, session.begin():
+        await upsert_exchange_rates(session, rates)
+    logger.info(f"Loaded {len(rates)} exchange rates")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load exchange rates from a CSV file of currency,rate lines")
+    parser.add_argument("path")
+    asyncio.run(main(parser.parse_args().path))
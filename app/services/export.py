@@ -0,0 +1,65 @@
+"""Streaming export of inter-user payments with their payments and reminders"""
+
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import String, select, type_coerce
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import InterUserPayment, Payment, Reminder
+
+EXPORT_COLUMNS = (
+    InterUserPayment.id,
+    InterUserPayment.title,
+    InterUserPayment.from_user_id,
+    InterUserPayment.to_user_id,
+    InterUserPayment.completed,
+    InterUserPayment.created,
+    InterUserPayment.updated,
+    InterUserPayment.payment_id,
+    Payment.sum,
+    # Stored codes are exported as is, without building currency and phone number objects for every row
+    type_coerce(Payment.currency, String).label("currency"),
+    Payment.bank,
+    type_coerce(Payment.phone_number, String).label("phone_number"),
+    Payment.card_number,
+    InterUserPayment.reminder_id,
+    Reminder.remind_at,
+    Reminder.repeat,
+)
+EXPORT_FIELDS = tuple(column.key for column in EXPORT_COLUMNS)
+
+
+def export_statement(start: datetime, end: datetime, after_id: Optional[int] = None):
+    statement = (
+        select(*EXPORT_COLUMNS)
+        .join(Payment, Payment.id == InterUserPayment.payment_id)
+        .join(Reminder, Reminder.id == InterUserPayment.reminder_id)
+        .where(InterUserPayment.created >= start, InterUserPayment.created < end)
+        .order_by(InterUserPayment.id)
+    )
+    if after_id is not None:
+        statement = statement.where(InterUserPayment.id > after_id)
+    return statement
+
+
+DATETIME_POSITIONS = tuple(
+    position for position, column in enumerate(EXPORT_COLUMNS) if column.type.python_type is datetime
+)
+
+
+async def iter_export_rows(
+        session: AsyncSession, start: datetime, end: datetime, after_id: Optional[int] = None, chunk_size: int = 5_000
+) -> AsyncIterator[list[list]]:
+    """
+    Yields chunks of export rows ordered by inter-user payment id, read through a server-side cursor,
+    so memory use does not depend on the size of the export. Datetimes are converted to ISO strings. An interrupted export is resumed
+    by passing the last received id as `after_id`.
+    """
+    result = await session.stream(export_statement(start, end, after_id).execution_options(yield_per=chunk_size))
+    async for rows in result.partitions(chunk_size):
+        chunk = [list(row) for row in rows]
+        for row in chunk:
+            for position in DATETIME_POSITIONS:
+                row[position] = row[position].isoformat()
+        yield chunk
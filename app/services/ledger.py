@@ -0,0 +1,140 @@
+"""
+Per-user balance ledger.
+
+`user_balance` holds the sum of open (not completed) inter-user payments per debtor, creditor and currency.
+It is kept up to date incrementally by statement-level triggers on `inter_user_payment` and `payment`
+(see the `user_balance_ledger` migration), so it also follows bulk statements and cascading deletes.
+
+The ledger can be verified against the source tables or rebuilt from scratch:
+python -m app.services.ledger verify
+python -m app.services.ledger rebuild
+"""
+
+import argparse
+import asyncio
+import logging
+from decimal import Decimal
+from logging.config import dictConfig
+
+from sqlalchemy import Numeric, and_, cast, delete, func, insert, literal, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.logger import logger_config
+from app.core.session import async_session
+from app.models import InterUserPayment, Payment, UserBalance
+
+logger = logging.getLogger("app.services.ledger")
+
+
+def expected_balances_statement():
+    return (
+        select(
+            InterUserPayment.from_user_id,
+            InterUserPayment.to_user_id,
+            Payment.currency,
+            func.sum(cast(Payment.sum, Numeric(20, 4))).label("amount"),
+        )
+        .join(Payment, Payment.id == InterUserPayment.payment_id)
+        .where(
+            InterUserPayment.completed.is_(False),
+            InterUserPayment.from_user_id.is_not(None),
+            InterUserPayment.to_user_id.is_not(None),
+        )
+        .group_by(InterUserPayment.from_user_id, InterUserPayment.to_user_id, Payment.currency)
+    )
+
+
+async def rebuild_ledger(session: AsyncSession) -> int:
+    """Recomputes the whole ledger with one set-based statement, returns the number of balances"""
+    await session.execute(text("LOCK TABLE inter_user_payment, payment IN SHARE MODE"))
+    await session.execute(delete(UserBalance))
+    result = await session.execute(
+        insert(UserBalance).from_select(
+            ["from_user_id", "to_user_id", "currency", "amount"], expected_balances_statement()
+        )
+    )
+    return result.rowcount
+
+
+async def verify_ledger(session: AsyncSession) -> list[dict]:
+    """Returns balances which differ from the ones computed from `inter_user_payment`"""
+    expected = expected_balances_statement().subquery()
+    stored = UserBalance.__table__  # type: ignore
+    expected_amount = func.coalesce(expected.c.amount, literal(Decimal(0)))
+    stored_amount = func.coalesce(stored.c.amount, literal(Decimal(0)))
+
+    rows = await session.execute(
+        select(
+            func.coalesce(expected.c.from_user_id, stored.c.from_user_id).label("from_user_id"),
+            func.coalesce(expected.c.to_user_id, stored.c.to_user_id).label("to_user_id"),
+            func.coalesce(expected.c.currency, stored.c.currency).label("currency"),
+            expected_amount.label("expected"),
+            stored_amount.label("stored"),
+        )
+        .select_from(
+            expected.outerjoin(
+                stored,
+                and_(
+                    expected.c.from_user_id == stored.c.from_user_id,
+                    expected.c.to_user_id == stored.c.to_user_id,
+                    expected.c.currency == stored.c.currency,
+                ),
+                full=True,
+            )
+        )
+        .where(expected_amount != stored_amount)
+    )
+    return [dict(row._mapping) for row in rows]
+
+
+async def get_user_balances(session: AsyncSession, user_id: int) -> list[UserBalance]:
+    """Non-zero balances where the user is either the debtor or the creditor"""
+    return (
+        await session.execute(
+            select(UserBalance).where(
+                or_(UserBalance.from_user_id == user_id, UserBalance.to_user_id == user_id),
+                UserBalance.amount != 0,
+            )
+        )
+    ).scalars().all()
+
+
+async def get_pair_balances(session: AsyncSession, user_id: int, counterpart_id: int) -> dict[str, Decimal]:
+    """Net debt of the user to the counterpart per currency, negative when the counterpart is the debtor"""
+    balances: dict[str, Decimal] = {}
+    for balance in (
+            await session.execute(
+                select(UserBalance).where(
+                    or_(
+                        and_(UserBalance.from_user_id == user_id, UserBalance.to_user_id == counterpart_id),
+                        and_(UserBalance.from_user_id == counterpart_id, UserBalance.to_user_id == user_id),
+                    )
+                )
+            )
+    ).scalars():
+        sign = 1 if balance.from_user_id == user_id else -1
+        currency = str(balance.currency)
+        balances[currency] = balances.get(currency, Decimal(0)) + sign * balance.amount
+    return {currency: amount for currency, amount in balances.items() if amount}
+
+
+async def main(command: str) -> None:
+    dictConfig(logger_config.dict())
+    async with async_session() as session:
+        if command == "rebuild":
+            async with session.begin():
+                count = await rebuild_ledger(session)
+            logger.info(f"Ledger was rebuilt with {count} balances")
+        else:
+            mismatches = await verify_ledger(session)
+            for mismatch in mismatches:
+                logger.error(f"Ledger mismatch: {mismatch}")
+            logger.info(f"Ledger verification finished with {len(mismatches)} mismatches")
+            if mismatches:
+                raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verify or rebuild the user balance ledger")
+    parser.add_argument("command", choices=["verify", "rebuild"])
+    asyncio.run(main(parser.parse_args().command))
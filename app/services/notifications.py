@@ -0,0 +1,289 @@
+"""
+Notification outbox dispatcher.
+
+Notifications are written to `outbox_notification` in the same transaction as the change they report
+(see `enqueue_payment_notifications` in the scheduler) and delivered here, outside of any request:
+python -m app.services.notifications --sender logging
+
+Every dispatcher claims a batch of due notifications by moving their `next_attempt_at` forward by a lease,
+so concurrent dispatchers never pick the same rows and rows of a crashed dispatcher are retried after
+the lease. A batch is sent with bounded concurrency and a token bucket per recipient. Its outcome is then
+written back with one statement per kind: delivered, rescheduled by the rate limit, retried with exponential
+backoff, or failed after the last attempt. Delivery is at least once.
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import signal
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from logging.config import dictConfig
+from typing import Callable, Optional, Sequence
+
+from sqlalchemy import Integer, any_, bindparam, select, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.logger import logger_config
+from app.config.settings import settings
+from app.core.admission import RateLimiter
+from app.core.session import async_session
+from app.models import OutboxNotification
+
+logger = logging.getLogger("app.services.notifications")
+
+outbox_table = OutboxNotification.__table__  # type: ignore
+
+
+@dataclass(frozen=True)
+class OutboxMessage:
+    id: int
+    recipient_id: int
+    kind: str
+    payload: dict
+    attempts: int
+
+
+class DeliveryError(Exception):
+    """Raised by senders when a notification was not delivered, `retry_after` overrides the backoff"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class NotificationSender(ABC):
+    """Delivers a single notification to the messenger, raises when it was not delivered"""
+
+    @abstractmethod
+    async def send(self, message: OutboxMessage) -> None:
+        ...
+
+
+class LoggingSender(NotificationSender):
+    async def send(self, message: OutboxMessage) -> None:
+        logger.info(f"Notification {message.id} of kind {message.kind} to {message.recipient_id}: {message.payload}")
+
+
+class FakeSender(NotificationSender):
+    """Local stand-in for the messenger which records sent messages, with optional latency and random failures"""
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.sent: list[OutboxMessage] = []
+
+    async def send(self, message: OutboxMessage) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.random.random() < self.failure_rate:
+            raise DeliveryError("Simulated delivery failure")
+        self.sent.append(message)
+
+
+SENDERS: dict[str, Callable[[], NotificationSender]] = {
+    "logging": LoggingSender,
+    "fake": FakeSender,
+}
+
+
+class NotificationDispatcher:
+    def __init__(
+            self,
+            sender: NotificationSender,
+            batch_size: int = settings.NOTIFICATION_BATCH_SIZE,
+            concurrency: int = settings.NOTIFICATION_CONCURRENCY,
+            recipient_rate: float = settings.NOTIFICATION_RECIPIENT_RATE,
+            recipient_burst: int = settings.NOTIFICATION_RECIPIENT_BURST,
+            max_attempts: int = settings.NOTIFICATION_MAX_ATTEMPTS,
+            backoff_base: float = settings.NOTIFICATION_BACKOFF_BASE,
+            backoff_max: float = settings.NOTIFICATION_BACKOFF_MAX,
+            lease: float = settings.NOTIFICATION_LEASE,
+            poll_interval: float = settings.NOTIFICATION_POLL_INTERVAL,
+            kinds: Optional[Sequence[str]] = None,
+            session_factory: Callable[[], AsyncSession] = async_session,
+    ):
+        """`kinds` restricts the dispatcher to notifications of these kinds, all are dispatched by default"""
+        self.sender = sender
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.rate_limiter = RateLimiter(recipient_rate, recipient_burst)
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.kinds = kinds
+        self.session_factory = session_factory
+
+        self.delivered = 0
+        self.failed = 0
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+
+    @staticmethod
+    def now() -> datetime:
+        return datetime.utcnow()
+
+    def notify(self) -> None:
+        """Wakes the dispatcher up, e.g. after notifications were enqueued in the same process"""
+        self._wakeup.set()
+
+    def stop(self) -> None:
+        self._stopping = True
+        self._wakeup.set()
+
+    def backoff(self, attempts: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def claim(self, now: datetime) -> list[OutboxMessage]:
+        due = (
+            select(outbox_table.c.id)
+            .where(outbox_table.c.status == OutboxNotification.PENDING, outbox_table.c.next_attempt_at <= now)
+            .order_by(outbox_table.c.next_attempt_at)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        if self.kinds:
+            due = due.where(outbox_table.c.kind.in_(self.kinds))
+        async with self.session_factory() as session, session.begin():
+            rows = (
+                await session.execute(
+                    update(outbox_table)
+                    .where(outbox_table.c.id.in_(due))
+                    .values(next_attempt_at=now + timedelta(seconds=self.lease))
+                    .returning(
+                        outbox_table.c.id,
+                        outbox_table.c.recipient_id,
+                        outbox_table.c.kind,
+                        outbox_table.c.payload,
+                        outbox_table.c.attempts,
+                    )
+                )
+            ).all()
+        return [OutboxMessage(*row) for row in rows]
+
+    async def send(self, messages: list[OutboxMessage]) -> dict[int, Optional[Exception]]:
+        """Sends messages with bounded concurrency, returns the error of every message, None when delivered"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        outcomes: dict[int, Optional[Exception]] = {}
+
+        async def send_one(message: OutboxMessage) -> None:
+            async with semaphore:
+                try:
+                    await self.sender.send(message)
+                    outcomes[message.id] = None
+                except Exception as e:
+                    outcomes[message.id] = e
+
+        await asyncio.gather(*(send_one(message) for message in messages))
+        return outcomes
+
+    async def dispatch_batch(self) -> int:
+        """Claims, sends and records one batch, returns the number of claimed notifications"""
+        now = self.now()
+        messages = await self.claim(now)
+        if not messages:
+            return 0
+
+        clock = time.monotonic()
+        self.rate_limiter.prune(clock)
+        allowed, deferred = [], []
+        for message in messages:
+            if wait := self.rate_limiter.acquire(message.recipient_id, clock):
+                deferred.append({"notification_id": message.id, "next_attempt_at": now + timedelta(seconds=wait)})
+            else:
+                allowed.append(message)
+
+        outcomes = await self.send(allowed)
+        now = self.now()
+        delivered, retried, failed = [], [], []
+        for message in allowed:
+            if (error := outcomes[message.id]) is None:
+                delivered.append(message.id)
+                continue
+            attempts = message.attempts + 1
+            row = {"notification_id": message.id, "attempts": attempts, "last_error": repr(error)}
+            if attempts >= self.max_attempts:
+                failed.append(row)
+            else:
+                delay = getattr(error, "retry_after", None) or self.backoff(attempts)
+                retried.append({**row, "next_attempt_at": now + timedelta(seconds=delay)})
+
+        await self.record(now, delivered, deferred, retried, failed)
+        self.delivered += len(delivered)
+        self.failed += len(failed)
+        if retried or failed:
+            logger.warning(f"{len(retried)} notifications will be retried, {len(failed)} failed for good")
+        return len(messages)
+
+    async def record(
+            self, now: datetime, delivered: list[int], deferred: list[dict], retried: list[dict], failed: list[dict]
+    ) -> None:
+        by_id = outbox_table.c.id == bindparam("notification_id")
+        async with self.session_factory() as session, session.begin():
+            if delivered:
+                await session.execute(
+                    update(outbox_table)
+                    .where(outbox_table.c.id == any_(bindparam("ids", delivered, type_=ARRAY(Integer))))
+                    .values(status=OutboxNotification.DELIVERED, delivered_at=now)
+                )
+            if deferred:
+                await session.execute(
+                    update(outbox_table).where(by_id).values(next_attempt_at=bindparam("next_attempt_at")), deferred
+                )
+            if retried:
+                await session.execute(
+                    update(outbox_table).where(by_id).values(
+                        attempts=bindparam("attempts"),
+                        last_error=bindparam("last_error"),
+                        next_attempt_at=bindparam("next_attempt_at"),
+                    ),
+                    retried,
+                )
+            if failed:
+                await session.execute(
+                    update(outbox_table).where(by_id).values(
+                        status=OutboxNotification.FAILED,
+                        attempts=bindparam("attempts"),
+                        last_error=bindparam("last_error"),
+                    ),
+                    failed,
+                )
+
+    async def run(self) -> None:
+        logger.info("Notification dispatcher started")
+        while not self._stopping:
+            try:
+                if await self.dispatch_batch() >= self.batch_size:
+                    continue
+            except Exception as e:
+                logger.error(f"Error when dispatching notifications: {e}")
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+        logger.info("Notification dispatcher stopped")
+
+
+async def main(sender: str) -> None:
+    dictConfig(logger_config.dict())
+    dispatcher = NotificationDispatcher(SENDERS[sender]())
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, dispatcher.stop)
+    await dispatcher.run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Deliver notifications from the outbox")
+    parser.add_argument("--sender", choices=list(SENDERS), default="logging")
+    asyncio.run(main(parser.parse_args().sender))
@@ -0,0 +1,235 @@
+"""
+Monthly partitions of `inter_user_payment` and archival of completed payments.
+
+`inter_user_payment` is range partitioned by `created`, one partition per month plus a default partition
+which only catches rows outside of every monthly range. The maintenance job creates the partitions of
+the coming months ahead of time, so inserts never land in the default partition in practice:
+python -m app.services.partitions
+python -m app.services.partitions --once --archive-after-months 6
+
+With archival enabled, completed payments created before the cutoff month are moved in batches into
+`inter_user_payment_archive`, which keeps fewer indexes. Monthly partitions before the cutoff which
+are left empty are dropped, so queries for open payments have fewer partitions and smaller indexes to visit.
+Archived payments are no longer served by the API.
+"""
+
+import argparse
+import asyncio
+import logging
+import re
+import signal
+from datetime import date, datetime
+from logging.config import dictConfig
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy import delete, func, insert, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.logger import logger_config
+from app.config.settings import settings
+from app.core.session import async_session
+from app.models import InterUserPayment, InterUserPaymentArchive
+
+logger = logging.getLogger("app.services.partitions")
+
+payment_table = InterUserPayment.__table__  # type: ignore
+archive_table = InterUserPaymentArchive.__table__  # type: ignore
+
+PARENT = payment_table.name
+DEFAULT_PARTITION = f"{PARENT}_default"
+PARTITION_NAME = re.compile(rf"^{PARENT}_(\d{{4}})_(\d{{2}})$")
+
+ARCHIVED_COLUMNS = [column.name for column in archive_table.columns if column.name != "archived"]
+
+PARTITIONS = f"""
+SELECT child.relname
+FROM pg_inherits
+JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid
+WHERE pg_inherits.inhparent = '{PARENT}'::regclass
+"""
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_of(moment: datetime) -> date:
+    return date(moment.year, moment.month, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT}_{month:%Y_%m}"
+
+
+def partition_month(name: str) -> Optional[date]:
+    if match := PARTITION_NAME.match(name):
+        return date(int(match[1]), int(match[2]), 1)
+    return None
+
+
+async def monthly_partitions(session: AsyncSession) -> dict[date, str]:
+    names = (await session.execute(text(PARTITIONS))).scalars().all()
+    return {month: name for name in names if (month := partition_month(name)) is not None}
+
+
+async def create_partition(session: AsyncSession, month: date) -> None:
+    """
+    Creates the partition of the month. Rows of the month which landed in the default partition are moved
+    into the new table first, otherwise it could not be attached. Statement triggers of the parent table
+    do not fire for statements on its partitions, so the move leaves the balance ledger as it is.
+    """
+    name, start, end = partition_name(month), month.isoformat(), add_months(month, 1).isoformat()
+    await session.execute(text(f"CREATE TABLE {name} (LIKE {PARENT} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    await session.execute(text(
+        f"WITH moved AS ("
+        f"DELETE FROM {DEFAULT_PARTITION} WHERE created >= '{start}' AND created < '{end}' RETURNING *"
+        f") INSERT INTO {name} SELECT * FROM moved"
+    ))
+    await session.execute(
+        text(f"ALTER TABLE {PARENT} ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')")
+    )
+
+
+async def create_missing_partitions(session: AsyncSession, months: Iterable[date]) -> list[str]:
+    """Creates the partitions of the months which have none yet, returns their names"""
+    # Concurrent maintainers and imports would race for the same partitions
+    await session.execute(select(func.pg_advisory_xact_lock(func.hashtext(PARENT))))
+    existing = await monthly_partitions(session)
+    created = []
+    for month in sorted(set(months) - existing.keys()):
+        await create_partition(session, month)
+        created.append(partition_name(month))
+    return created
+
+
+class PartitionMaintainer:
+    def __init__(
+            self,
+            months_ahead: int = settings.PARTITION_MONTHS_AHEAD,
+            archive_after_months: int = settings.PAYMENT_ARCHIVE_AFTER_MONTHS,
+            archive_batch_size: int = settings.PAYMENT_ARCHIVE_BATCH_SIZE,
+            interval: float = settings.PARTITION_MAINTENANCE_INTERVAL,
+            session_factory: Callable[[], AsyncSession] = async_session,
+    ):
+        """`archive_after_months` of 0 disables archival"""
+        self.months_ahead = months_ahead
+        self.archive_after_months = archive_after_months
+        self.archive_batch_size = archive_batch_size
+        self.interval = interval
+        self.session_factory = session_factory
+
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+
+    @staticmethod
+    def now() -> datetime:
+        return datetime.utcnow()
+
+    def stop(self) -> None:
+        self._stopping = True
+        self._wakeup.set()
+
+    async def ensure_partitions(self, now: datetime) -> list[str]:
+        """Creates the missing partitions from the current month up to `months_ahead`, returns their names"""
+        months = [add_months(month_of(now), offset) for offset in range(self.months_ahead + 1)]
+        async with self.session_factory() as session, session.begin():
+            created = await create_missing_partitions(session, months)
+        if created:
+            logger.info(f"Created partitions {', '.join(created)}")
+        return created
+
+    def archive_cutoff(self, now: datetime) -> datetime:
+        return datetime.combine(add_months(month_of(now), -self.archive_after_months), datetime.min.time())
+
+    async def archive_batch(self, before: datetime) -> int:
+        """Moves one batch of completed payments created before `before` into the archive"""
+        due = (
+            select(payment_table.c.id, payment_table.c.created)
+            .where(payment_table.c.completed.is_(True), payment_table.c.created < before)
+            .limit(self.archive_batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        moved = (
+            delete(payment_table)
+            .where(tuple_(payment_table.c.id, payment_table.c.created).in_(due))
+            .returning(*(payment_table.c[name] for name in ARCHIVED_COLUMNS))
+            .cte("moved")
+        )
+        async with self.session_factory() as session, session.begin():
+            result = await session.execute(insert(archive_table).from_select(ARCHIVED_COLUMNS, select(moved)))
+        return result.rowcount
+
+    async def archive_completed(self, now: datetime) -> int:
+        before = self.archive_cutoff(now)
+        archived = 0
+        while (batch := await self.archive_batch(before)) > 0:
+            archived += batch
+            if batch < self.archive_batch_size:
+                break
+        if archived:
+            logger.info(f"Archived {archived} completed payments created before {before:%Y-%m-%d}")
+        return archived
+
+    async def drop_empty_partitions(self, now: datetime) -> list[str]:
+        """Drops monthly partitions before the archive cutoff which have no rows left"""
+        cutoff = month_of(self.archive_cutoff(now))
+        dropped = []
+        async with self.session_factory() as session, session.begin():
+            await session.execute(select(func.pg_advisory_xact_lock(func.hashtext(PARENT))))
+            for month, name in sorted((await monthly_partitions(session)).items()):
+                if month >= cutoff:
+                    break
+                if (await session.execute(text(f"SELECT EXISTS (SELECT FROM {name})"))).scalar():
+                    continue
+                await session.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {name}"))
+                await session.execute(text(f"DROP TABLE {name}"))
+                dropped.append(name)
+        if dropped:
+            logger.info(f"Dropped empty partitions {', '.join(dropped)}")
+        return dropped
+
+    async def maintain(self) -> None:
+        now = self.now()
+        await self.ensure_partitions(now)
+        if self.archive_after_months:
+            await self.archive_completed(now)
+            await self.drop_empty_partitions(now)
+
+    async def run(self) -> None:
+        logger.info("Partition maintenance started")
+        while not self._stopping:
+            try:
+                await self.maintain()
+            except Exception as e:
+                logger.error(f"Error when maintaining partitions: {e}")
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+        logger.info("Partition maintenance stopped")
+
+
+async def main(once: bool, archive_after_months: int) -> None:
+    dictConfig(logger_config.dict())
+    maintainer = PartitionMaintainer(archive_after_months=archive_after_months)
+    if once:
+        await maintainer.maintain()
+        return
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, maintainer.stop)
+    await maintainer.run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create monthly payment partitions and archive completed payments")
+    parser.add_argument("--once", action="store_true", help="Run the maintenance once instead of periodically")
+    parser.add_argument(
+        "--archive-after-months", type=int, default=settings.PAYMENT_ARCHIVE_AFTER_MONTHS,
+        help="Archive completed payments created this many months before the current month, 0 disables archival",
+    )
+    arguments = parser.parse_args()
+    asyncio.run(main(arguments.once, arguments.archive_after_months))
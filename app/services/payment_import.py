@@ -0,0 +1,388 @@
+"""
+Bulk import of historical payments.
+
+Every input record is an inter-user payment together with its payment and reminder, with the fields of
+the export (see `app/services/export.py`), so that an export can be imported into another database.
+Identifiers in the input are ignored, new ones are assigned. Records without `created` get the current time.
+
+The input is streamed as CSV with a header line or as NDJSON. Records are validated in batches, and the valid
+ones are copied into a temporary staging table with `COPY` while the next batch is parsed. Payment and reminder
+identifiers are taken from their sequences as the rows are copied. Then records which reference unknown users
+are removed from the staging table, and the rest are moved into `payment`, `reminder` and `inter_user_payment`
+with one `INSERT ... SELECT` each. Rejected records are reported with their row number, the import goes on.
+Monthly partitions are created for the months of `created` which have none yet.
+
+python -m app.services.payment_import payments.csv --errors errors.ndjson
+python -m app.services.payment_import payments.ndjson.gz
+"""
+
+import argparse
+import asyncio
+import csv
+import functools
+import io
+import logging
+import math
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from logging.config import dictConfig
+from typing import Any, AsyncIterator, Callable, Literal
+
+import orjson
+import phonenumbers
+from babel import Locale
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.config.logger import logger_config
+from app.config.settings import settings
+from app.core.session import async_session
+from app.core.streaming import complete_records, gunzip_stream, ndjson_line
+from app.models import Payment, Reminder
+from app.services.partitions import create_missing_partitions
+from app.utils import to_naive_utc
+
+logger = logging.getLogger("app.services.payment_import")
+
+ImportFormat = Literal["csv", "ndjson"]
+
+STAGING_TABLE = "payment_import"
+
+INTEGER_MAX = 2 ** 31 - 1
+# Sums are added up as numeric(20, 4) by the balance ledger
+SUM_LIMIT = 10.0 ** 16
+CARD_NUMBER_LENGTHS = range(12, 20)
+BOOLEANS = {"true": True, "t": True, "yes": True, "1": True, "false": False, "f": False, "no": False, "0": False}
+CURRENCY_CODES = frozenset(Locale("en").currencies)
+PHONE_NUMBER_REGION = Payment.__table__.c.phone_number.type.region  # type: ignore
+
+
+def to_integer(value: Any) -> int:
+    if isinstance(value, str):
+        value = int(value)
+    elif type(value) is not int:
+        raise ValueError("not an integer")
+    if not -INTEGER_MAX - 1 <= value <= INTEGER_MAX:
+        raise ValueError("out of range")
+    return value
+
+
+def to_sum(value: Any) -> float:
+    if isinstance(value, bool):
+        raise ValueError("not a number")
+    value = float(value)
+    if not math.isfinite(value) or abs(value) >= SUM_LIMIT:
+        raise ValueError("out of range")
+    return value
+
+
+def to_boolean(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    if (boolean := BOOLEANS.get(str(value).lower())) is None:
+        raise ValueError("not a boolean")
+    return boolean
+
+
+def to_datetime(value: Any) -> datetime:
+    if not isinstance(value, str):
+        raise ValueError("not an ISO 8601 datetime")
+    return to_naive_utc(datetime.fromisoformat(value))
+
+
+def to_past_datetime(value: Any) -> datetime:
+    if (moment := to_datetime(value)) > datetime.utcnow():
+        raise ValueError("in the future")
+    return moment
+
+
+def text_of(max_length: int) -> Callable[[Any], str]:
+    def convert(value: Any) -> str:
+        if len(value := str(value)) > max_length:
+            raise ValueError(f"longer than {max_length} characters")
+        return value
+
+    return convert
+
+
+def to_currency(value: Any) -> str:
+    if value not in CURRENCY_CODES:
+        raise ValueError(f"{value!r} is not a valid currency code")
+    return value
+
+
+@functools.lru_cache(maxsize=100_000)
+def parse_phone_number(value: str) -> str:
+    """Stored format of `PhoneNumberType`"""
+    try:
+        number = phonenumbers.parse(value, PHONE_NUMBER_REGION)
+    except phonenumbers.NumberParseException as e:
+        raise ValueError(str(e))
+    if not phonenumbers.is_valid_number(number):
+        raise ValueError(f"{value!r} is not a valid phone number")
+    e164 = phonenumbers.format_number(number, phonenumbers.PhoneNumberFormat.E164)
+    stored = f"{e164};ext={number.extension}" if number.extension else e164
+    if len(stored) > 20:
+        raise ValueError("longer than 20 characters")
+    return stored
+
+
+def to_phone_number(value: Any) -> str:
+    return parse_phone_number(str(value))
+
+
+def to_card_number(value: Any) -> str:
+    digits = str(value).replace(" ", "").replace("-", "")
+    if not (digits.isascii() and digits.isdigit() and len(digits) in CARD_NUMBER_LENGTHS):
+        raise ValueError(f"not a card number of {CARD_NUMBER_LENGTHS[0]} to {CARD_NUMBER_LENGTHS[-1]} digits")
+    return digits
+
+
+def to_repeat(value: Any) -> str:
+    if value not in Reminder.REPEAT_TYPES:
+        raise ValueError(f"not one of {', '.join(Reminder.REPEAT_TYPES)}")
+    return value
+
+
+# Name, conversion, required and type in the staging table, converted values are safe to copy
+COLUMNS = (
+    ("title", text_of(255), True, "varchar(255)"),
+    ("from_user_id", to_integer, True, "integer"),
+    ("to_user_id", to_integer, True, "integer"),
+    ("completed", to_boolean, False, "boolean"),
+    ("created", to_past_datetime, False, "timestamp"),
+    ("sum", to_sum, True, "float8"),
+    ("currency", to_currency, True, "varchar(3)"),
+    ("bank", text_of(32), True, "varchar(32)"),
+    ("phone_number", to_phone_number, False, "varchar(20)"),
+    ("card_number", to_card_number, False, "varchar(20)"),
+    ("remind_at", to_datetime, True, "timestamp"),
+    ("repeat", to_repeat, False, "varchar(7)"),
+)
+COLUMN_NAMES = ["row", *(name for name, _, _, _ in COLUMNS)]
+CREATED_POSITION = COLUMN_NAMES.index("created")
+COMPLETED_POSITION = COLUMN_NAMES.index("completed")
+
+CREATE_STAGING_TABLE = f"""
+CREATE TEMPORARY TABLE {STAGING_TABLE} (
+    row integer NOT NULL,
+    {", ".join(f"{name} {sql_type}" for name, _, _, sql_type in COLUMNS)},
+    payment_id integer NOT NULL DEFAULT nextval('payment_id_seq'),
+    reminder_id integer NOT NULL DEFAULT nextval('reminder_id_seq')
+) ON COMMIT DROP
+"""
+
+REJECT_UNKNOWN_USERS = f"""
+DELETE FROM {STAGING_TABLE} AS staged
+USING (
+    SELECT staged.row, from_user.id IS NULL AS from_unknown, to_user.id IS NULL AS to_unknown
+    FROM {STAGING_TABLE} AS staged
+    LEFT JOIN "user" AS from_user ON from_user.id = staged.from_user_id
+    LEFT JOIN "user" AS to_user ON to_user.id = staged.to_user_id
+    WHERE from_user.id IS NULL OR to_user.id IS NULL
+) AS unresolved
+WHERE staged.row = unresolved.row
+RETURNING staged.row, staged.from_user_id, staged.to_user_id, unresolved.from_unknown, unresolved.to_unknown
+"""
+
+MOVE_STATEMENTS = (
+    f"""
+    INSERT INTO payment (id, sum, bank, currency, phone_number, card_number)
+    SELECT payment_id, sum, bank, currency, phone_number, card_number FROM {STAGING_TABLE}
+    """,
+    # Reminders of completed payments would only be moved forward by the scheduler without notifying anyone
+    f"""
+    INSERT INTO reminder (id, remind_at, repeat, fired_at)
+    SELECT reminder_id, remind_at, repeat, CASE WHEN completed THEN timezone('utc', now()) END FROM {STAGING_TABLE}
+    """,
+    f"""
+    INSERT INTO inter_user_payment (title, from_user_id, to_user_id, payment_id, reminder_id, completed, created)
+    SELECT title, from_user_id, to_user_id, payment_id, reminder_id, completed, coalesce(created, now())
+    FROM {STAGING_TABLE}
+    """,
+)
+
+
+@dataclass(frozen=True)
+class InvalidRecord:
+    """Record which could not be read, it is rejected with `reason`"""
+    reason: str
+
+
+@dataclass
+class ImportReport:
+    imported: int = 0
+    rejected: list[dict] = field(default_factory=list)
+    months: set[date] = field(default_factory=set)
+
+
+def validate_batch(records: list[tuple[int, Any]], report: ImportReport) -> list[tuple]:
+    """Converts records into staging table rows, invalid records are added to the report"""
+    rows = []
+    for number, record in records:
+        if isinstance(record, InvalidRecord):
+            report.rejected.append({"row": number, "errors": {"record": record.reason}})
+            continue
+        if not isinstance(record, dict):
+            report.rejected.append({"row": number, "errors": {"record": "not a JSON object"}})
+            continue
+        values, errors = [number], {}
+        for name, convert, required, _ in COLUMNS:
+            value = record.get(name)
+            if value is None or value == "":
+                if required:
+                    errors[name] = "missing"
+                values.append(None)
+                continue
+            try:
+                values.append(convert(value))
+            except (TypeError, ValueError) as e:
+                errors[name] = str(e)
+        if errors:
+            report.rejected.append({"row": number, "errors": errors})
+            continue
+        if values[COMPLETED_POSITION] is None:
+            values[COMPLETED_POSITION] = False
+        if (created := values[CREATED_POSITION]) is not None:
+            report.months.add(date(created.year, created.month, 1))
+        rows.append(tuple(values))
+    return rows
+
+
+def is_utf8(values: list[str]) -> bool:
+    """Whether values decoded with `surrogateescape` had no invalid bytes"""
+    try:
+        "".join(values).encode()
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+async def parse_records(chunks: AsyncIterator[bytes], format: ImportFormat) -> AsyncIterator[list[tuple[int, Any]]]:
+    """Yields the records of every block of the input with their row numbers, the CSV header is not counted"""
+    header, number = None, 0
+    async for block in complete_records(chunks, quoted=format == "csv"):
+        records = []
+        if format == "csv":
+            try:
+                content, valid = block.decode(), True
+            except UnicodeDecodeError:
+                # Records are split at line breaks, so invalid bytes are confined to the records containing them
+                content, valid = block.decode(errors="surrogateescape"), False
+            for values in csv.reader(io.StringIO(content)):
+                if not values:
+                    continue
+                if header is None:
+                    header = values
+                    continue
+                number += 1
+                if valid or is_utf8(values):
+                    records.append((number, dict(zip(header, values))))
+                else:
+                    records.append((number, InvalidRecord("not valid UTF-8")))
+        else:
+            for line in block.splitlines():
+                if not line.strip():
+                    continue
+                number += 1
+                try:
+                    records.append((number, orjson.loads(line)))
+                except orjson.JSONDecodeError:
+                    records.append((number, None))
+        yield records
+
+
+async def import_payment_stream(
+        session: AsyncSession,
+        chunks: AsyncIterator[bytes],
+        format: ImportFormat,
+        batch_size: int,
+        session_factory: Callable[[], AsyncSession] = async_session,
+) -> ImportReport:
+    """
+    Imports inter-user payments with their payments and reminders from a CSV or NDJSON byte stream.
+    The caller is responsible for committing, missing partitions are committed in a transaction of their own.
+    """
+    report = ImportReport()
+    started = time.perf_counter()
+
+    async def rows() -> AsyncIterator[tuple]:
+        batch: list[tuple[int, Any]] = []
+        async for records in parse_records(chunks, format):
+            batch.extend(records)
+            if len(batch) >= batch_size:
+                # Validation runs in a thread, so that the event loop keeps serving other requests
+                for row in await run_in_threadpool(validate_batch, batch, report):
+                    yield row
+                batch = []
+        for row in await run_in_threadpool(validate_batch, batch, report):
+            yield row
+
+    await session.execute(text(CREATE_STAGING_TABLE))
+    connection = await (await session.connection()).get_raw_connection()
+    await connection.driver_connection.copy_records_to_table(STAGING_TABLE, records=rows(), columns=COLUMN_NAMES)
+    await session.execute(text(f"ANALYZE {STAGING_TABLE}"))
+    copied = time.perf_counter()
+
+    for number, from_user_id, to_user_id, from_unknown, to_unknown in await session.execute(
+            text(REJECT_UNKNOWN_USERS)
+    ):
+        errors = {}
+        if from_unknown:
+            errors["from_user_id"] = f"user {from_user_id} does not exist"
+        if to_unknown:
+            errors["to_user_id"] = f"user {to_user_id} does not exist"
+        report.rejected.append({"row": number, "errors": errors})
+    report.rejected.sort(key=lambda rejected: rejected["row"])
+
+    if report.months:
+        async with session_factory() as partition_session, partition_session.begin():
+            if created := await create_missing_partitions(partition_session, report.months):
+                logger.info(f"Created partitions {', '.join(created)}")
+
+    for statement in MOVE_STATEMENTS:
+        result = await session.execute(text(statement))
+    report.imported = result.rowcount
+
+    logger.info(
+        f"Imported {report.imported} payments, rejected {len(report.rejected)} records, "
+        f"copied in {copied - started:.1f}s, moved in {time.perf_counter() - copied:.1f}s"
+    )
+    return report
+
+
+async def read_file(path: str, chunk_size: int = 1 << 20) -> AsyncIterator[bytes]:
+    with open(sys.stdin.fileno() if path == "-" else path, "rb", closefd=path != "-") as file:
+        while chunk := file.read(chunk_size):
+            yield chunk
+
+
+async def main(path: str, format: ImportFormat, gzip: bool, errors: str) -> None:
+    dictConfig(logger_config.dict())
+    chunks = read_file(path)
+    async with async_session() as session:
+        report = await import_payment_stream(
+            session, gunzip_stream(chunks) if gzip else chunks, format, settings.PAYMENT_IMPORT_BATCH_SIZE
+        )
+        await session.commit()
+    with open(sys.stdout.fileno() if errors == "-" else errors, "wb", closefd=errors != "-") as file:
+        for rejected in report.rejected:
+            file.write(ndjson_line(rejected))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import inter-user payments with their payments and reminders")
+    parser.add_argument("path", help="CSV or NDJSON file, optionally gzipped, - reads standard input")
+    parser.add_argument("--format", choices=("csv", "ndjson"), help="Input format, by default from the file name")
+    parser.add_argument("--errors", default="-", help="File the rejected records are written to as NDJSON")
+    arguments = parser.parse_args()
+    name = arguments.path.removesuffix(".gz")
+    asyncio.run(main(
+        arguments.path,
+        arguments.format or ("csv" if name.endswith(".csv") else "ndjson"),
+        arguments.path.endswith(".gz"),
+        arguments.errors,
+    ))
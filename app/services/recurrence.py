@@ -0,0 +1,139 @@
+"""Reminder recurrence rules"""
+
+import calendar
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+import numpy as np
+
+from app.models import Reminder
+
+FIXED_STEPS = {
+    Reminder.DAILY: timedelta(days=1),
+    Reminder.WEEKLY: timedelta(weeks=1),
+}
+MONTH_STEPS = {
+    Reminder.MONTHLY: 1,
+    Reminder.YEARLY: 12,
+}
+
+
+def add_months(moment: datetime, months: int) -> datetime:
+    """Shifts `moment` by whole months, clamping the day to the length of the target month"""
+    month_index = moment.year * 12 + moment.month - 1 + months
+    year, month = divmod(month_index, 12)
+    day = min(moment.day, calendar.monthrange(year, month + 1)[1])
+    return moment.replace(year=year, month=month + 1, day=day)
+
+
+def next_occurrence(moment: datetime, repeat: Optional[str], after: datetime) -> Optional[datetime]:
+    """
+    Returns the first occurrence of a reminder starting at `moment` that is strictly later than `after`.
+    Missed occurrences are skipped rather than replayed. Returns None for one-shot reminders.
+    """
+    if step := FIXED_STEPS.get(repeat):  # type: ignore
+        if moment > after:
+            return moment
+        return moment + step * ((after - moment) // step + 1)
+
+    if months := MONTH_STEPS.get(repeat):  # type: ignore
+        elapsed = (after.year - moment.year) * 12 + after.month - moment.month
+        count = max(elapsed // months, 0)
+        while (candidate := add_months(moment, count * months)) <= after:
+            count += 1
+        return candidate
+
+    if repeat is None:
+        return None
+    raise ValueError(f"Unknown reminder repeat type: {repeat}")
+
+
+ONCE, DAILY, WEEKLY, MONTHLY, YEARLY = range(5)
+
+REPEAT_CODES = {
+    None: ONCE,
+    Reminder.DAILY: DAILY,
+    Reminder.WEEKLY: WEEKLY,
+    Reminder.MONTHLY: MONTHLY,
+    Reminder.YEARLY: YEARLY,
+}
+FIXED_CODE_STEPS = {
+    DAILY: np.timedelta64(1, "D"),
+    WEEKLY: np.timedelta64(7, "D"),
+}
+MONTH_CODE_STEPS = {
+    MONTHLY: 1,
+    YEARLY: 12,
+}
+
+
+def repeat_codes(repeats: Iterable[Optional[str]]) -> np.ndarray:
+    """Encodes `Reminder.repeat` values, unknown values are treated as one-shot reminders"""
+    return np.fromiter((REPEAT_CODES.get(repeat, ONCE) for repeat in repeats), dtype=np.int8)
+
+
+def _ranges(starts: np.ndarray, counts: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """For every i yields (i, starts[i]), (i, starts[i] + 1), ... counts[i] times, flattened"""
+    owners = np.repeat(np.arange(len(counts)), counts)
+    offsets = np.arange(len(owners)) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owners, starts[owners] + offsets
+
+
+def _month_occurrences(
+        month_index: np.ndarray, day: np.ndarray, time_of_day: np.ndarray, months: np.ndarray
+) -> np.ndarray:
+    target = month_index + months
+    month_start = target.astype("M8[M]").astype("M8[D]")
+    month_length = ((target + 1).astype("M8[M]").astype("M8[D]") - month_start).astype(np.int64)
+    return (month_start + np.minimum(day, month_length - 1)).astype("M8[us]") + time_of_day
+
+
+def expand_occurrences(
+        remind_at: np.ndarray, repeat: np.ndarray, start: datetime, end: datetime
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Expands a batch of reminders into their occurrences within `[start, end)`.
+
+    `remind_at` is a `datetime64[us]` array of first occurrences and `repeat` the matching `repeat_codes`.
+    Returns positions into the input arrays and the occurrence moments, both grouped by repeat type.
+    Monthly and yearly occurrences keep the day of `remind_at`, clamped to the month length,
+    so the 31st fires on the last day of shorter months and February 29th on February 28th of common years.
+    """
+    remind_at = remind_at.astype("M8[us]")
+    window_start, window_end = np.datetime64(start, "us"), np.datetime64(end, "us")
+    positions, occurrences = [], []
+
+    selected = np.flatnonzero((repeat == ONCE) & (remind_at >= window_start) & (remind_at < window_end))
+    positions.append(selected)
+    occurrences.append(remind_at[selected])
+
+    for code, step in FIXED_CODE_STEPS.items():
+        selected = np.flatnonzero(repeat == code)
+        base = remind_at[selected]
+        step_us = step.astype("m8[us]").astype(np.int64)
+        first = np.maximum(0, -((base - window_start).astype(np.int64) // step_us))
+        counts = np.maximum(0, -((base - window_end).astype(np.int64) // step_us) - first)
+        owners, steps = _ranges(first, counts)
+        positions.append(selected[owners])
+        occurrences.append(base[owners] + steps * step.astype("m8[us]"))
+
+    for code, step in MONTH_CODE_STEPS.items():
+        selected = np.flatnonzero(repeat == code)
+        base = remind_at[selected]
+        month_index = base.astype("M8[M]").astype(np.int64)
+        day = (base.astype("M8[D]") - base.astype("M8[M]").astype("M8[D]")).astype(np.int64)
+        time_of_day = base - base.astype("M8[D]").astype("M8[us]")
+
+        first = np.maximum(0, -((month_index - window_start.astype("M8[M]").astype(np.int64)) // step))
+        first += _month_occurrences(month_index, day, time_of_day, first * step) < window_start
+        last = (window_end.astype("M8[M]").astype(np.int64) - month_index) // step
+        last -= _month_occurrences(month_index, day, time_of_day, last * step) >= window_end
+        counts = np.maximum(0, last - first + 1)
+
+        owners, steps = _ranges(first, counts)
+        positions.append(selected[owners])
+        occurrences.append(
+            _month_occurrences(month_index[owners], day[owners], time_of_day[owners], steps * step)
+        )
+
+    return np.concatenate(positions), np.concatenate(occurrences)
@@ -0,0 +1,181 @@
+"""
+Debt reports of a user in one currency.
+
+Amounts are summed per currency by the database and only these subtotals are converted, so a report costs
+one grouped query however many payments it covers. The totals of open debts per user and per counterpart come
+from the balance ledger, which is already summed per debtor, creditor and currency. Monthly totals are summed
+from the payments created in the requested months, only the partitions of these months are scanned.
+
+Subtotals are converted as floats by default. Exact reports sum the amounts as numerics and convert them
+in integer minor units of the currencies, rounding half to even once per subtotal.
+"""
+
+import functools
+from collections import defaultdict
+from datetime import date
+from decimal import ROUND_HALF_EVEN, Decimal
+from typing import Any, Hashable, Iterable, Union
+
+from babel.numbers import get_currency_precision
+from sqlalchemy import Float, Numeric, cast, func, literal_column, or_, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import InterUserPayment, InterUserPaymentArchive, Payment, UserBalance
+from app.services.exchange_rates import MissingExchangeRateError
+from app.services.partitions import add_months, month_of
+
+Units = Union[int, float]
+
+payment_table = InterUserPayment.__table__  # type: ignore
+archive_table = InterUserPaymentArchive.__table__  # type: ignore
+
+
+@functools.lru_cache(maxsize=None)
+def minor_unit_digits(currency: str) -> int:
+    return get_currency_precision(currency)
+
+
+class Converter:
+    """Conversion of subtotals into `currency` with rates of every currency in a common base currency"""
+
+    def __init__(self, rates: dict[str, Decimal], currency: str, exact: bool = False):
+        self.rates = rates
+        self.currency = currency
+        self.exact = exact
+        self.rate(currency)
+
+    def rate(self, currency: str) -> Decimal:
+        if (rate := self.rates.get(currency)) is None:
+            raise MissingExchangeRateError(currency)
+        return rate
+
+    def units(self, amount: Any, currency: str) -> Units:
+        """Amount summed by the database, in minor units of its currency when exact"""
+        if not self.exact:
+            return float(amount)
+        return int(Decimal(amount).scaleb(minor_unit_digits(currency)).to_integral_value(ROUND_HALF_EVEN))
+
+    def convert(self, units: Units, currency: str) -> Units:
+        if currency == self.currency:
+            return units
+        if not self.exact:
+            return units * float(self.rate(currency)) / float(self.rate(self.currency))
+        amount = Decimal(units).scaleb(-minor_unit_digits(currency)) * self.rate(currency) / self.rate(self.currency)
+        return self.units(amount, self.currency)
+
+    def value(self, units: Units, currency: str) -> Decimal:
+        digits = minor_unit_digits(currency)
+        if self.exact:
+            return Decimal(units).scaleb(-digits)
+        # Negative zero is rendered as 0
+        return Decimal(str(round(units, digits) or 0))
+
+
+def build_totals(rows: Iterable[tuple[Hashable, str, Any, Any]], converter: Converter) -> dict[Hashable, dict]:
+    """
+    Totals per group from `(group, currency, owed, receivable)` subtotals, amounts owed by the user and to the user.
+    Every total has the converted amounts and the subtotals in the original currencies.
+    """
+    groups: dict[Hashable, dict[str, list[Units]]] = defaultdict(dict)
+    for group, currency, *amounts in rows:
+        currency = str(currency)
+        subtotals = groups[group].setdefault(currency, [0, 0])
+        for index, amount in enumerate(amounts):
+            if amount is not None:
+                subtotals[index] += converter.units(amount, currency)
+
+    totals = {}
+    for group, subtotals in groups.items():
+        owed = sum(converter.convert(units, currency) for currency, (units, _) in subtotals.items())
+        receivable = sum(converter.convert(units, currency) for currency, (_, units) in subtotals.items())
+        totals[group] = {
+            "currency": converter.currency,
+            "owed": converter.value(owed, converter.currency),
+            "receivable": converter.value(receivable, converter.currency),
+            "net": converter.value(receivable - owed, converter.currency),
+            "currencies": [
+                {
+                    "currency": currency,
+                    "owed": converter.value(owed_units, currency),
+                    "receivable": converter.value(receivable_units, currency),
+                }
+                for currency, (owed_units, receivable_units) in sorted(subtotals.items())
+            ],
+        }
+    return totals
+
+
+def empty_total(converter: Converter) -> dict:
+    zero = converter.value(0, converter.currency)
+    return {"currency": converter.currency, "owed": zero, "receivable": zero, "net": zero, "currencies": []}
+
+
+def amounts(amount, user_id: int, from_user_id, to_user_id) -> tuple:
+    """Sums of the amounts owed by the user and to the user"""
+    return func.sum(amount).filter(from_user_id == user_id), func.sum(amount).filter(to_user_id == user_id)
+
+
+async def user_report(session: AsyncSession, user_id: int, converter: Converter) -> dict:
+    """Open debts of the user and to the user"""
+    amount = UserBalance.amount if converter.exact else cast(UserBalance.amount, Float)
+    rows = await session.execute(
+        select(UserBalance.currency, *amounts(amount, user_id, UserBalance.from_user_id, UserBalance.to_user_id))
+        .where(or_(UserBalance.from_user_id == user_id, UserBalance.to_user_id == user_id), UserBalance.amount != 0)
+        .group_by(UserBalance.currency)
+    )
+    totals = build_totals(((None, *row) for row in rows), converter)
+    return totals.get(None) or empty_total(converter)
+
+
+async def counterpart_report(session: AsyncSession, user_id: int, converter: Converter) -> list[dict]:
+    """Open debts of the user and to the user per counterpart"""
+    rows = await session.execute(
+        select(UserBalance.from_user_id, UserBalance.to_user_id, UserBalance.currency, UserBalance.amount)
+        .where(or_(UserBalance.from_user_id == user_id, UserBalance.to_user_id == user_id), UserBalance.amount != 0)
+    )
+    totals = build_totals(
+        (
+            (to_user_id, currency, amount, None) if from_user_id == user_id else (from_user_id, currency, None, amount)
+            for from_user_id, to_user_id, currency, amount in rows
+        ),
+        converter,
+    )
+    return [{"counterpart_id": counterpart_id, **totals[counterpart_id]} for counterpart_id in sorted(totals)]
+
+
+def payments_of(source, user_id: int, start: date, end: date):
+    return select(source.c.created, source.c.from_user_id, source.c.to_user_id, source.c.payment_id).where(
+        or_(source.c.from_user_id == user_id, source.c.to_user_id == user_id),
+        source.c.created >= start,
+        source.c.created < end,
+    )
+
+
+def monthly_statement(user_id: int, start: date, end: date, include_completed: bool, exact: bool):
+    """Amounts per month of creation and currency of the payments created within `[start, end)`"""
+    payments = payments_of(payment_table, user_id, start, end)
+    if include_completed:
+        payments = union_all(payments, payments_of(archive_table, user_id, start, end))
+    else:
+        payments = payments.where(payment_table.c.completed.is_(False))
+    payments = payments.subquery()
+
+    # A literal, a bound unit would be a different parameter in the select list and in GROUP BY
+    month = func.date_trunc(literal_column("'month'"), payments.c.created)
+    amount = cast(Payment.sum, Numeric(20, 4)) if exact else Payment.sum
+    return (
+        select(month, Payment.currency, *amounts(amount, user_id, payments.c.from_user_id, payments.c.to_user_id))
+        .join(Payment, Payment.id == payments.c.payment_id)
+        .group_by(month, Payment.currency)
+    )
+
+
+async def monthly_report(
+        session: AsyncSession, user_id: int, start: date, end: date, include_completed: bool, converter: Converter
+) -> list[dict]:
+    """Debts of the user and to the user per month of the payments created from the month of `start` to `end`"""
+    rows = await session.execute(
+        monthly_statement(user_id, month_of(start), add_months(month_of(end), 1), include_completed, converter.exact)
+    )
+    totals = build_totals(((month.date(), *subtotals) for month, *subtotals in rows), converter)
+    return [{"month": month, **totals[month]} for month in sorted(totals)]
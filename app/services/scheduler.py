@@ -0,0 +1,229 @@
+"""
+Due reminder scheduler.
+
+Any number of worker processes can run the scheduler against the same database:
+python -m app.services.scheduler
+
+By default every due reminder writes a notification for each open inter-user payment it belongs to
+into the outbox, in the same transaction. The notifications are delivered by `app.services.notifications`.
+
+Every worker claims due reminders in batches with `FOR UPDATE SKIP LOCKED`, so a reminder is never
+handled by two workers at once. The handler runs in the claiming transaction, and recurring reminders
+are moved to their next `remind_at` (one-shot reminders get `fired_at`) before that transaction commits.
+Occurrences are counted from the first `remind_at`, which is kept in `first_remind_at`, so a monthly reminder
+on the 31st fires on the last day of shorter months and on the 31st again afterwards.
+
+Between batches the worker keeps a min-heap of upcoming fire times and sleeps until the earliest one
+instead of polling. `remind_at` is a naive timestamp and is compared with UTC time.
+"""
+
+import asyncio
+import heapq
+import logging
+import signal
+from dataclasses import dataclass
+from datetime import datetime
+from logging.config import dictConfig
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import Integer, any_, bindparam, func, insert, literal, select, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.logger import logger_config
+from app.config.settings import settings
+from app.core.session import async_session
+from app.models import InterUserPayment, OutboxNotification, Payment, Reminder
+from app.services.recurrence import next_occurrence
+
+logger = logging.getLogger("app.services.scheduler")
+
+reminder_table = Reminder.__table__  # type: ignore
+
+
+@dataclass(frozen=True)
+class DueReminder:
+    id: int
+    remind_at: datetime
+    repeat: Optional[str]
+    # Occurrences of recurring reminders are counted from it
+    first_remind_at: datetime
+
+
+ReminderHandler = Callable[[AsyncSession, list[DueReminder]], Awaitable[None]]
+
+
+async def log_due_reminders(session: AsyncSession, reminders: list[DueReminder]) -> None:
+    logger.info(f"{len(reminders)} reminders are due: {[reminder.id for reminder in reminders]}")
+
+
+async def enqueue_payment_notifications(session: AsyncSession, reminders: list[DueReminder]) -> None:
+    """Writes a due payment notification to the debtor of every open inter-user payment of the reminders"""
+    statement = (
+        select(
+            InterUserPayment.from_user_id,
+            literal(OutboxNotification.DUE_PAYMENT),
+            func.jsonb_build_object(
+                "inter_user_payment_id", InterUserPayment.id,
+                "title", InterUserPayment.title,
+                "to_user_id", InterUserPayment.to_user_id,
+                "sum", Payment.sum,
+                "currency", Payment.currency,
+                "remind_at", Reminder.remind_at,
+            ),
+            literal(datetime.utcnow()),
+            InterUserPayment.id,
+        )
+        .join(Payment, Payment.id == InterUserPayment.payment_id)
+        .join(Reminder, Reminder.id == InterUserPayment.reminder_id)
+        .where(
+            InterUserPayment.reminder_id == any_(bindparam("reminder_ids", type_=ARRAY(Integer))),
+            InterUserPayment.completed.is_(False),
+            InterUserPayment.from_user_id.is_not(None),
+        )
+    )
+    result = await session.execute(
+        insert(OutboxNotification).from_select(
+            ["recipient_id", "kind", "payload", "next_attempt_at", "inter_user_payment_id"], statement
+        ),
+        {"reminder_ids": [reminder.id for reminder in reminders]},
+    )
+    logger.info(f"{len(reminders)} reminders are due, {result.rowcount} notifications were enqueued")
+
+
+class ReminderScheduler:
+    def __init__(
+            self,
+            handler: ReminderHandler = enqueue_payment_notifications,
+            batch_size: int = settings.REMINDER_SCHEDULER_BATCH_SIZE,
+            lookahead: int = settings.REMINDER_SCHEDULER_LOOKAHEAD,
+            max_sleep: float = settings.REMINDER_SCHEDULER_MAX_SLEEP,
+            session_factory: Callable[[], AsyncSession] = async_session,
+    ):
+        self.handler = handler
+        self.batch_size = batch_size
+        self.lookahead = lookahead
+        self.max_sleep = max_sleep
+        self.session_factory = session_factory
+
+        self._upcoming: list[datetime] = []
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+
+    @staticmethod
+    def now() -> datetime:
+        return datetime.utcnow()
+
+    def notify(self, remind_at: datetime) -> None:
+        """Makes the worker aware of a reminder created or moved after its last refresh"""
+        heapq.heappush(self._upcoming, remind_at)
+        self._wakeup.set()
+
+    def stop(self) -> None:
+        self._stopping = True
+        self._wakeup.set()
+
+    async def claim_due(self, now: datetime) -> int:
+        """Claims, handles and advances one batch of due reminders, returns the number of claimed rows"""
+        async with self.session_factory() as session, session.begin():
+            rows = (
+                await session.execute(
+                    select(
+                        reminder_table.c.id,
+                        reminder_table.c.remind_at,
+                        reminder_table.c.repeat,
+                        func.coalesce(reminder_table.c.first_remind_at, reminder_table.c.remind_at),
+                    )
+                    .where(reminder_table.c.fired_at.is_(None), reminder_table.c.remind_at <= now)
+                    .order_by(reminder_table.c.remind_at)
+                    .limit(self.batch_size)
+                    .with_for_update(skip_locked=True)
+                )
+            ).all()
+            if not rows:
+                return 0
+
+            reminders = [DueReminder(*row) for row in rows]
+            await self.handler(session, reminders)
+
+            recurring = [
+                {
+                    "reminder_id": reminder.id,
+                    "next_remind_at": next_occurrence(reminder.first_remind_at, reminder.repeat, now),
+                }
+                for reminder in reminders
+                if reminder.repeat in Reminder.REPEAT_TYPES
+            ]
+            fired = [reminder.id for reminder in reminders if reminder.repeat not in Reminder.REPEAT_TYPES]
+
+            if recurring:
+                await session.execute(
+                    update(reminder_table)
+                    .where(reminder_table.c.id == bindparam("reminder_id"))
+                    .values(
+                        remind_at=bindparam("next_remind_at"),
+                        first_remind_at=func.coalesce(reminder_table.c.first_remind_at, reminder_table.c.remind_at),
+                    ),
+                    recurring,
+                )
+            if fired:
+                await session.execute(
+                    update(reminder_table).where(reminder_table.c.id.in_(fired)).values(fired_at=now)
+                )
+        for item in recurring:
+            heapq.heappush(self._upcoming, item["next_remind_at"])
+        return len(rows)
+
+    async def refresh_upcoming(self, now: datetime) -> None:
+        async with self.session_factory() as session:
+            upcoming = (
+                await session.execute(
+                    select(reminder_table.c.remind_at)
+                    .where(reminder_table.c.fired_at.is_(None), reminder_table.c.remind_at > now)
+                    .order_by(reminder_table.c.remind_at)
+                    .limit(self.lookahead)
+                )
+            ).scalars().all()
+        self._upcoming = list(upcoming)
+        heapq.heapify(self._upcoming)
+
+    async def sleep_until_next(self, now: datetime) -> None:
+        while self._upcoming and self._upcoming[0] <= now:
+            heapq.heappop(self._upcoming)
+        delay = self.max_sleep
+        if self._upcoming:
+            delay = min(delay, (self._upcoming[0] - now).total_seconds())
+
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+
+    async def run(self) -> None:
+        logger.info("Reminder scheduler started")
+        while not self._stopping:
+            now = self.now()
+            try:
+                claimed = await self.claim_due(now)
+                if claimed >= self.batch_size:
+                    continue
+                if not self._upcoming or self._upcoming[0] <= now:
+                    await self.refresh_upcoming(now)
+            except Exception as e:
+                logger.error(f"Error when processing due reminders: {e}")
+            await self.sleep_until_next(self.now())
+        logger.info("Reminder scheduler stopped")
+
+
+async def main() -> None:
+    dictConfig(logger_config.dict())
+    scheduler = ReminderScheduler()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, scheduler.stop)
+    await scheduler.run()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
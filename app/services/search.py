@@ -0,0 +1,62 @@
+"""
+Search of inter-user payments by title and of users by username, backed by the `pg_trgm` GIN indexes.
+
+A text matches when it contains the query, case-insensitively, or when it has a word similar to the query:
+`text %> query` holds when `word_similarity(query, text)` reaches `pg_trgm.word_similarity_threshold`, which
+tolerates typos. The trigram index answers both conditions. Matches are ranked by the word similarity,
+so texts with the query as a whole word come first, then prefixes and substrings, then similar words.
+"""
+
+from sqlalchemy import Float, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import ColumnElement, Select
+
+from app.models import InterUserPayment, User
+
+# Substring patterns of fewer characters have no trigram the index could look up
+MIN_QUERY_LENGTH = 3
+# Planner cost of an operator evaluation during searches, ten times the default
+SEARCH_OPERATOR_COST = 0.025
+
+
+def contains_pattern(query: str) -> str:
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def matches(column, query: str) -> ColumnElement:
+    return or_(column.ilike(contains_pattern(query), escape="\\"), column.op("%>")(query))
+
+
+def rank(column, query: str) -> ColumnElement:
+    return func.word_similarity(query, column, type_=Float)
+
+
+async def configure_search(session: AsyncSession, threshold: float) -> None:
+    """
+    Sets the threshold of `%>` for the rest of the transaction, and how its statements are planned.
+    A generic plan of the prepared statement looks up the query in the trigram index even for users with few
+    payments, which takes a second for a common word where the indexes of the user take milliseconds.
+    `%>` and `ILIKE` take microseconds per row, where the default operator cost is that of `=`: planned at it,
+    the search of a user with many payments rechecks every title the trigram index returns rather than
+    intersect it with the indexes of the user, seconds longer.
+    """
+    await session.execute(select(
+        func.set_config("pg_trgm.word_similarity_threshold", str(threshold), True),
+        func.set_config("plan_cache_mode", "force_custom_plan", True),
+        func.set_config("cpu_operator_cost", str(SEARCH_OPERATOR_COST), True),
+    ))
+
+
+def payment_search_statement(user_id: int, query: str) -> tuple[Select, ColumnElement]:
+    """Payments of the user as debtor or creditor whose title matches the query, with their rank"""
+    statement = select(InterUserPayment).where(
+        or_(InterUserPayment.from_user_id == user_id, InterUserPayment.to_user_id == user_id),
+        matches(InterUserPayment.title, query),
+    )
+    return statement, rank(InterUserPayment.title, query)
+
+
+def user_search_statement(query: str) -> tuple[Select, ColumnElement]:
+    """Users whose username matches the query, with their rank"""
+    return select(User).where(matches(User.username, query)), rank(User.username, query)
@@ -0,0 +1,124 @@
+"""
+Debt simplification.
+
+Open debts within a group of users are reduced to net balances per currency, and then to a short list of
+transfers which settles all of them. For small groups the minimal number of transfers is found exactly:
+it equals the number of users with a non-zero balance minus the largest number of disjoint zero-sum
+subgroups they can be split into. Larger groups are settled greedily by matching the largest debtor
+with the largest creditor, which needs at most one transfer less than the number of users.
+
+Amounts are handled as integers in ledger minor units (1/10000), so zero sums are exact.
+"""
+
+import heapq
+from collections import defaultdict
+from decimal import Decimal
+from typing import Iterable, NamedTuple, Optional
+
+from sqlalchemy import Integer, any_, bindparam, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import UserBalance
+
+UNITS = 10_000
+
+
+class Transfer(NamedTuple):
+    from_user_id: int
+    to_user_id: int
+    amount: int
+
+
+def net_balances(debts: Iterable[tuple[int, int, int]]) -> dict[int, int]:
+    """Net balance per user from `(debtor, creditor, amount)` debts, positive for creditors"""
+    balances: dict[int, int] = defaultdict(int)
+    for from_user_id, to_user_id, amount in debts:
+        balances[from_user_id] -= amount
+        balances[to_user_id] += amount
+    return {user_id: balance for user_id, balance in balances.items() if balance}
+
+
+def settle_greedily(balances: dict[int, int]) -> list[Transfer]:
+    creditors = [(-balance, user_id) for user_id, balance in balances.items() if balance > 0]
+    debtors = [(balance, user_id) for user_id, balance in balances.items() if balance < 0]
+    heapq.heapify(creditors)
+    heapq.heapify(debtors)
+
+    transfers = []
+    while creditors and debtors:
+        credit, creditor = heapq.heappop(creditors)
+        debt, debtor = heapq.heappop(debtors)
+        amount = min(-credit, -debt)
+        transfers.append(Transfer(debtor, creditor, amount))
+        if -credit > amount:
+            heapq.heappush(creditors, (credit + amount, creditor))
+        if -debt > amount:
+            heapq.heappush(debtors, (debt + amount, debtor))
+    return transfers
+
+
+def settle_exactly(balances: dict[int, int]) -> list[Transfer]:
+    """Minimal settlement, exponential in the number of users"""
+    users = list(balances)
+    full = (1 << len(users)) - 1
+
+    sums = [0] * (full + 1)
+    groups = [0] * (full + 1)
+    for mask in range(1, full + 1):
+        lowest = (mask & -mask).bit_length() - 1
+        sums[mask] = sums[mask & (mask - 1)] + balances[users[lowest]]
+        groups[mask] = max(groups[mask & ~(1 << i)] for i in range(len(users)) if mask >> i & 1)
+        groups[mask] += sums[mask] == 0
+
+    transfers, mask, group = [], full, full
+    while mask:
+        target = groups[mask] - (sums[mask] == 0)
+        i = next(i for i in range(len(users)) if mask >> i & 1 and groups[mask & ~(1 << i)] == target)
+        mask &= ~(1 << i)
+        if sums[mask] == 0:
+            subgroup = group & ~mask
+            transfers += settle_greedily({users[i]: balances[users[i]] for i in range(len(users)) if subgroup >> i & 1})
+            group = mask
+    return transfers
+
+
+def simplify_debts(balances: dict[int, int], exact_max_users: int) -> list[Transfer]:
+    balances = {user_id: balance for user_id, balance in balances.items() if balance}
+    if len(balances) <= exact_max_users:
+        return settle_exactly(balances)
+    return settle_greedily(balances)
+
+
+async def load_group_debts(
+        session: AsyncSession, user_ids: list[int], currency: Optional[str] = None, chunk_size: int = 10_000
+) -> dict[str, list[tuple[int, int, int]]]:
+    """Streams open debts between members of the group from the balance ledger, grouped by currency"""
+    members = bindparam("user_ids", user_ids, type_=ARRAY(Integer))
+    statement = select(UserBalance.from_user_id, UserBalance.to_user_id, UserBalance.currency, UserBalance.amount).where(
+        UserBalance.from_user_id == any_(members), UserBalance.to_user_id == any_(members), UserBalance.amount != 0
+    )
+    if currency:
+        statement = statement.where(UserBalance.currency == currency)
+
+    debts: dict[str, list[tuple[int, int, int]]] = defaultdict(list)
+    result = await session.stream(statement.execution_options(yield_per=chunk_size))
+    async for rows in result.partitions(chunk_size):
+        for from_user_id, to_user_id, row_currency, amount in rows:
+            debts[str(row_currency)].append((from_user_id, to_user_id, int(amount * UNITS)))
+    return debts
+
+
+async def settle_group(
+        session: AsyncSession, user_ids: list[int], exact_max_users: int, currency: Optional[str] = None
+) -> list[dict]:
+    settlement = []
+    for debt_currency, debts in (await load_group_debts(session, user_ids, currency)).items():
+        for transfer in simplify_debts(net_balances(debts), exact_max_users):
+            settlement.append({
+                "from_user_id": transfer.from_user_id,
+                "to_user_id": transfer.to_user_id,
+                "currency": debt_currency,
+                "amount": Decimal(transfer.amount) / UNITS,
+            })
+    return settlement
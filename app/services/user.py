@@ -0,0 +1,46 @@
+"""Set-based user operations"""
+
+from typing import Iterable
+
+from sqlalchemy import func, literal_column, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import User
+from app.schemas.user import UserSchema
+
+CREATED = "created"
+UPDATED = "updated"
+UNCHANGED = "unchanged"
+
+user_table = User.__table__  # type: ignore
+
+
+async def bulk_upsert_users(session: AsyncSession, users: Iterable[UserSchema], chunk_size: int) -> dict[int, str]:
+    """
+    Inserts or updates users with one multi-row `INSERT ... ON CONFLICT (id) DO UPDATE` per chunk.
+    Rows whose values did not change are not touched. Returns the status of every user id,
+    when an id is repeated the last record wins. The caller is responsible for committing.
+    """
+    records = {user.id: user.dict(include={"id", "full_name", "username", "language"}) for user in users}
+    statuses = dict.fromkeys(records, UNCHANGED)
+    values = list(records.values())
+
+    for offset in range(0, len(values), chunk_size):
+        statement = insert(user_table).values(values[offset:offset + chunk_size])
+        statement = statement.on_conflict_do_update(
+            index_elements=[user_table.c.id],
+            set_={
+                "full_name": statement.excluded.full_name,
+                "username": statement.excluded.username,
+                "language": statement.excluded.language,
+                "updated": func.now(),
+            },
+            where=tuple_(user_table.c.full_name, user_table.c.username, user_table.c.language).is_distinct_from(
+                tuple_(statement.excluded.full_name, statement.excluded.username, statement.excluded.language)
+            ),
+        ).returning(user_table.c.id, literal_column("xmax = 0").label("created"))
+
+        for user_id, created in (await session.execute(statement)).all():
+            statuses[user_id] = CREATED if created else UPDATED
+    return statuses
@@ -0,0 +1,102 @@
+"""
+Fixtures of the tests which need the database of `settings.DATABASE_URI`, migrated to the head revision.
+Such tests are skipped when the database can not be reached.
+"""
+
+import uuid
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.api.deps import authentication_token_cache
+from app.core.session import async_engine
+
+# Users created by the tests have ids above the ids of real users and below the ids of the benchmarks' users
+TEST_USER_ID_OFFSET = 1_900_000_000
+
+SEED_PAYMENTS = """
+WITH payments AS (
+    INSERT INTO payment (sum, bank, currency, card_number)
+    SELECT 10 + g, 'Test bank', (ARRAY['EUR', 'USD', 'RUB'])[1 + g % 3], '4000000000000000'
+    FROM generate_series(1, :payments) AS g
+    RETURNING id
+), reminders AS (
+    INSERT INTO reminder (remind_at, repeat)
+    SELECT now() + g * interval '1 day', (ARRAY[NULL, 'weekly', 'monthly'])[1 + g % 3]
+    FROM generate_series(1, :payments) AS g
+    RETURNING id
+), numbered_payments AS (
+    SELECT id, row_number() OVER () AS n FROM payments
+), numbered_reminders AS (
+    SELECT id, row_number() OVER () AS n FROM reminders
+)
+INSERT INTO inter_user_payment (title, from_user_id, to_user_id, payment_id, reminder_id, completed)
+SELECT
+    :title,
+    :from_user_id,
+    (CAST(:to_user_ids AS integer[]))[1 + n % 2],
+    numbered_payments.id,
+    numbered_reminders.id,
+    n % 5 = 0
+FROM numbered_payments JOIN numbered_reminders USING (n)
+RETURNING id, payment_id, reminder_id
+"""
+
+
+@pytest.fixture
+async def database():
+    try:
+        async with async_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+    except (OSError, SQLAlchemyError) as e:
+        pytest.skip(f"Database is not available: {e}")
+    yield async_engine
+    # Pooled connections belong to the event loop of the test
+    await async_engine.dispose()
+
+
+@pytest.fixture
+async def users(database):
+    """Ids of three users, deleted with everything referencing them after the test"""
+    user_ids = [TEST_USER_ID_OFFSET + number for number in (1, 2, 3)]
+    async with database.begin() as connection:
+        await connection.execute(text("DELETE FROM \"user\" WHERE id = ANY(:ids)"), {"ids": user_ids})
+        await connection.execute(
+            text("INSERT INTO \"user\" (id, full_name, language) VALUES (:id, 'Test user', 'en')"),
+            [{"id": user_id} for user_id in user_ids],
+        )
+    yield user_ids
+    async with database.begin() as connection:
+        await connection.execute(text("DELETE FROM \"user\" WHERE id = ANY(:ids)"), {"ids": user_ids})
+
+
+@pytest.fixture
+async def auth_token(database):
+    """Authentication token, the token cache is empty at the start and at the end of the test"""
+    token = str(uuid.uuid4())
+    async with database.begin() as connection:
+        await connection.execute(text("INSERT INTO auth_token (id, title) VALUES (:id, 'test')"), {"id": token})
+    authentication_token_cache.clear()
+    yield token
+    authentication_token_cache.clear()
+    async with database.begin() as connection:
+        await connection.execute(text("DELETE FROM auth_token WHERE id = :id"), {"id": token})
+
+
+@pytest.fixture
+async def payments(database, users):
+    """Ids of 60 inter-user payments from the first user to the others"""
+    async with database.begin() as connection:
+        rows = (await connection.execute(text(SEED_PAYMENTS), {
+            "payments": 60, "title": "Test payment", "from_user_id": users[0], "to_user_ids": users[1:],
+        })).all()
+    yield [row.id for row in rows]
+    # Deleting the payments cascades to the inter-user payments, which are the only link to the reminders
+    async with database.begin() as connection:
+        await connection.execute(
+            text("DELETE FROM payment WHERE id = ANY(:ids)"), {"ids": [row.payment_id for row in rows]}
+        )
+        await connection.execute(
+            text("DELETE FROM reminder WHERE id = ANY(:ids)"), {"ids": [row.reminder_id for row in rows]}
+        )
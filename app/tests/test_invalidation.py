@@ -0,0 +1,50 @@
+import asyncio
+from decimal import Decimal
+
+import asyncpg
+import pytest
+
+from app.core.invalidation import invalidation_bus
+from app.core.session import async_session
+from app.models import ExchangeRate
+# Registers the cache of the exchange rates
+from app.services import exchange_rates  # noqa: F401
+
+CURRENCY = "ISK"
+
+
+@pytest.fixture
+async def notifications(database):
+    """Payloads notified on the invalidation channel during the test"""
+    received: asyncio.Queue[str] = asyncio.Queue()
+    connection = await asyncpg.connect(invalidation_bus.dsn)
+    await connection.add_listener(invalidation_bus.channel, lambda *args: received.put_nowait(args[-1]))
+    yield received
+    await connection.close()
+
+
+@pytest.fixture
+async def exchange_rate(database):
+    async with async_session() as session:
+        if (rate := await session.get(ExchangeRate, CURRENCY)) is not None:
+            await session.delete(rate)
+        session.add(ExchangeRate(currency=CURRENCY, rate=Decimal("0.0071")))
+        await session.commit()
+    yield CURRENCY
+    async with async_session() as session:
+        if (rate := await session.get(ExchangeRate, CURRENCY)) is not None:
+            await session.delete(rate)
+            await session.commit()
+
+
+async def test_orm_changes_of_a_model_keyed_by_another_column_are_notified(exchange_rate, notifications):
+    """Exchange rates are keyed by their currency, they have no `id`"""
+    async with async_session() as session:
+        rate = await session.get(ExchangeRate, exchange_rate)
+        rate.rate = Decimal("0.0072")
+        await session.commit()
+        assert await asyncio.wait_for(notifications.get(), 5) == f"exchange_rate:{exchange_rate}"
+
+        await session.delete(rate)
+        await session.commit()
+        assert await asyncio.wait_for(notifications.get(), 5) == f"exchange_rate:{exchange_rate}"
@@ -0,0 +1,29 @@
+import httpx
+import pytest
+
+from app.config.settings import settings
+from app.main import app
+
+PATHS = ("/metrics", "/metrics/pool")
+
+
+async def get(path: str, headers: dict) -> httpx.Response:
+    async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),  # type: ignore
+            base_url="http://localhost",
+            headers=headers,
+    ) as client:
+        return await client.get(path)
+
+
+@pytest.mark.parametrize("path", PATHS)
+async def test_metrics_require_a_token(auth_token, path):
+    assert (await get(path, {})).status_code == 403
+    assert (await get(path, {"Authorization": f"Bearer {auth_token}"})).status_code == 200
+
+
+@pytest.mark.parametrize("path", PATHS)
+async def test_public_metrics_need_no_token(monkeypatch, path):
+    monkeypatch.setattr(settings, "METRICS_PUBLIC", True)
+
+    assert (await get(path, {})).status_code == 200
@@ -0,0 +1,159 @@
+from datetime import datetime, timedelta
+from typing import Optional
+
+import pytest
+from sqlalchemy import text
+
+from app.services.notifications import (
+    DeliveryError,
+    FakeSender,
+    NotificationDispatcher,
+    NotificationSender,
+    OutboxMessage,
+)
+
+KIND = "test"
+NOW = datetime(2026, 1, 1, 12)
+
+
+class RetryAfterSender(NotificationSender):
+    def __init__(self, retry_after: Optional[float]):
+        self.retry_after = retry_after
+
+    async def send(self, message: OutboxMessage) -> None:
+        raise DeliveryError("Messenger is busy", retry_after=self.retry_after)
+
+
+def make_dispatcher(sender: NotificationSender, now: datetime = NOW, **options) -> NotificationDispatcher:
+    dispatcher = NotificationDispatcher(sender, kinds=[KIND], **options)
+    dispatcher.now = lambda: now
+    return dispatcher
+
+
+async def enqueue(database, recipient_ids: list[int], attempts: int = 0) -> None:
+    async with database.begin() as connection:
+        await connection.execute(
+            text(
+                "INSERT INTO outbox_notification (recipient_id, kind, payload, next_attempt_at, status, attempts) "
+                "VALUES (:recipient_id, :kind, '{}', :now, 'pending', :attempts)"
+            ),
+            [
+                {"recipient_id": recipient_id, "kind": KIND, "now": NOW, "attempts": attempts}
+                for recipient_id in recipient_ids
+            ],
+        )
+
+
+async def notifications(database) -> list[dict]:
+    async with database.connect() as connection:
+        rows = await connection.execute(
+            text(
+                "SELECT recipient_id, status, attempts, next_attempt_at, last_error FROM outbox_notification "
+                "WHERE kind = :kind ORDER BY id"
+            ),
+            {"kind": KIND},
+        )
+        return [dict(row._mapping) for row in rows]
+
+
+def test_sender_must_implement_send():
+    with pytest.raises(TypeError):
+        NotificationSender()
+
+
+async def test_delivered(database, users):
+    await enqueue(database, users)
+    sender = FakeSender()
+
+    assert await make_dispatcher(sender).dispatch_batch() == 3
+
+    assert sorted(message.recipient_id for message in sender.sent) == users
+    assert [row["status"] for row in await notifications(database)] == ["delivered"] * 3
+
+
+async def test_failed_delivery_is_retried_with_backoff(database, users):
+    await enqueue(database, users[:1])
+    dispatcher = make_dispatcher(FakeSender(failure_rate=1.0), backoff_base=10.0, backoff_max=1000.0)
+
+    await dispatcher.dispatch_batch()
+    [row] = await notifications(database)
+    assert row["status"] == "pending"
+    assert row["attempts"] == 1
+    assert "Simulated delivery failure" in row["last_error"]
+    # The delay is jittered within the upper half of `backoff_base * 2 ** (attempts - 1)`
+    assert NOW + timedelta(seconds=5) <= row["next_attempt_at"] <= NOW + timedelta(seconds=10)
+
+    dispatcher.now = lambda: row["next_attempt_at"]
+    await dispatcher.dispatch_batch()
+    [row] = await notifications(database)
+    assert row["attempts"] == 2
+    assert NOW + timedelta(seconds=15) <= row["next_attempt_at"] <= NOW + timedelta(seconds=30)
+
+
+async def test_backoff_is_capped(database, users):
+    await enqueue(database, users[:1], attempts=20)
+
+    await make_dispatcher(FakeSender(failure_rate=1.0), max_attempts=30, backoff_max=60.0).dispatch_batch()
+
+    [row] = await notifications(database)
+    assert NOW + timedelta(seconds=30) <= row["next_attempt_at"] <= NOW + timedelta(seconds=60)
+
+
+async def test_retry_after_overrides_backoff(database, users):
+    await enqueue(database, users[:1])
+
+    await make_dispatcher(RetryAfterSender(retry_after=120.0), backoff_base=1.0).dispatch_batch()
+
+    [row] = await notifications(database)
+    assert row["next_attempt_at"] == NOW + timedelta(seconds=120)
+
+
+async def test_last_attempt_fails_for_good(database, users):
+    await enqueue(database, users[:1], attempts=2)
+    dispatcher = make_dispatcher(FakeSender(failure_rate=1.0), max_attempts=3)
+
+    await dispatcher.dispatch_batch()
+
+    [row] = await notifications(database)
+    assert (row["status"], row["attempts"]) == ("failed", 3)
+    assert dispatcher.failed == 1
+    dispatcher.now = lambda: NOW + timedelta(days=1)
+    assert await dispatcher.dispatch_batch() == 0
+
+
+async def test_claimed_notifications_are_leased(database, users):
+    await enqueue(database, users)
+    first = make_dispatcher(FakeSender(), lease=300.0)
+
+    claimed = await first.claim(NOW)
+
+    assert sorted(message.recipient_id for message in claimed) == users
+    assert {row["next_attempt_at"] for row in await notifications(database)} == {NOW + timedelta(seconds=300)}
+    # Another dispatcher does not pick them up until the lease of the first one runs out
+    second = make_dispatcher(FakeSender(), lease=300.0)
+    assert await second.claim(NOW + timedelta(seconds=299)) == []
+    assert len(await second.claim(NOW + timedelta(seconds=300))) == 3
+
+
+async def test_batch_size_limits_claim(database, users):
+    await enqueue(database, users)
+
+    assert len(await make_dispatcher(FakeSender(), batch_size=2).claim(NOW)) == 2
+    assert len(await make_dispatcher(FakeSender(), batch_size=2).claim(NOW)) == 1
+
+
+async def test_recipient_rate_limit_defers_notifications(database, users):
+    await enqueue(database, [users[0]] * 5 + [users[1]])
+    sender = FakeSender()
+    dispatcher = make_dispatcher(sender, recipient_rate=0.5, recipient_burst=2)
+
+    await dispatcher.dispatch_batch()
+
+    assert sorted(message.recipient_id for message in sender.sent) == [users[0], users[0], users[1]]
+    deferred = [row for row in await notifications(database) if row["status"] == "pending"]
+    assert len(deferred) == 3
+    # Deferred notifications were not attempted, they wait until their recipient has a token again
+    assert all(row["attempts"] == 0 and row["last_error"] is None for row in deferred)
+    assert all(
+        NOW + timedelta(seconds=1.9) <= row["next_attempt_at"] <= NOW + timedelta(seconds=2) for row in deferred
+    )
@@ -0,0 +1,52 @@
+import httpx
+from sqlalchemy import text
+
+from app.main import app
+from app.services.payment_import import ImportReport, parse_records, validate_batch
+
+HEADER = b"title,from_user_id,to_user_id,sum,currency,bank,remind_at\n"
+
+
+def csv_body(from_user_id: int, to_user_id: int) -> bytes:
+    row = f"{{}},{from_user_id},{to_user_id},10.5,EUR,Test bank,2030-01-01T00:00:00\n".encode()
+    return HEADER + row.replace(b"{}", b"Rent") + row.replace(b"{}", b"Caf\xe9") + row.replace(b"{}", b"Gym")
+
+
+async def chunks_of(body: bytes, size: int):
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+async def test_csv_records_which_are_not_utf8_are_rejected():
+    report = ImportReport()
+    records = [record async for block in parse_records(chunks_of(csv_body(1, 2), 16), "csv") for record in block]
+
+    rows = validate_batch(records, report)
+
+    assert [row[0] for row in rows] == [1, 3]
+    assert report.rejected == [{"row": 2, "errors": {"record": "not valid UTF-8"}}]
+
+
+async def test_import_reports_csv_records_which_are_not_utf8(database, auth_token, users):
+    async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),  # type: ignore
+            base_url="http://localhost",
+            headers={"Authorization": f"Bearer {auth_token}"},
+    ) as client:
+        response = await client.post("/import/payments?format=csv", content=csv_body(users[0], users[1]))
+
+    # Deleting the payments cascades to the inter-user payments, which are the only link to the reminders
+    async with database.begin() as connection:
+        imported = (await connection.execute(
+            text("SELECT payment_id, reminder_id FROM inter_user_payment WHERE from_user_id = :id"), {"id": users[0]}
+        )).all()
+        await connection.execute(
+            text("DELETE FROM payment WHERE id = ANY(:ids)"), {"ids": [row.payment_id for row in imported]}
+        )
+        await connection.execute(
+            text("DELETE FROM reminder WHERE id = ANY(:ids)"), {"ids": [row.reminder_id for row in imported]}
+        )
+    assert response.status_code == 200, response.text
+    assert response.json()["imported"] == 2
+    assert response.json()["rejected"] == [{"row": 2, "errors": {"record": "not valid UTF-8"}}]
+    assert len(imported) == 2
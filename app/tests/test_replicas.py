@@ -0,0 +1,105 @@
+"""
+Routing between the primary and a read replica. Needs a streaming replica of the test database,
+whose URI is taken from `TEST_DATABASE_REPLICA_URI`, the tests are skipped without it.
+"""
+
+import os
+import uuid
+
+import pytest
+from sqlalchemy import text
+from starlette.requests import Request
+
+from app.api import deps
+from app.api.deps import authentication_token_cache, get_authentication_token, get_session
+from app.config.settings import settings
+from app.core import session as session_module
+from app.core.session import LazySession, ReplicaSet
+
+IN_RECOVERY = text("SELECT pg_is_in_recovery()")
+
+
+def make_request(method: str, client: str) -> Request:
+    return Request({"type": "http", "method": method, "headers": [(b"authorization", client.encode())]})
+
+
+@pytest.fixture
+async def replica_set(database, monkeypatch):
+    if not (uri := os.environ.get("TEST_DATABASE_REPLICA_URI")):
+        pytest.skip("TEST_DATABASE_REPLICA_URI is not set")
+    replicas = ReplicaSet([uri], check_interval=60.0, max_lag=60.0, connect_timeout=2.0)
+    await replicas.check_all()
+    if not replicas.healthy[0]:
+        pytest.skip("Read replica is not available")
+    monkeypatch.setattr(session_module, "replica_set", replicas)
+    monkeypatch.setattr(deps, "replica_set", replicas)
+    yield replicas
+    await replicas.stop()
+
+
+@pytest.fixture
+async def paused_replica(replica_set):
+    """Replica which does not replay changes of the primary until the end of the test"""
+    async with replica_set.engines[0].connect() as connection:
+        await connection.execute(text("SELECT pg_wal_replay_pause()"))
+    try:
+        yield replica_set
+    finally:
+        async with replica_set.engines[0].connect() as connection:
+            await connection.execute(text("SELECT pg_wal_replay_resume()"))
+
+
+async def in_recovery(session: LazySession) -> bool:
+    try:
+        return (await session.execute(IN_RECOVERY)).scalar()
+    finally:
+        await session.release()
+
+
+async def test_read_only_sessions_use_the_replica(replica_set):
+    assert await in_recovery(LazySession(read_only=True))
+    assert not await in_recovery(LazySession())
+
+
+async def test_unhealthy_replica_is_not_used(replica_set):
+    replica_set.set_health(0, False)
+
+    assert not await in_recovery(LazySession(read_only=True))
+
+
+async def test_safe_requests_use_the_replica_until_the_client_writes(replica_set):
+    deps.primary_stickiness.clear()
+    client = f"Bearer {uuid.uuid4()}"
+
+    for method, on_replica in (("GET", True), ("POST", False), ("GET", False)):
+        sessions = get_session(make_request(method, client))
+        assert await in_recovery(await sessions.__anext__()) is on_replica
+        await sessions.aclose()
+
+
+@pytest.mark.parametrize("single_flight", [False, True])
+async def test_token_missing_on_a_lagging_replica_is_found_on_the_primary(
+        paused_replica, auth_token, monkeypatch, single_flight
+):
+    monkeypatch.setattr(settings, "SINGLE_FLIGHT_ENABLED", single_flight)
+    replica = LazySession(read_only=True)
+    count = text("SELECT count(*) FROM auth_token WHERE id = :id")
+    assert (await replica.execute(count, {"id": auth_token})).scalar() == 0
+    await replica.release()
+
+    session = LazySession(read_only=True)
+    found = await get_authentication_token(session, auth_token)
+    await session.release()
+
+    assert found is not None and str(found.id) == auth_token
+    assert authentication_token_cache.get(auth_token)[1] is not None
+
+
+async def test_unknown_token_miss_is_cached_after_the_primary_lookup(replica_set, auth_token):
+    unknown = str(uuid.uuid4())
+    session = LazySession(read_only=True)
+
+    assert await get_authentication_token(session, unknown) is None
+    await session.release()
+
+    assert authentication_token_cache.get(unknown) == (True, None)
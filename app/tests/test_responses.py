@@ -0,0 +1,37 @@
+import httpx
+import pytest
+
+from app.config.settings import settings
+from app.main import app
+
+EXPAND_ALL = "from_user,to_user,payment,reminder"
+
+
+async def get(auth_token: str, url: str, fast: bool, monkeypatch) -> httpx.Response:
+    monkeypatch.setattr(settings, "FAST_RESPONSES_ENABLED", fast)
+    async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),  # type: ignore
+            base_url="http://localhost",
+            headers={"Authorization": f"Bearer {auth_token}"},
+    ) as client:
+        return await client.get(url)
+
+
+@pytest.mark.parametrize("template", [
+    "/user/{user_id}",
+    "/user?limit=10",
+    "/inter-user-payment/{id}",
+    f"/inter-user-payment/{{id}}?expand={EXPAND_ALL}",
+    "/inter-user-payment?from_user_id={user_id}&limit=50",
+    f"/inter-user-payment?from_user_id={{user_id}}&limit=50&expand={EXPAND_ALL}",
+])
+async def test_fast_responses_have_the_same_content(auth_token, users, payments, monkeypatch, template):
+    """Both paths render the same JSON values, the bytes may differ, e.g. orjson writes 1e16 as 1e16, not 1e+16"""
+    url = template.format(id=payments[0], user_id=users[0])
+
+    default = await get(auth_token, url, False, monkeypatch)
+    fast = await get(auth_token, url, True, monkeypatch)
+
+    assert default.status_code == fast.status_code == 200
+    assert fast.json() == default.json()
+    assert fast.headers.get("ETag") == default.headers.get("ETag")
@@ -0,0 +1,90 @@
+"""
+Search endpoints, the tests are skipped when the database has no pg_trgm extension
+"""
+
+import httpx
+import pytest
+from sqlalchemy import text
+
+from app.main import app
+
+TITLES = ("Monthly rent", "Rent deposit", "Parent meeting", "Groceries")
+
+
+@pytest.fixture
+async def client(database, auth_token):
+    async with database.connect() as connection:
+        if not (await connection.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"))).scalar():
+            pytest.skip("pg_trgm is not installed")
+    async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),  # type: ignore
+            base_url="http://localhost",
+            headers={"Authorization": f"Bearer {auth_token}"},
+    ) as client:
+        yield client
+
+
+@pytest.fixture
+async def titled_payments(database, payments):
+    """Ids of payments with `TITLES`, the other payments are titled "Test payment" """
+    async with database.begin() as connection:
+        await connection.execute(
+            text("UPDATE inter_user_payment SET title = :title WHERE id = :id"),
+            [{"title": title, "id": id} for title, id in zip(TITLES, payments)],
+        )
+    return payments[:len(TITLES)]
+
+
+async def search_payments(client: httpx.AsyncClient, **params) -> dict:
+    response = await client.get("/search/inter-user-payment", params=params)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def test_payments_are_ranked_by_similarity_and_paged(client, users, titled_payments):
+    monthly_rent, rent_deposit, parent_meeting, _ = titled_payments
+
+    first = await search_payments(client, user_id=users[0], query="rent", limit=2)
+    second = await search_payments(client, user_id=users[0], query="rent", limit=2, cursor=first["next_cursor"])
+
+    # Whole words rank first, newer payments first among them, then the word containing the query
+    assert [item["id"] for item in first["items"]] == [rent_deposit, monthly_rent]
+    assert [item["id"] for item in second["items"]] == [parent_meeting]
+    assert second["next_cursor"] is None
+
+
+async def test_payments_with_a_similar_word_are_found(client, users, titled_payments):
+    page = await search_payments(client, user_id=users[0], query="grocerise")
+
+    assert [item["id"] for item in page["items"]] == [titled_payments[3]]
+
+
+async def test_payments_of_other_users_are_not_found(client, users, titled_payments):
+    page = await search_payments(client, user_id=users[0] + 100, query="rent")
+
+    assert page["items"] == []
+
+
+async def test_wildcards_of_the_query_match_literally(client, users, titled_payments):
+    page = await search_payments(client, user_id=users[0], query="r_nt")
+
+    assert page["items"] == []
+
+
+async def test_query_shorter_than_a_trigram_is_rejected(client, users):
+    response = await client.get("/search/inter-user-payment", params={"user_id": users[0], "query": "re"})
+
+    assert response.status_code == 422
+
+
+async def test_users_are_found_by_username(client, database, users):
+    async with database.begin() as connection:
+        await connection.execute(
+            text("UPDATE \"user\" SET username = :username WHERE id = :id"),
+            [{"username": "alice_smith", "id": users[0]}, {"username": "bob_jones", "id": users[1]}],
+        )
+
+    response = await client.get("/search/user", params={"query": "smitth"})
+
+    assert response.status_code == 200, response.text
+    assert [item["id"] for item in response.json()["items"] if item["id"] in users] == [users[0]]
@@ -0,0 +1,74 @@
+import random
+from itertools import product
+
+import pytest
+
+from app.services.settlement import Transfer, net_balances, settle_exactly, settle_greedily, simplify_debts
+
+
+def brute_force_minimum(balances: dict[int, int]) -> int:
+    """Minimal number of transfers: users minus the largest number of zero-sum groups over all partitions"""
+    users = list(balances)
+    best = 0
+    for labels in product(range(len(users)), repeat=len(users)):
+        sums: dict[int, int] = {}
+        for user_id, label in zip(users, labels):
+            sums[label] = sums.get(label, 0) + balances[user_id]
+        if all(value == 0 for value in sums.values()):
+            best = max(best, len(sums))
+    return len(users) - best
+
+
+def remaining_balances(balances: dict[int, int], transfers: list[Transfer]) -> dict[int, int]:
+    remaining = dict(balances)
+    for transfer in transfers:
+        assert transfer.amount > 0
+        remaining[transfer.from_user_id] += transfer.amount
+        remaining[transfer.to_user_id] -= transfer.amount
+    return {user_id: balance for user_id, balance in remaining.items() if balance}
+
+
+def random_balances(rng: random.Random) -> dict[int, int]:
+    debts = []
+    for _ in range(rng.randint(1, 10)):
+        from_user_id, to_user_id = rng.sample(range(rng.randint(2, 6)), 2)
+        debts.append((from_user_id, to_user_id, rng.randint(1, 5)))
+    return net_balances(debts)
+
+
+def test_net_balances():
+    assert net_balances([(1, 2, 10), (2, 3, 10), (3, 1, 4)]) == {1: -6, 3: 6}
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_settle_exactly_matches_brute_force(seed: int):
+    balances = random_balances(random.Random(seed))
+    transfers = settle_exactly(balances)
+
+    assert remaining_balances(balances, transfers) == {}
+    assert len(transfers) == brute_force_minimum(balances)
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_settle_greedily_settles_with_more_transfers(seed: int):
+    balances = random_balances(random.Random(seed))
+    transfers = settle_greedily(balances)
+
+    assert remaining_balances(balances, transfers) == {}
+    assert brute_force_minimum(balances) <= len(transfers) <= max(len(balances) - 1, 0)
+
+
+def test_settle_exactly_splits_zero_sum_groups():
+    # A pair and a triple settle with one and two transfers, matching the largest balances needs four
+    balances = {1: -5, 2: 5, 3: -7, 4: 3, 5: 4}
+    assert len(settle_exactly(balances)) == 3
+    assert len(settle_greedily(balances)) == 4
+
+    balances = {1: -5, 2: 5, 3: -3, 4: 3}
+    assert sorted(settle_exactly(balances)) == [Transfer(1, 2, 5), Transfer(3, 4, 3)]
+
+
+def test_simplify_debts_falls_back_to_greedy():
+    balances = net_balances((user_id, user_id + 1, user_id) for user_id in range(20))
+    assert simplify_debts(balances, exact_max_users=12) == settle_greedily(balances)
+    assert simplify_debts({1: 0, 2: -3, 3: 3}, exact_max_users=12) == [Transfer(2, 3, 3)]
@@ -0,0 +1,118 @@
+import asyncio
+
+import httpx
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.config.settings import settings
+from app.core.session import async_engine, async_session
+from app.core.singleflight import SingleFlight, entity_reads
+from app.main import app
+
+
+async def test_concurrent_calls_share_one_call():
+    flight, calls, release = SingleFlight(), [], asyncio.Event()
+
+    async def call():
+        calls.append(1)
+        await release.wait()
+        return "result"
+
+    callers = [asyncio.create_task(flight.do("key", call)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*callers) == ["result"] * 5
+    assert len(calls) == 1
+    assert flight.stats() == {"in_flight": 0, "calls": 5, "shared": 4}
+
+
+async def test_exception_is_raised_to_every_caller():
+    flight, release = SingleFlight(), asyncio.Event()
+
+    async def call():
+        await release.wait()
+        raise ValueError("failed")
+
+    callers = [asyncio.create_task(flight.do("key", call)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+
+    outcomes = await asyncio.gather(*callers, return_exceptions=True)
+    assert all(isinstance(outcome, ValueError) for outcome in outcomes)
+
+
+async def test_waiting_callers_start_over_when_the_running_caller_is_cancelled():
+    flight, runners, release = SingleFlight(), [], asyncio.Event()
+
+    def call(name):
+        async def run():
+            runners.append(name)
+            await release.wait()
+            return name
+        return run
+
+    first = asyncio.create_task(flight.do("key", call("first")))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(flight.do("key", call("second")))
+    third = asyncio.create_task(flight.do("key", call("third")))
+    await asyncio.sleep(0)
+
+    first.cancel()
+    while len(runners) < 2:
+        await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(second, third) == ["second", "second"]
+    assert runners == ["first", "second"]
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+
+async def test_cancelled_waiting_caller_does_not_affect_the_call():
+    flight, release = SingleFlight(), asyncio.Event()
+
+    async def call():
+        await release.wait()
+        return "result"
+
+    first = asyncio.create_task(flight.do("key", call))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(flight.do("key", call))
+    await asyncio.sleep(0)
+    second.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await first == "result"
+
+
+@pytest.fixture
+async def small_pool(database, monkeypatch):
+    """Request sessions use a pool of two connections which times out quickly"""
+    engine = create_async_engine(settings.DATABASE_URI, pool_size=2, max_overflow=0, pool_timeout=2.0)
+    monkeypatch.setattr(settings, "LOAD_SHEDDING_ENABLED", False)
+    async_session.configure(bind=engine)
+    yield engine
+    async_session.configure(bind=async_engine)
+    await engine.dispose()
+
+
+@pytest.mark.parametrize("if_none_match", [None, '"stale"'])
+async def test_concurrent_retrievals_with_a_small_pool(small_pool, auth_token, payments, if_none_match):
+    """A read shares the connection of the request which runs it, requests never wait for a second connection"""
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    if if_none_match:
+        headers["If-None-Match"] = if_none_match
+    calls = entity_reads.calls
+
+    async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),  # type: ignore
+            base_url="http://localhost",
+            headers=headers,
+    ) as client:
+        responses = await asyncio.gather(*(client.get(f"/inter-user-payment/{payments[0]}") for _ in range(20)))
+
+    assert [response.status_code for response in responses] == [200] * 20
+    assert entity_reads.calls > calls
+    assert small_pool.sync_engine.pool.checkedout() == 0
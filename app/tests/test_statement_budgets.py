@@ -0,0 +1,71 @@
+"""
+SQL statements per request of the payment read endpoints, with and without expanded relations.
+
+Every case is requested with a small and a large page: a statement count which grows with the page size
+is an N+1 regression, and so is a count above the budget of the case. The authentication token is cached
+by a first, uncounted request, so counts cover the endpoint alone.
+"""
+
+import httpx
+import pytest
+from sqlalchemy import event
+
+from app.core.session import async_engine, replica_set
+from app.main import app
+
+EXPAND_ALL = "from_user,to_user,payment,reminder"
+LIMITS = (5, 50)
+
+# Path template and the number of statements it may take, regardless of the page size
+CASES = [
+    ("/inter-user-payment/{id}", 1),
+    ("/inter-user-payment/{id}?expand=payment,reminder", 1),
+    (f"/inter-user-payment/{{id}}?expand={EXPAND_ALL}", 3),
+    ("/inter-user-payment?from_user_id={user_id}&limit={limit}", 1),
+    ("/inter-user-payment?from_user_id={user_id}&limit={limit}&expand=from_user", 2),
+    ("/inter-user-payment?from_user_id={user_id}&limit={limit}&expand=to_user", 2),
+    ("/inter-user-payment?from_user_id={user_id}&limit={limit}&expand=payment", 1),
+    ("/inter-user-payment?from_user_id={user_id}&limit={limit}&expand=reminder", 1),
+    (f"/inter-user-payment?from_user_id={{user_id}}&limit={{limit}}&expand={EXPAND_ALL}", 3),
+]
+
+
+@pytest.fixture
+async def client(auth_token, payments):
+    async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),  # type: ignore
+            base_url="http://localhost",
+            headers={"Authorization": f"Bearer {auth_token}"},
+    ) as client:
+        assert (await client.get(f"/inter-user-payment/{payments[0]}")).status_code == 200
+        yield client
+
+
+async def count_statements(client: httpx.AsyncClient, url: str) -> int:
+    count = 0
+
+    def count_statement(*args) -> None:
+        nonlocal count
+        count += 1
+
+    engines = [async_engine.sync_engine, *(engine.sync_engine for engine in replica_set.engines)]
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", count_statement)
+    try:
+        response = await client.get(url)
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", count_statement)
+    assert response.status_code == 200, response.text
+    return count
+
+
+@pytest.mark.parametrize("template, budget", CASES)
+async def test_statement_budget(client, users, payments, template, budget):
+    counts = {
+        limit: await count_statements(client, template.format(id=payments[0], user_id=users[0], limit=limit))
+        for limit in (LIMITS if "{limit}" in template else LIMITS[:1])
+    }
+
+    assert len(set(counts.values())) == 1, f"Statement count grows with the page size: {counts}"
+    assert max(counts.values()) <= budget
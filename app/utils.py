@@ -1,4 +1,5 @@
 import re
+from datetime import datetime, timezone
 
 from app.constants import UUID_REGEX
 
@@ -10,3 +11,9 @@ def camel_to_snake(name: str) -> str:
 
 def is_valid_uuid4(uuid_str: str) -> bool:
     return bool(re.fullmatch(UUID_REGEX, uuid_str))
+
+
+def to_naive_utc(moment: datetime) -> datetime:
+    if moment.tzinfo is None:
+        return moment
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
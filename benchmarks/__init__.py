@@ -0,0 +1,5 @@
+"""
+Benchmarks, run from the project root against a local database, e.g.:
+
+python -m benchmarks.auth_cache
+"""
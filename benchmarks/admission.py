@@ -0,0 +1,158 @@
+"""
+Goodput under overload with and without admission control.
+
+A benchmark route holds a pool connection for a fixed service time, so the primary pool of
+`DATABASE_POOL_SIZE + DATABASE_MAX_OVERFLOW` connections serves about `capacity / service time` requests per second.
+Requests arrive at a fixed rate regardless of the responses (open loop), rejected requests are not retried.
+Goodput counts the successful responses within `--slo` seconds per second.
+
+overload: 5x the capacity from well-behaved clients, with load shedding disabled and enabled.
+bot: one token sends 4x the capacity next to well-behaved clients sending 1x, load shedding enabled,
+with rate limits disabled and with the bot limited to a fraction of the capacity.
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+import uuid
+from collections import Counter, defaultdict
+
+import httpx
+from fastapi import Depends
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import authentication_scheme, get_session, load_shedder, token_rate_limiter
+from app.api.routers import SessionReleasingRoute
+from app.config.settings import settings
+from app.core.admission import RateLimiter
+from app.core.session import async_engine, pool_metrics
+from app.main import app
+from benchmarks.load.seed import TITLE
+from benchmarks.utils import print_report, summarize
+
+BOT_TITLE = "load-test-bot"
+CLIENTS = 20
+
+
+def add_route(service_time: float) -> str:
+    async def slow(session: AsyncSession = Depends(get_session)):
+        await session.execute(text("SELECT pg_sleep(:seconds)"), {"seconds": service_time})
+        return {}
+
+    app.router.route_class = SessionReleasingRoute
+    app.add_api_route("/benchmark/admission", slow, dependencies=[Depends(authentication_scheme)])
+    return "/benchmark/admission"
+
+
+async def create_tokens(title: str, count: int) -> list[str]:
+    tokens = [str(uuid.uuid4()) for _ in range(count)]
+    async with async_engine.begin() as connection:
+        await connection.execute(
+            text("INSERT INTO auth_token (id, title) VALUES (:id, :title)"),
+            [{"id": token, "title": title} for token in tokens],
+        )
+    return tokens
+
+
+async def delete_tokens() -> None:
+    async with async_engine.begin() as connection:
+        await connection.execute(text("DELETE FROM auth_token WHERE title IN (:title, :bot)"), {
+            "title": TITLE, "bot": BOT_TITLE,
+        })
+
+
+async def offer(
+        client: httpx.AsyncClient, url: str, streams: dict[str, tuple[float, list[str]]], duration: float
+) -> dict[str, list[tuple[int, float]]]:
+    """Sends requests of every stream at its rate for `duration` seconds, returns status and latency per stream"""
+    results: dict[str, list[tuple[int, float]]] = defaultdict(list)
+    tasks = []
+
+    async def request(name: str, token: str) -> None:
+        started = time.perf_counter()
+        try:
+            response = await client.get(url, headers={"Authorization": f"Bearer {token}"})
+            status = response.status_code
+        except Exception:
+            status = 500
+        results[name].append((status, time.perf_counter() - started))
+
+    started = time.perf_counter()
+    sent = Counter()
+    while (elapsed := time.perf_counter() - started) < duration:
+        for name, (rate, tokens) in streams.items():
+            while sent[name] < elapsed * rate:
+                tasks.append(asyncio.create_task(request(name, tokens[sent[name] % len(tokens)])))
+                sent[name] += 1
+        await asyncio.sleep(0.001)
+    await asyncio.gather(*tasks)
+    return results
+
+
+def report(title: str, results: list[tuple[int, float]], duration: float, slo: float) -> None:
+    statuses = Counter(status for status, _ in results)
+    good = [latency for status, latency in results if status == 200 and latency <= slo]
+    print_report(title, {
+        "sent": len(results),
+        "ok": statuses[200],
+        "rejected": statuses[429] + statuses[503],
+        "failed": sum(count for status, count in statuses.items() if status >= 500 and status != 503),
+        "goodput_rps": len(good) / duration,
+        **summarize([latency for status, latency in results if status == 200]),
+    })
+
+
+async def main(arguments: argparse.Namespace) -> None:
+    logging.disable(logging.WARNING)
+    url = add_route(arguments.service_time)
+    pool = pool_metrics.pool
+    capacity = (pool.size() + max(pool._max_overflow, 0)) / arguments.service_time
+    print(f"capacity about {capacity:.0f} requests per second, offered load {arguments.overload}x")
+
+    await delete_tokens()
+    clients = await create_tokens(TITLE, CLIENTS)
+    bot = await create_tokens(BOT_TITLE, 1)
+    # Well-behaved clients stay within their limits in every run
+    token_rate_limiter.default = RateLimiter(capacity * arguments.overload / CLIENTS * 2, 100)
+    try:
+        async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://localhost", timeout=None  # type: ignore
+        ) as client:
+            await offer(client, url, {"warm-up": (capacity / 2, clients)}, 1.0)
+
+            for shedding in (False, True):
+                settings.LOAD_SHEDDING_ENABLED, settings.RATE_LIMIT_ENABLED = shedding, True
+                streams = {"clients": (capacity * arguments.overload, clients)}
+                results = await offer(client, url, streams, arguments.duration)
+                report(f"overload shedding={'on' if shedding else 'off'}", results["clients"],
+                       arguments.duration, arguments.slo)
+                await asyncio.sleep(arguments.service_time * 2)
+
+            for limited in (False, True):
+                settings.LOAD_SHEDDING_ENABLED, settings.RATE_LIMIT_ENABLED = True, True
+                token_rate_limiter.by_title[BOT_TITLE] = RateLimiter(
+                    capacity * arguments.bot_share if limited else 0, max(1, int(capacity * arguments.bot_share))
+                )
+                streams = {"clients": (capacity, clients), "bot": (capacity * (arguments.overload - 1), bot)}
+                results = await offer(client, url, streams, arguments.duration)
+                for name in streams:
+                    report(f"bot limit={'on' if limited else 'off'} {name}", results[name],
+                           arguments.duration, arguments.slo)
+                await asyncio.sleep(arguments.service_time * 2)
+            print_report("rejected", {
+                "rate_limited": token_rate_limiter.rejected, "shed": load_shedder.rejected,
+            })
+    finally:
+        await delete_tokens()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--service-time", type=float, default=0.2, help="Seconds a request holds a connection")
+    parser.add_argument("--overload", type=float, default=5.0, help="Offered load as a multiple of the capacity")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds every run offers load")
+    parser.add_argument("--slo", type=float, default=2.0, help="Latency within which a response counts as good")
+    parser.add_argument("--bot-share", type=float, default=0.2, help="Share of the capacity the bot is limited to")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,37 @@
+"""Bearer token lookup latency with the authentication token cache enabled and disabled"""
+
+import argparse
+import asyncio
+import uuid
+
+from app.api.deps import authentication_token_cache, get_authentication_token
+from app.config.settings import settings
+from app.core.session import async_session
+from app.models import AuthToken
+from benchmarks.utils import measure, print_report, summarize
+
+
+async def main(iterations: int) -> None:
+    async with async_session() as session:
+        auth_token = AuthToken(title="benchmark")
+        session.add(auth_token)
+        await session.commit()
+        known, unknown = str(auth_token.id), str(uuid.uuid4())
+
+        try:
+            for enabled in (False, True):
+                settings.AUTH_TOKEN_CACHE_ENABLED = enabled
+                authentication_token_cache.clear()
+                for title, token in (("known", known), ("unknown", unknown)):
+                    samples = await measure(lambda: get_authentication_token(session, token), iterations)
+                    print_report(f"cache={'on' if enabled else 'off'} token={title}", summarize(samples))
+            print_report("cache stats", authentication_token_cache.stats())
+        finally:
+            await session.delete(auth_token)
+            await session.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=10_000)
+    asyncio.run(main(parser.parse_args().iterations))
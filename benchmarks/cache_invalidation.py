@@ -0,0 +1,162 @@
+"""
+Cross-worker cache invalidation against a local Postgres.
+
+`--workers` invalidation buses stand in for worker processes, each with an authentication token cache of its own.
+Tokens are updated through ORM sessions and the time until every other worker evicted them is measured, for single
+updates and for a burst of updates in one transaction. An update which is rolled back must evict nothing, and
+after the listening connections are terminated every worker must flush its cache and listen again.
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+from sqlalchemy import delete, text
+
+# Registers the authentication token cache, sessions publish changes of its table only then
+import app.api.deps  # noqa: F401
+from app.config.settings import settings
+from app.core.cache import TTLCache
+from app.core.invalidation import InvalidationBus, invalidation_bus
+from app.core.session import async_engine, async_session
+from app.models import AuthToken
+from benchmarks.utils import print_report, summarize
+
+TITLE = "benchmark-inv"
+TIMEOUT = 10.0
+
+
+def worker(number: int) -> tuple[InvalidationBus, TTLCache]:
+    bus = InvalidationBus(
+        invalidation_bus.dsn,
+        channel=settings.CACHE_INVALIDATION_CHANNEL,
+        coalesce_delay=settings.CACHE_INVALIDATION_COALESCE_DELAY,
+        max_pending=settings.CACHE_INVALIDATION_MAX_PENDING,
+        reconnect_delay=0.1,
+        keepalive_interval=settings.CACHE_INVALIDATION_KEEPALIVE_INTERVAL,
+    )
+    cache: TTLCache[bool] = TTLCache(max_size=settings.AUTH_TOKEN_CACHE_MAX_SIZE, ttl=3600)
+    bus.register(AuthToken.__tablename__, cache, key=str.lower)
+    return bus, cache
+
+
+async def wait_for(condition, timeout: float = TIMEOUT) -> float:
+    started = time.perf_counter()
+    while not condition():
+        if time.perf_counter() - started > timeout:
+            raise SystemExit("Timed out waiting for the workers")
+        await asyncio.sleep(0.0005)
+    return time.perf_counter() - started
+
+
+def fill(caches: list[TTLCache], keys: list[str]) -> None:
+    for cache in caches:
+        for key in keys:
+            cache.set(key, True)
+
+
+def cached(caches: list[TTLCache], key: str) -> bool:
+    return any(cache.get(key)[0] for cache in caches)
+
+
+async def update(tokens: list[AuthToken], title: str, commit: bool = True) -> None:
+    async with async_session() as session:
+        for token in tokens:
+            token = await session.merge(token, load=False)
+            token.title = title
+        await session.flush()
+        await (session.commit() if commit else session.rollback())
+
+
+async def single_updates(tokens: list[AuthToken], caches: list[TTLCache]) -> None:
+    samples = []
+    for number, token in enumerate(tokens):
+        key = str(token.id)
+        fill(caches, [key])
+        await update([token], f"{TITLE[:12]}{number % 10}")
+        samples.append(await wait_for(lambda: not cached(caches, key)))
+    print_report("commit to eviction", summarize(samples))
+
+
+async def burst(tokens: list[AuthToken], buses: list[InvalidationBus], caches: list[TTLCache]) -> None:
+    keys = [str(token.id) for token in tokens]
+    fill(caches, keys)
+    notifications = sum(bus.notifications for bus in buses)
+    started = time.perf_counter()
+    await update(tokens, TITLE)
+    await wait_for(lambda: not any(len(cache) for cache in caches))
+    print_report("burst update", {
+        "tokens": len(tokens),
+        "elapsed_ms": (time.perf_counter() - started) * 1000,
+        "notifications_per_worker": (sum(bus.notifications for bus in buses) - notifications) / len(buses),
+    })
+
+
+async def rollback(tokens: list[AuthToken], buses: list[InvalidationBus], caches: list[TTLCache]) -> None:
+    keys = [str(token.id) for token in tokens]
+    fill(caches, keys)
+    notifications = sum(bus.notifications for bus in buses)
+    await update(tokens, "rolled-back", commit=False)
+    await asyncio.sleep(0.5)
+    print_report("rolled back update", {
+        "notifications": sum(bus.notifications for bus in buses) - notifications,
+        "still_cached": all(cache.get(key)[0] for cache in caches for key in keys),
+    })
+
+
+async def reconnect(tokens: list[AuthToken], buses: list[InvalidationBus], caches: list[TTLCache]) -> None:
+    fill(caches, [str(token.id) for token in tokens])
+    flushes = [bus.flushes for bus in buses]
+    started = time.perf_counter()
+    async with async_engine.begin() as connection:
+        await connection.execute(text(
+            "SELECT pg_terminate_backend(pid) FROM pg_stat_activity WHERE query = :listen AND pid <> pg_backend_pid()"
+        ), {"listen": f'LISTEN "{settings.CACHE_INVALIDATION_CHANNEL}"'})
+    await wait_for(lambda: all(
+        bus.connected and bus.flushes >= flushed + 2 for bus, flushed in zip(buses, flushes)
+    ))
+    print_report("reconnect", {
+        "elapsed_ms": (time.perf_counter() - started) * 1000,
+        "cached": sum(len(cache) for cache in caches),
+    })
+    key = str(tokens[0].id)
+    fill(caches, [key])
+    await update(tokens[:1], TITLE)
+    print_report("update after reconnect", {"elapsed_ms": await wait_for(lambda: not cached(caches, key)) * 1000})
+
+
+async def main(arguments: argparse.Namespace) -> None:
+    logging.disable(logging.WARNING)
+    workers = [worker(number) for number in range(arguments.workers)]
+    buses, caches = [bus for bus, _ in workers], [cache for _, cache in workers]
+    async with async_session() as session:
+        tokens = [AuthToken(title=TITLE) for _ in range(arguments.burst)]
+        session.add_all(tokens)
+        await session.commit()
+    try:
+        for bus in buses:
+            bus.start()
+        await wait_for(lambda: all(bus.connected for bus in buses))
+
+        await single_updates(tokens[:arguments.updates], caches)
+        await burst(tokens, buses, caches)
+        await rollback(tokens[:10], buses, caches)
+        await reconnect(tokens, buses, caches)
+    finally:
+        for bus in buses:
+            await bus.stop()
+        async with async_session() as session:
+            await session.execute(
+                delete(AuthToken).where(AuthToken.title.startswith(TITLE[:12])),
+                execution_options={"synchronize_session": False},
+            )
+            await session.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=4, help="Invalidation buses standing in for workers")
+    parser.add_argument("--updates", type=int, default=200, help="Tokens updated one at a time")
+    parser.add_argument("--burst", type=int, default=5_000, help="Tokens updated in one transaction")
+    asyncio.run(main(parser.parse_args()))
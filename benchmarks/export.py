@@ -0,0 +1,82 @@
+"""Memory use and throughput of the streaming payment export over a large synthetic table"""
+
+import argparse
+import asyncio
+import resource
+import time
+from datetime import datetime
+
+from sqlalchemy import text
+
+from app.core.session import async_engine, async_session
+from app.core.streaming import ndjson_line
+from app.services.export import EXPORT_FIELDS, iter_export_rows
+from benchmarks.utils import USER_ID_RANGES
+
+TITLE = "benchmark-export"
+USER_IDS = (USER_ID_RANGES["export"] + 1, USER_ID_RANGES["export"] + 2)
+
+
+async def seed(rows: int) -> None:
+    async with async_engine.begin() as connection:
+        await connection.execute(text(
+            "INSERT INTO \"user\" (id, full_name, language) VALUES (:debtor, 'Debtor', 'en'), (:creditor, 'Creditor', 'en')"
+        ), {"debtor": USER_IDS[0], "creditor": USER_IDS[1]})
+        payment_id = (await connection.execute(text(
+            "INSERT INTO payment (sum, bank, currency) VALUES (10.5, 'benchmark', 'EUR') RETURNING id"
+        ))).scalar()
+        reminder_id = (await connection.execute(text(
+            "INSERT INTO reminder (remind_at, repeat) VALUES (now(), 'monthly') RETURNING id"
+        ))).scalar()
+        await connection.execute(text(
+            "INSERT INTO inter_user_payment (title, from_user_id, to_user_id, payment_id, reminder_id, completed) "
+            "SELECT :title, :debtor, :creditor, :payment_id, :reminder_id, false FROM generate_series(1, :rows)"
+        ), {
+            "title": TITLE, "debtor": USER_IDS[0], "creditor": USER_IDS[1],
+            "payment_id": payment_id, "reminder_id": reminder_id, "rows": rows,
+        })
+
+
+async def cleanup() -> None:
+    async with async_engine.begin() as connection:
+        # Deleting either cascades to the inter-user payments, which are the only link to the other one
+        payment_ids, reminder_ids = (await connection.execute(text(
+            "SELECT array_agg(DISTINCT payment_id), array_agg(DISTINCT reminder_id) "
+            "FROM inter_user_payment WHERE title = :title"
+        ), {"title": TITLE})).one()
+        await connection.execute(
+            text("DELETE FROM payment WHERE id = ANY(:ids)"), {"ids": payment_ids or []}
+        )
+        await connection.execute(
+            text("DELETE FROM reminder WHERE id = ANY(:ids)"), {"ids": reminder_ids or []}
+        )
+        await connection.execute(text("DELETE FROM \"user\" WHERE id IN (:debtor, :creditor)"), {
+            "debtor": USER_IDS[0], "creditor": USER_IDS[1]
+        })
+
+
+async def main(rows: int, chunk_size: int) -> None:
+    await seed(rows)
+    try:
+        exported, size = 0, 0
+        started = time.perf_counter()
+        async with async_session() as session:
+            async for chunk in iter_export_rows(
+                    session, datetime(2000, 1, 1), datetime(2100, 1, 1), chunk_size=chunk_size
+            ):
+                exported += len(chunk)
+                size += len(b"".join(ndjson_line(dict(zip(EXPORT_FIELDS, row))) for row in chunk))
+        elapsed = time.perf_counter() - started
+
+        print(f"rows={exported} bytes={size} elapsed={elapsed:.1f}s rows/s={exported / elapsed:,.0f}")
+        print(f"max_rss={resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f}MiB")
+    finally:
+        await cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--chunk-size", type=int, default=5_000)
+    arguments = parser.parse_args()
+    asyncio.run(main(arguments.rows, arguments.chunk_size))
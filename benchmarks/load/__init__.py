@@ -0,0 +1,10 @@
+"""
+In-process load test of the API against the configured Postgres database.
+
+Seeds users, payments, reminders and inter-user payments, drives concurrent requests through the ASGI
+interface of `app.main:app` and reports throughput and latency percentiles per scenario:
+python -m benchmarks.load --output results.json
+python -m benchmarks.load --baseline results.json --threshold 10
+
+With a baseline the run fails when a latency percentile of any scenario regresses by more than the threshold.
+"""
@@ -0,0 +1,129 @@
+import argparse
+import asyncio
+import json
+import logging
+import random
+import subprocess
+import time
+from datetime import datetime
+from typing import Optional
+
+import httpx
+
+from app.main import app
+from benchmarks.load.scenarios import SCENARIOS
+from benchmarks.load.seed import Seed, cleanup, existing_seed, seed
+from benchmarks.utils import print_report, summarize
+
+COMPARED_METRICS = ("p50_ms", "p95_ms", "p99_ms")
+
+
+async def run_scenario(
+        client: httpx.AsyncClient, seed: Seed, name: str, requests: int, concurrency: int, rng: random.Random
+) -> dict:
+    build = SCENARIOS[name]
+    samples, errors = [], 0
+    issued = 0
+
+    async def worker() -> None:
+        nonlocal issued, errors
+        while issued < requests:
+            request = build(seed, issued, rng)
+            issued += 1
+            started = time.perf_counter()
+            response = await client.request(request.method, request.url, json=request.json)
+            samples.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {**summarize(samples), "errors": errors, "throughput_rps": len(samples) / elapsed}
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Latency percentiles which grew by more than `threshold` percent over the baseline"""
+    regressions = []
+    for name, report in results["scenarios"].items():
+        if (reference := baseline["scenarios"].get(name)) is None:
+            continue
+        for metric in COMPARED_METRICS:
+            if reference[metric] and report[metric] > reference[metric] * (1 + threshold / 100):
+                change = (report[metric] / reference[metric] - 1) * 100
+                regressions.append(
+                    f"{name} {metric}: {reference[metric]:.3f} -> {report[metric]:.3f} (+{change:.1f}%)"
+                )
+    return regressions
+
+
+def current_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(arguments: argparse.Namespace) -> None:
+    # Per-request INFO logs of the CRUD routers would dominate the measured latency
+    logging.disable(logging.INFO)
+
+    data = await existing_seed() if arguments.skip_seed else await seed(arguments.users, arguments.payments)
+    rng = random.Random(arguments.random_seed)
+    results = {
+        "commit": current_commit(),
+        "created": datetime.utcnow().isoformat(),
+        "parameters": {
+            key: getattr(arguments, key) for key in ("users", "payments", "requests", "concurrency", "warmup")
+        },
+        "scenarios": {},
+    }
+    try:
+        async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app),  # type: ignore
+                base_url="http://localhost",
+                headers={"Authorization": f"Bearer {data.token}"},
+        ) as client:
+            for name in arguments.scenarios:
+                if arguments.warmup and name not in ("user_create", "user_delete"):
+                    await run_scenario(client, data, name, arguments.warmup, arguments.concurrency, rng)
+                report = await run_scenario(client, data, name, arguments.requests, arguments.concurrency, rng)
+                results["scenarios"][name] = report
+                print_report(name, report)
+    finally:
+        if not arguments.keep_data:
+            await cleanup(data.token)
+
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if arguments.baseline:
+        with open(arguments.baseline) as file:
+            baseline = json.load(file)
+        if baseline["parameters"] != results["parameters"]:
+            print(f"WARNING baseline was recorded with different parameters: {baseline['parameters']}")
+        regressions = compare(results, baseline, arguments.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load", description="In-process API load test")
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--payments", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=2_000, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=200, help="Unmeasured requests before each scenario")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--random-seed", type=int, default=0)
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse data kept by a previous run")
+    parser.add_argument("--keep-data", action="store_true", help="Do not remove the seeded data afterwards")
+    parser.add_argument("--output", help="Path of the JSON results file")
+    parser.add_argument("--baseline", help="JSON results of a previous run to compare with")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed latency regression in percent")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,62 @@
+"""Requests issued by the load test, each scenario builds its n-th request from the seeded data set"""
+
+import random
+from typing import Callable, NamedTuple, Optional
+
+from benchmarks.load.seed import CREATED_USER_ID_OFFSET, Seed
+
+
+class Request(NamedTuple):
+    method: str
+    url: str
+    json: Optional[dict] = None
+
+
+def auth(seed: Seed, n: int, rng: random.Random) -> Request:
+    """Authenticated endpoint which does little besides the bearer token lookup, it reads a handful of rows"""
+    return Request("GET", "/exchange-rate")
+
+
+def user_create(seed: Seed, n: int, rng: random.Random) -> Request:
+    user_id = CREATED_USER_ID_OFFSET + n + 1
+    seed.created_user_ids.append(user_id)
+    return Request("POST", "/user", {"id": user_id, "full_name": f"Created User {n}", "language": "en"})
+
+
+def user_retrieve(seed: Seed, n: int, rng: random.Random) -> Request:
+    return Request("GET", f"/user/{seed.user_id(rng.randrange(seed.users))}")
+
+
+def user_update(seed: Seed, n: int, rng: random.Random) -> Request:
+    user_id = seed.user_id(rng.randrange(seed.users))
+    return Request("PUT", f"/user/{user_id}", {"full_name": f"Updated User {n}", "language": rng.choice(("ru", "en"))})
+
+
+def user_list(seed: Seed, n: int, rng: random.Random) -> Request:
+    return Request("GET", "/user?limit=50")
+
+
+def user_delete(seed: Seed, n: int, rng: random.Random) -> Request:
+    """Deletes users added by `user_create`, so it has to run after it with at most as many requests"""
+    return Request("DELETE", f"/user/{seed.created_user_ids[n]}")
+
+
+def payment_list(seed: Seed, n: int, rng: random.Random) -> Request:
+    user_id = seed.user_id(rng.randrange(seed.users))
+    return Request("GET", f"/inter-user-payment?limit=50&from_user_id={user_id}")
+
+
+def balance_retrieve(seed: Seed, n: int, rng: random.Random) -> Request:
+    return Request("GET", f"/balance/{seed.user_id(rng.randrange(seed.users))}")
+
+
+SCENARIOS: dict[str, Callable[[Seed, int, random.Random], Request]] = {
+    "auth": auth,
+    "user_create": user_create,
+    "user_retrieve": user_retrieve,
+    "user_update": user_update,
+    "user_list": user_list,
+    "user_delete": user_delete,
+    "payment_list": payment_list,
+    "balance_retrieve": balance_retrieve,
+}
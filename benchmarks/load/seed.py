@@ -0,0 +1,112 @@
+"""Synthetic data set for the load test, kept apart from real data by a reserved user id range"""
+
+import uuid
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sqlalchemy import text
+
+from app.core.session import async_engine
+from benchmarks.utils import USER_ID_RANGE_SIZE, USER_ID_RANGES
+
+USER_ID_OFFSET = USER_ID_RANGES["load"]
+CREATED_USER_ID_OFFSET = USER_ID_RANGES["load_created"]
+TITLE = "load-test"
+
+CLEANUP = (
+    # Deleting the payments cascades to the inter-user payments, which are the only link to the reminders
+    "CREATE TEMPORARY TABLE load_test_rows ON COMMIT DROP AS "
+    "SELECT payment_id, reminder_id FROM inter_user_payment "
+    "WHERE from_user_id > :offset AND from_user_id <= :last_user_id "
+    "OR to_user_id > :offset AND to_user_id <= :last_user_id",
+    "DELETE FROM payment WHERE id IN (SELECT payment_id FROM load_test_rows)",
+    "DELETE FROM reminder WHERE id IN (SELECT reminder_id FROM load_test_rows)",
+    # Users seeded and users created by the requests of the load test
+    "DELETE FROM \"user\" WHERE id > :offset AND id <= :last_user_id",
+)
+
+SEED_USERS = """
+INSERT INTO "user" (id, full_name, username, language)
+SELECT :offset + g, 'Load Test User ' || g, 'load_test_' || g, (ARRAY['ru', 'en'])[1 + g % 2]
+FROM generate_series(1, :users) AS g
+"""
+
+SEED_PAYMENTS = """
+WITH payments AS (
+    INSERT INTO payment (sum, bank, currency, card_number)
+    SELECT round((1 + random() * 999)::numeric, 2), :title, (ARRAY['EUR', 'USD', 'RUB'])[1 + g % 3], '4000000000000000'
+    FROM generate_series(1, :payments) AS g
+    RETURNING id
+), reminders AS (
+    INSERT INTO reminder (remind_at, repeat)
+    SELECT now() + g * interval '1 minute', (ARRAY[NULL, 'daily', 'weekly', 'monthly', 'yearly'])[1 + g % 5]
+    FROM generate_series(1, :payments) AS g
+    RETURNING id
+), numbered_payments AS (
+    SELECT id, row_number() OVER () AS n FROM payments
+), numbered_reminders AS (
+    SELECT id, row_number() OVER () AS n FROM reminders
+)
+INSERT INTO inter_user_payment (title, from_user_id, to_user_id, payment_id, reminder_id, completed)
+SELECT
+    :title,
+    :offset + 1 + n % :users,
+    :offset + 1 + (n % :users + 1 + n % (:users - 1)) % :users,
+    numbered_payments.id,
+    numbered_reminders.id,
+    n % 5 = 0
+FROM numbered_payments JOIN numbered_reminders USING (n)
+"""
+
+
+@dataclass
+class Seed:
+    token: str
+    users: int
+    created_user_ids: list[int] = field(default_factory=list)
+
+    def user_id(self, index: int) -> int:
+        return USER_ID_OFFSET + 1 + index % self.users
+
+
+async def cleanup(token: Optional[str] = None) -> None:
+    """Deletes the rows of the users of the load test, and the token of the seed if given"""
+    parameters = {"offset": USER_ID_OFFSET, "last_user_id": CREATED_USER_ID_OFFSET + USER_ID_RANGE_SIZE}
+    async with async_engine.begin() as connection:
+        for statement in CLEANUP:
+            await connection.execute(text(statement), parameters)
+        if token is not None:
+            await connection.execute(text("DELETE FROM auth_token WHERE id = :id"), {"id": token})
+
+
+async def seed(users: int, payments: int) -> Seed:
+    # Rows of an interrupted run, its token is left as it cannot be told apart from the tokens of clients
+    await cleanup()
+    token = str(uuid.uuid4())
+    async with async_engine.begin() as connection:
+        await connection.execute(
+            text("INSERT INTO auth_token (id, title) VALUES (:id, :title)"), {"id": token, "title": TITLE}
+        )
+        await connection.execute(text(SEED_USERS), {"offset": USER_ID_OFFSET, "users": users})
+        await connection.execute(
+            text(SEED_PAYMENTS), {"offset": USER_ID_OFFSET, "users": users, "payments": payments, "title": TITLE}
+        )
+    async with async_engine.connect() as connection:
+        for table in ("\"user\"", "payment", "reminder", "inter_user_payment", "user_balance"):
+            await connection.execute(text(f"ANALYZE {table}"))
+    return Seed(token=token, users=users)
+
+
+async def existing_seed() -> Seed:
+    """Data set left by a previous run with `--keep-data`"""
+    async with async_engine.connect() as connection:
+        token = (await connection.execute(
+            text("SELECT id FROM auth_token WHERE title = :title LIMIT 1"), {"title": TITLE}
+        )).scalar()
+        users = (await connection.execute(
+            text("SELECT count(*) FROM \"user\" WHERE id > :offset AND id < :created_offset"),
+            {"offset": USER_ID_OFFSET, "created_offset": CREATED_USER_ID_OFFSET},
+        )).scalar()
+    if token is None or users < 2:
+        raise SystemExit("No load test data found, run without --skip-seed first")
+    return Seed(token=str(token), users=users)
@@ -0,0 +1,104 @@
+"""
+Event-loop lag under heavy logging, with the synchronous stream handler the logging config used before and with
+the queue handler of `app/core/log_queue.py`.
+
+Records are written into a pipe drained by a thread, like a log collector reading stderr of a container, which
+stops reading for a moment every now and then: a full pipe blocks the writer. Tasks shaped like requests log
+a few records and await I/O in turns, while a probe task sleeps for a millisecond at a time and records how late
+it wakes up.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import threading
+import time
+
+from app.config.logger import logger_config
+from app.core.log_queue import JsonFormatter, QueueLogHandler
+from benchmarks.utils import print_report, summarize
+
+PROBE_INTERVAL = 0.001
+
+
+def drain(fd: int, stall: float, stall_every: float) -> None:
+    """Reads the pipe until it is closed, pausing for `stall` seconds every `stall_every` seconds"""
+    resumed = time.perf_counter()
+    while os.read(fd, 65536):
+        if time.perf_counter() - resumed >= stall_every:
+            time.sleep(stall)
+            resumed = time.perf_counter()
+
+
+async def probe(lags: list[float], done: asyncio.Event) -> None:
+    while not done.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(time.perf_counter() - started - PROBE_INTERVAL)
+
+
+async def request(logger: logging.Logger, requests: int, records: int) -> None:
+    for number in range(requests):
+        for record in range(records):
+            logger.info("Reminder %d of payment %s is due", record, "rent", extra={"user_id": number % 100})
+        # Stands in for the database round trip of the request
+        await asyncio.sleep(0.001)
+
+
+async def run(handler: logging.Handler, arguments: argparse.Namespace) -> dict:
+    logger = logging.getLogger("app.benchmark")
+    logger.handlers, logger.propagate = [handler], False
+    logger.setLevel(logging.INFO)
+
+    lags: list[float] = []
+    done = asyncio.Event()
+    probing = asyncio.create_task(probe(lags, done))
+    started = time.perf_counter()
+    await asyncio.gather(*(request(logger, arguments.requests, arguments.records) for _ in range(arguments.tasks)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await probing
+    return {"elapsed_s": elapsed, **summarize(lags), "max_ms": max(lags) * 1000}
+
+
+async def main(arguments: argparse.Namespace) -> None:
+    formatter_config = logger_config.formatters["json" if arguments.json else "default"]
+    if arguments.json:
+        formatter = JsonFormatter(datefmt=formatter_config["datefmt"])
+    else:
+        formatter = logging.Formatter(formatter_config["fmt"], formatter_config["datefmt"])
+
+    for name in ("stream", "queue"):
+        read_fd, write_fd = os.pipe()
+        stream = os.fdopen(write_fd, "w")
+        reader = threading.Thread(target=drain, args=(read_fd, arguments.stall, arguments.stall_every), daemon=True)
+        reader.start()
+
+        if name == "stream":
+            handler = logging.StreamHandler(stream)
+        else:
+            handler = QueueLogHandler(stream, max_size=arguments.queue_size)
+        handler.setFormatter(formatter)
+        report = await run(handler, arguments)
+        if isinstance(handler, QueueLogHandler):
+            report["dropped"] = handler.dropped
+        print_report(f"lag handler={name}", report)
+
+        # Queued records are still written, the reader stops at the end of the pipe
+        handler.close()
+        stream.close()
+        reader.join()
+        os.close(read_fd)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=20, help="Concurrent requests")
+    parser.add_argument("--requests", type=int, default=1_000, help="Requests per task")
+    parser.add_argument("--records", type=int, default=5, help="Records logged per request")
+    parser.add_argument("--stall", type=float, default=0.1, help="Seconds the reader pauses")
+    parser.add_argument("--stall-every", type=float, default=0.5, help="Seconds between the pauses of the reader")
+    parser.add_argument("--queue-size", type=int, default=10_000)
+    parser.add_argument("--json", action="store_true", help="Log JSON objects instead of text lines")
+    asyncio.run(main(parser.parse_args()))
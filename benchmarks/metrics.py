@@ -0,0 +1,65 @@
+"""
+Per-request overhead of the metrics middleware, measured around a no-op ASGI app with the real route table.
+Matched requests carry their route in the scope like after routing, unmatched ones are matched by the middleware.
+"""
+
+import argparse
+import asyncio
+
+from starlette.routing import Match
+
+from app.core.metrics import MetricsMiddleware
+from app.main import app
+from benchmarks.utils import measure, print_report, summarize
+
+
+async def endpoint(scope, receive, send) -> None:
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def receive() -> dict:
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message) -> None:
+    pass
+
+
+def http_scope(method: str, path: str) -> dict:
+    scope = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": method,
+        "path": path,
+        "root_path": "",
+        "query_string": b"",
+        "headers": [],
+    }
+    for route in app.routes:
+        if route.matches(scope)[0] == Match.FULL:
+            scope["route"] = route
+            break
+    return scope
+
+
+async def main(iterations: int) -> None:
+    instrumented = MetricsMiddleware(endpoint, routes=app.routes)
+    # The first and the last registered routes, and a path which matches no route at all
+    paths = [("GET", app.routes[0].path), ("GET", "/export/payments"), ("GET", "/balance/1/2"), ("GET", "/unknown")]
+
+    for method, path in paths:
+        scope = http_scope(method, path)
+        baseline = summarize(await measure(lambda: endpoint(scope, receive, send), iterations))
+        measured = summarize(await measure(lambda: instrumented(scope, receive, send), iterations))
+        print_report(f"plain {method} {path}", baseline)
+        print_report(f"instrumented {method} {path}", measured)
+        print_report("overhead", {
+            key: measured[key] - baseline[key] for key in ("mean_ms", "p50_ms", "p99_ms")
+        })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=100_000)
+    asyncio.run(main(parser.parse_args().iterations))
@@ -0,0 +1,83 @@
+"""Outbox dispatcher throughput with a fake messenger, target is 50k notifications per minute per process"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime
+
+from sqlalchemy import text
+
+from app.core.session import async_engine
+from app.services.notifications import FakeSender, NotificationDispatcher
+from benchmarks.utils import USER_ID_RANGE_SIZE, USER_ID_RANGES, print_report
+
+USER_ID_OFFSET = USER_ID_RANGES["notifications"]
+KIND = "benchmark"
+
+
+async def seed(notifications: int, recipients: int) -> None:
+    async with async_engine.begin() as connection:
+        await connection.execute(text(
+            "INSERT INTO \"user\" (id, full_name, language) "
+            "SELECT :offset + g, 'Recipient ' || g, 'en' FROM generate_series(1, :recipients) AS g"
+        ), {"offset": USER_ID_OFFSET, "recipients": recipients})
+        await connection.execute(text(
+            "INSERT INTO outbox_notification (recipient_id, kind, payload, next_attempt_at, status, attempts) "
+            "SELECT :offset + 1 + g % :recipients, :kind, jsonb_build_object('number', g), :now, 'pending', 0 "
+            "FROM generate_series(1, :notifications) AS g"
+        ), {
+            "offset": USER_ID_OFFSET, "recipients": recipients, "kind": KIND,
+            "now": datetime.utcnow(), "notifications": notifications,
+        })
+
+
+async def cleanup() -> None:
+    async with async_engine.begin() as connection:
+        await connection.execute(text("DELETE FROM outbox_notification WHERE kind = :kind"), {"kind": KIND})
+        await connection.execute(text(
+            "DELETE FROM \"user\" WHERE id > :offset AND id <= :last_user_id"
+        ), {"offset": USER_ID_OFFSET, "last_user_id": USER_ID_OFFSET + USER_ID_RANGE_SIZE})
+
+
+async def main(arguments: argparse.Namespace) -> None:
+    await cleanup()
+    await seed(arguments.notifications, arguments.recipients)
+    sender = FakeSender(latency=arguments.latency, failure_rate=arguments.failure_rate, seed=0)
+    dispatcher = NotificationDispatcher(
+        sender,
+        batch_size=arguments.batch_size,
+        concurrency=arguments.concurrency,
+        backoff_base=0.1,
+        backoff_max=1.0,
+        kinds=[KIND],
+    )
+    try:
+        started = time.perf_counter()
+        batches = 0
+        while dispatcher.delivered + dispatcher.failed < arguments.notifications:
+            if await dispatcher.dispatch_batch():
+                batches += 1
+            else:
+                # Everything left is deferred by the rate limits or waiting for a retry
+                await asyncio.sleep(0.05)
+        elapsed = time.perf_counter() - started
+        print_report("dispatcher", {
+            "delivered": dispatcher.delivered,
+            "failed": dispatcher.failed,
+            "batches": batches,
+            "elapsed_s": elapsed,
+            "per_minute": dispatcher.delivered / elapsed * 60,
+        })
+    finally:
+        await cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--notifications", type=int, default=100_000)
+    parser.add_argument("--recipients", type=int, default=20_000)
+    parser.add_argument("--batch-size", type=int, default=1_000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake messenger latency in seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.01)
+    asyncio.run(main(parser.parse_args()))
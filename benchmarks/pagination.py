@@ -0,0 +1,56 @@
+"""Deep page latency of OFFSET paging versus keyset paging over `(created, id)` on a 5M-row table"""
+
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import text
+
+from app.core.session import async_engine
+
+PAGE_SIZE = 100
+
+
+async def main(rows: int, depths: list[int], repeats: int) -> None:
+    async with async_engine.connect() as connection:
+        await connection.execute(text("DROP TABLE IF EXISTS benchmark_page"))
+        await connection.execute(text(
+            "CREATE TABLE benchmark_page AS SELECT id, timestamp '2020-01-01' + id * interval '1 second' AS created, "
+            "md5(id::text) AS title FROM generate_series(1, :rows) AS id"
+        ), {"rows": rows})
+        await connection.execute(text("CREATE INDEX ON benchmark_page (created, id)"))
+        await connection.execute(text("ANALYZE benchmark_page"))
+        await connection.commit()
+
+        try:
+            for depth in depths:
+                offset = depth * PAGE_SIZE
+                created, row_id = (await connection.execute(text(
+                    "SELECT created, id FROM benchmark_page ORDER BY created, id OFFSET :offset LIMIT 1"
+                ), {"offset": offset - 1})).one()
+
+                timings = {}
+                for title, statement, parameters in (
+                        ("offset", "SELECT * FROM benchmark_page ORDER BY created, id OFFSET :offset LIMIT :limit",
+                         {"offset": offset, "limit": PAGE_SIZE}),
+                        ("keyset", "SELECT * FROM benchmark_page WHERE (created, id) > (:created, :id) "
+                                   "ORDER BY created, id LIMIT :limit",
+                         {"created": created, "id": row_id, "limit": PAGE_SIZE}),
+                ):
+                    started = time.perf_counter()
+                    for _ in range(repeats):
+                        (await connection.execute(text(statement), parameters)).all()
+                    timings[title] = (time.perf_counter() - started) / repeats * 1000
+                print(f"page={depth:<8} offset={timings['offset']:.2f}ms keyset={timings['keyset']:.2f}ms")
+        finally:
+            await connection.execute(text("DROP TABLE benchmark_page"))
+            await connection.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--depths", type=int, nargs="+", default=[1, 100, 1_000, 10_000, 49_000])
+    parser.add_argument("--repeats", type=int, default=10)
+    arguments = parser.parse_args()
+    asyncio.run(main(arguments.rows, arguments.depths, arguments.repeats))
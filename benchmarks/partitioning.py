@@ -0,0 +1,187 @@
+"""
+Index size and query latency of `inter_user_payment` before and after monthly partitioning with archival.
+
+Both layouts are built in a scratch schema from the same synthetic payments spread over the last months,
+most of the older ones completed: the unpartitioned table of the initial migrations, and the partitioned
+table with its archive after the maintenance job has archived completed payments older than the cutoff.
+The archived partitions are reindexed once, as they would look with archival running continuously.
+"""
+
+import argparse
+import asyncio
+import random
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.config.settings import settings
+from app.services.partitions import PartitionMaintainer, add_months, create_partition, month_of
+from benchmarks.utils import measure, print_report, summarize
+
+SCHEMA = "partitioning_benchmark"
+
+UNPARTITIONED = """
+CREATE TABLE unpartitioned (
+    id integer PRIMARY KEY,
+    created timestamp NOT NULL,
+    updated timestamp NOT NULL,
+    title varchar(255) NOT NULL,
+    from_user_id integer,
+    to_user_id integer,
+    payment_id integer,
+    reminder_id integer,
+    completed boolean NOT NULL
+);
+CREATE INDEX unpartitioned_id ON unpartitioned (id);
+CREATE INDEX unpartitioned_title ON unpartitioned (title);
+CREATE INDEX unpartitioned_from_user_id_id ON unpartitioned (from_user_id, id);
+CREATE INDEX unpartitioned_to_user_id_id ON unpartitioned (to_user_id, id);
+"""
+
+# Payments are spread evenly over the months, completed with a higher probability the older they are
+SEED = """
+INSERT INTO unpartitioned
+SELECT g, created, created, 'Payment ' || g % 1000, 1 + g % :users, 1 + (g * 7) % :users, g, 1 + g % :reminders,
+    random() < CASE
+        WHEN created < CAST(:cutoff AS timestamp) THEN CAST(:old_completed AS float)
+        ELSE CAST(:recent_completed AS float)
+    END
+FROM (
+    SELECT g, CAST(:start AS timestamp) + (CAST(:end AS timestamp) - CAST(:start AS timestamp)) * g / :payments
+        AS created
+    FROM generate_series(1, :payments) AS g
+) AS payments
+"""
+
+QUERIES = {
+    "open payments of a debtor": (
+        "SELECT * FROM {table} WHERE from_user_id = :user_id AND NOT completed ORDER BY id LIMIT 100"
+    ),
+    "payments of a debtor page": "SELECT * FROM {table} WHERE from_user_id = :user_id ORDER BY id LIMIT 100",
+    "open payments of reminders": (
+        "SELECT id FROM {table} WHERE reminder_id = ANY(:reminder_ids) AND NOT completed"
+    ),
+    "payment by id": "SELECT * FROM {table} WHERE id = :id",
+    "payments of a month": "SELECT count(*) FROM {table} WHERE created >= :month_start AND created < :month_end",
+}
+
+INDEX_SIZE = """
+SELECT coalesce(sum(pg_relation_size(pg_index.indexrelid)), 0)
+FROM pg_index
+WHERE pg_index.indrelid = CAST(:table AS regclass)
+    OR pg_index.indrelid IN (SELECT relid FROM pg_partition_tree(CAST(:table AS regclass)))
+"""
+
+
+async def build(engine: AsyncEngine, session_factory, arguments: argparse.Namespace) -> None:
+    now = datetime.utcnow()
+    start = datetime.combine(add_months(month_of(now), -arguments.months + 1), datetime.min.time())
+    maintainer = PartitionMaintainer(
+        archive_after_months=arguments.archive_after_months,
+        archive_batch_size=arguments.batch_size,
+        session_factory=session_factory,
+    )
+
+    async with session_factory() as session, session.begin():
+        await session.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await session.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        for statement in UNPARTITIONED.split(";"):
+            if statement.strip():
+                await session.execute(text(statement))
+        await session.execute(text(SEED), {
+            "users": arguments.users,
+            "reminders": arguments.payments // 4,
+            "payments": arguments.payments,
+            "start": start,
+            "end": now,
+            "cutoff": maintainer.archive_cutoff(now),
+            "old_completed": arguments.old_completed,
+            "recent_completed": arguments.recent_completed,
+        })
+
+        await session.execute(text(
+            "CREATE TABLE inter_user_payment (LIKE public.inter_user_payment INCLUDING DEFAULTS INCLUDING INDEXES) "
+            "PARTITION BY RANGE (created)"
+        ))
+        await session.execute(text("CREATE TABLE inter_user_payment_default PARTITION OF inter_user_payment DEFAULT"))
+        await session.execute(text(
+            "CREATE TABLE inter_user_payment_archive (LIKE public.inter_user_payment_archive INCLUDING ALL)"
+        ))
+        for offset in range(arguments.months):
+            await create_partition(session, add_months(month_of(start), offset))
+        await session.execute(text("INSERT INTO inter_user_payment SELECT * FROM unpartitioned"))
+
+    archived = await maintainer.archive_completed(now)
+    dropped = await maintainer.drop_empty_partitions(now)
+    print(f"archived {archived} completed payments, dropped {len(dropped)} empty partitions")
+
+    async with engine.connect() as connection:
+        # VACUUM cannot run inside a transaction block
+        connection = await connection.execution_options(isolation_level="AUTOCOMMIT")
+        await connection.execute(text("REINDEX TABLE inter_user_payment"))
+        for table in ("unpartitioned", "inter_user_payment", "inter_user_payment_archive"):
+            await connection.execute(text(f"VACUUM ANALYZE {table}"))
+
+
+async def report_sizes(session: AsyncSession) -> None:
+    sizes = {}
+    for table in ("unpartitioned", "inter_user_payment", "inter_user_payment_archive"):
+        sizes[table] = (await session.execute(text(INDEX_SIZE), {"table": table})).scalar() / 2 ** 20
+    print_report("index size MiB", {
+        "before": sizes["unpartitioned"],
+        "after": sizes["inter_user_payment"],
+        "archive": sizes["inter_user_payment_archive"],
+    })
+
+
+async def report_latency(session: AsyncSession, arguments: argparse.Namespace) -> None:
+    rng = random.Random(0)
+    month = add_months(month_of(datetime.utcnow()), -1)
+
+    def parameters() -> dict:
+        return {
+            "user_id": rng.randint(1, arguments.users),
+            "reminder_ids": [rng.randint(1, arguments.payments // 4) for _ in range(100)],
+            "id": rng.randint(1, arguments.payments),
+            "month_start": datetime.combine(month, datetime.min.time()),
+            "month_end": datetime.combine(add_months(month, 1), datetime.min.time()),
+        }
+
+    for name, query in QUERIES.items():
+        for layout, table in (("before", "unpartitioned"), ("after", "inter_user_payment")):
+            statement = text(query.format(table=table))
+            samples = await measure(lambda: session.execute(statement, parameters()), arguments.iterations)
+            print_report(f"{name} {layout}", summarize(samples))
+
+
+async def main(arguments: argparse.Namespace) -> None:
+    engine = create_async_engine(
+        settings.DATABASE_URI, connect_args={"server_settings": {"search_path": f"{SCHEMA}, public"}}
+    )
+    session_factory = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)  # type: ignore
+    try:
+        await build(engine, session_factory, arguments)
+        async with session_factory() as session:
+            await report_sizes(session)
+            await report_latency(session, arguments)
+    finally:
+        if not arguments.keep_data:
+            async with engine.begin() as connection:
+                await connection.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--payments", type=int, default=2_000_000)
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--months", type=int, default=24, help="Months the payments are spread over")
+    parser.add_argument("--archive-after-months", type=int, default=3)
+    parser.add_argument("--old-completed", type=float, default=0.95, help="Completed share before the cutoff")
+    parser.add_argument("--recent-completed", type=float, default=0.3, help="Completed share after the cutoff")
+    parser.add_argument("--batch-size", type=int, default=50_000, help="Archival batch size")
+    parser.add_argument("--iterations", type=int, default=200, help="Queries per case and layout")
+    parser.add_argument("--keep-data", action="store_true", help="Keep the scratch schema for inspection")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,133 @@
+"""
+Bulk payment import against row-by-row ORM inserts.
+
+A CSV of `--payments` records between seeded users is generated in memory, created over the last two years,
+with a small share of records which are invalid or reference unknown users. The import runs through
+`import_payment_stream` and is rolled back, so no rows are left behind. The ORM baseline adds a payment,
+a reminder and an inter-user payment per record for `--orm-payments` records, also rolled back.
+Partitions the import created are dropped again.
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+from typing import AsyncIterator
+
+from sqlalchemy import text
+
+from app.config.settings import settings
+from app.core.session import async_session
+from app.models import InterUserPayment, Payment, Reminder
+from app.services.export import EXPORT_FIELDS
+from app.services.partitions import PARENT, monthly_partitions
+from app.services.payment_import import import_payment_stream
+from benchmarks.load.seed import TITLE, USER_ID_OFFSET, cleanup, seed
+from benchmarks.utils import print_report
+
+USERS = 10_000
+CHUNK_SIZE = 1 << 20
+# Every thousandth record is invalid, every thousandth references an unknown user
+INVALID_EVERY = 1_000
+
+
+def generate_csv(payments: int) -> bytes:
+    now = datetime.utcnow()
+    phone_numbers = [f"+7916{number:07d}" for number in random.sample(range(10 ** 7), 500)]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for number in range(payments):
+        from_user_id = USER_ID_OFFSET + 1 + number % USERS
+        to_user_id = USER_ID_OFFSET + 1 + (number * 7 + 1) % USERS
+        if number % INVALID_EVERY == 1:
+            to_user_id = USER_ID_OFFSET + USERS + 1
+        created = now - timedelta(minutes=random.randrange(2 * 365 * 24 * 60))
+        writer.writerow((
+            number, TITLE, from_user_id, to_user_id, number % 3 == 0, created.isoformat(), created.isoformat(),
+            None, round(random.uniform(1, 1000), 2), "ZZZ" if number % INVALID_EVERY == 0 else "RUB",
+            TITLE, random.choice(phone_numbers) if number % 2 else "", "" if number % 2 else "4000000000000000",
+            None, (created + timedelta(days=30)).isoformat(), random.choice(("", "monthly", "weekly")),
+        ))
+    return buffer.getvalue().encode()
+
+
+async def stream(content: bytes) -> AsyncIterator[bytes]:
+    for offset in range(0, len(content), CHUNK_SIZE):
+        yield content[offset:offset + CHUNK_SIZE]
+
+
+async def import_csv(content: bytes, payments: int) -> None:
+    async with async_session() as session:
+        months = set(await monthly_partitions(session))
+        await session.rollback()
+        started = time.perf_counter()
+        try:
+            report = await import_payment_stream(session, stream(content), "csv", settings.PAYMENT_IMPORT_BATCH_SIZE)
+            elapsed = time.perf_counter() - started
+        finally:
+            await session.rollback()
+        print_report("import", {
+            "payments": payments,
+            "imported": report.imported,
+            "rejected": len(report.rejected),
+            "elapsed_s": elapsed,
+            "per_second": payments / elapsed,
+        })
+
+        async with session.begin():
+            for month, name in (await monthly_partitions(session)).items():
+                if month not in months:
+                    await session.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {name}"))
+                    await session.execute(text(f"DROP TABLE {name}"))
+
+
+async def import_orm(payments: int) -> None:
+    now = datetime.utcnow()
+    async with async_session() as session:
+        started = time.perf_counter()
+        try:
+            for number in range(payments):
+                payment = Payment(sum=100.0, bank=TITLE, currency="RUB", card_number="4000000000000000")
+                reminder = Reminder(remind_at=now, repeat="monthly")
+                session.add_all((payment, reminder))
+                await session.flush()
+                session.add(InterUserPayment(
+                    title=TITLE,
+                    from_user_id=USER_ID_OFFSET + 1 + number % USERS,
+                    to_user_id=USER_ID_OFFSET + 1 + (number + 1) % USERS,
+                    payment_id=payment.id,
+                    reminder_id=reminder.id,
+                ))
+                await session.flush()
+            elapsed = time.perf_counter() - started
+        finally:
+            await session.rollback()
+        print_report("orm", {
+            "payments": payments,
+            "elapsed_s": elapsed,
+            "per_second": payments / elapsed,
+            "extrapolated_1m_s": elapsed / payments * 1_000_000,
+        })
+
+
+async def main(arguments: argparse.Namespace) -> None:
+    logging.disable(logging.INFO)
+    content = generate_csv(arguments.payments)
+    data = await seed(users=USERS, payments=0)
+    try:
+        await import_orm(arguments.orm_payments)
+        await import_csv(content, arguments.payments)
+    finally:
+        await cleanup(data.token)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--payments", type=int, default=1_000_000, help="Records of the imported CSV")
+    parser.add_argument("--orm-payments", type=int, default=2_000, help="Records inserted row by row")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,39 @@
+"""Vectorized expansion of 1M reminders over a year-long window"""
+
+import argparse
+import time
+from datetime import datetime
+
+import numpy as np
+
+from app.services.recurrence import DAILY, MONTHLY, ONCE, WEEKLY, YEARLY, expand_occurrences
+
+
+def main(reminders: int, chunk_size: int) -> None:
+    rng = np.random.default_rng(42)
+    start, end = datetime(2024, 1, 1), datetime(2025, 1, 1)
+    remind_at = np.datetime64("2022-01-01", "us") + rng.integers(
+        0, 3 * 365 * 24 * 3600, size=reminders
+    ).astype("m8[s]").astype("m8[us]")
+    repeat = rng.choice(
+        np.array([ONCE, DAILY, WEEKLY, MONTHLY, YEARLY], dtype=np.int8), size=reminders, p=[0.2, 0.1, 0.2, 0.4, 0.1]
+    )
+
+    occurrences = 0
+    started = time.perf_counter()
+    for offset in range(0, reminders, chunk_size):
+        chunk = slice(offset, offset + chunk_size)
+        positions, _ = expand_occurrences(remind_at[chunk], repeat[chunk], start, end)
+        occurrences += len(positions)
+    elapsed = time.perf_counter() - started
+
+    print(f"reminders={reminders} occurrences={occurrences} chunk_size={chunk_size}")
+    print(f"elapsed={elapsed:.3f}s reminders/s={reminders / elapsed:,.0f} occurrences/s={occurrences / elapsed:,.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--reminders", type=int, default=1_000_000)
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    arguments = parser.parse_args()
+    main(arguments.reminders, arguments.chunk_size)
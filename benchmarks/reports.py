@@ -0,0 +1,144 @@
+"""
+Report latency as the payment history grows to `--payments` payments.
+
+The history is inserted in `--steps` steps inside one transaction which is rolled back at the end, every step
+adds a year of payments before the previous ones. The user whose reports are timed is the debtor of every
+`--share`th payment and the creditor of the next one, with `--counterparts` counterparts. After every step
+the reports are timed, the monthly one over the last twelve months, and so is converting every open payment
+of the user in Python.
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import or_, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app.core.session import async_engine
+from app.models import InterUserPayment, Payment
+from app.services.partitions import add_months, create_missing_partitions, month_of
+from app.services.reports import Converter, counterpart_report, monthly_report, user_report
+from benchmarks.load.seed import TITLE, USER_ID_OFFSET, cleanup, seed
+from benchmarks.utils import measure, print_report, summarize
+
+USERS = 10_000
+USER_ID = USER_ID_OFFSET + USERS + 1
+RATES = {
+    "RUB": Decimal(1), "USD": Decimal("92.5"), "EUR": Decimal("100.1"), "GBP": Decimal("117.3"), "JPY": Decimal("0.62"),
+}
+
+INSERT_PAYMENTS = """
+WITH payments AS (
+    INSERT INTO payment (sum, bank, currency)
+    SELECT round((1 + random() * 999)::numeric, 2), :title, (ARRAY['RUB', 'USD', 'EUR', 'GBP', 'JPY'])[1 + g % 5]
+    FROM generate_series(1, :payments) AS g
+    RETURNING id
+)
+INSERT INTO inter_user_payment (created, title, from_user_id, to_user_id, payment_id, completed)
+SELECT
+    CAST(:newest AS timestamp) - random() * interval '365 days',
+    :title,
+    CASE id % :share
+        WHEN 0 THEN :user_id
+        WHEN 1 THEN :offset + 1 + id / :share % :counterparts
+        ELSE :offset + 1 + id % :users
+    END,
+    CASE id % :share
+        WHEN 0 THEN :offset + 1 + id / :share % :counterparts
+        WHEN 1 THEN :user_id
+        ELSE :offset + 1 + (id * 7 + 3) % :users
+    END,
+    id,
+    id % 4 = 0
+FROM payments
+"""
+
+
+def report(title: str, samples: list[float]) -> None:
+    print_report(title, summarize(samples))
+
+
+async def convert_rows(session: AsyncSession) -> None:
+    """Every open payment of the user loaded and converted one by one"""
+    rows = await session.execute(
+        select(InterUserPayment.from_user_id, Payment.sum, Payment.currency)
+        .join(Payment, Payment.id == InterUserPayment.payment_id)
+        .where(
+            or_(InterUserPayment.from_user_id == USER_ID, InterUserPayment.to_user_id == USER_ID),
+            InterUserPayment.completed.is_(False),
+        )
+    )
+    owed = receivable = 0.0
+    for from_user_id, amount, currency in rows:
+        converted = amount * float(RATES[str(currency)])
+        if from_user_id == USER_ID:
+            owed += converted
+        else:
+            receivable += converted
+
+
+async def insert_year(connection: AsyncConnection, newest: datetime, payments: int, arguments) -> None:
+    await connection.execute(text(INSERT_PAYMENTS), {
+        "title": TITLE, "payments": payments, "newest": newest, "share": arguments.share,
+        "counterparts": arguments.counterparts, "user_id": USER_ID, "offset": USER_ID_OFFSET, "users": USERS,
+    })
+    await connection.execute(text("ANALYZE payment"))
+    await connection.execute(text("ANALYZE inter_user_payment"))
+    await connection.execute(text("ANALYZE user_balance"))
+
+
+async def main(arguments: argparse.Namespace) -> None:
+    logging.disable(logging.INFO)
+    data = await seed(users=USERS + 1, payments=0)
+    now = datetime.utcnow()
+    last_year = (add_months(month_of(now), -11), month_of(now))
+    try:
+        async with async_engine.connect() as connection:
+            transaction = await connection.begin()
+            try:
+                session = AsyncSession(bind=connection)
+                first = add_months(month_of(now), -12 * arguments.steps)
+                await create_missing_partitions(
+                    session, [add_months(first, offset) for offset in range(12 * arguments.steps + 1)]
+                )
+
+                for step in range(arguments.steps):
+                    started = time.perf_counter()
+                    payments = arguments.payments // arguments.steps
+                    await insert_year(connection, now - timedelta(days=365 * step), payments, arguments)
+                    print_report(f"history {step + 1}y", {
+                        "payments": payments * (step + 1), "insert_s": time.perf_counter() - started,
+                    })
+
+                    for exact in (False, True):
+                        converter = Converter(RATES, "RUB", exact)
+                        mode = "exact" if exact else "float"
+                        report(f"  user {mode}", await measure(
+                            lambda: user_report(session, USER_ID, converter), arguments.iterations
+                        ))
+                        report(f"  counterpart {mode}", await measure(
+                            lambda: counterpart_report(session, USER_ID, converter), arguments.iterations
+                        ))
+                        report(f"  month {mode}", await measure(
+                            lambda: monthly_report(session, USER_ID, *last_year, False, converter),
+                            arguments.iterations,
+                        ))
+                    report("  convert rows", await measure(lambda: convert_rows(session), 3))
+            finally:
+                await transaction.rollback()
+    finally:
+        await cleanup(data.token)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--payments", type=int, default=10_000_000, help="Payments of the whole history")
+    parser.add_argument("--steps", type=int, default=5, help="Years the history is inserted in")
+    parser.add_argument("--share", type=int, default=100, help="The user is debtor and creditor of every share")
+    parser.add_argument("--counterparts", type=int, default=50, help="Counterparts of the user")
+    parser.add_argument("--iterations", type=int, default=20, help="Reports per case")
+    asyncio.run(main(parser.parse_args()))
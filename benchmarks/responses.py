@@ -0,0 +1,90 @@
+"""
+Throughput of 1000-row list responses with FastAPI's serialization and with the fast responses of
+`app/api/responses.py`: first the serialization of a page of rows alone, then whole requests of the list endpoints.
+"""
+
+import argparse
+import asyncio
+import logging
+
+import httpx
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import select
+
+from app.api.responses import FastJSONResponse, serializer
+from app.config.settings import settings
+from app.core.session import async_session
+from app.main import app
+from app.models import InterUserPayment, User
+from app.schemas.base import PageSchema
+from app.schemas.payment import InterUserPaymentSchema
+from app.schemas.user import UserSchema
+from benchmarks.load.seed import cleanup, seed
+from benchmarks.utils import measure, print_report, summarize
+
+ROWS = 1000
+
+URLS = (
+    f"/user?limit={ROWS}",
+    f"/inter-user-payment?limit={ROWS}",
+    f"/inter-user-payment?limit={ROWS}&expand=from_user,to_user,payment,reminder",
+)
+
+
+def report(title: str, samples: list[float]) -> None:
+    print_report(title, {"per_second": len(samples) / sum(samples), **summarize(samples)})
+
+
+async def serialization(iterations: int) -> None:
+    async with async_session() as session:
+        pages = {
+            UserSchema: (await session.execute(select(User).limit(ROWS))).scalars().all(),
+            InterUserPaymentSchema: (await session.execute(select(InterUserPayment).limit(ROWS))).scalars().all(),
+        }
+
+    for schema, rows in pages.items():
+        page_schema = PageSchema[schema]  # type: ignore
+        field = create_response_field(name=f"Response_{schema.__name__}", type_=page_schema)
+        content = {"items": rows, "next_cursor": None}
+
+        async def default():
+            JSONResponse(await serialize_response(field=field, response_content=content)).render(None)
+
+        async def fast():
+            FastJSONResponse(serializer(page_schema)(content))
+
+        for name, func in (("default", default), ("fast", fast)):
+            report(f"serialize {schema.__name__} {name}", await measure(func, iterations))
+
+
+async def requests(client: httpx.AsyncClient, iterations: int) -> None:
+    for url in URLS:
+        for enabled in (False, True):
+            settings.FAST_RESPONSES_ENABLED = enabled
+            response = await client.get(url)
+            if response.status_code != 200 or len(response.json()["items"]) != ROWS:
+                raise SystemExit(f"GET {url} returned {response.status_code} without {ROWS} items")
+            report(f"GET {url} {'fast' if enabled else 'default'}", await measure(lambda: client.get(url), iterations))
+
+
+async def main(iterations: int) -> None:
+    logging.disable(logging.INFO)
+    data = await seed(users=ROWS, payments=ROWS)
+    try:
+        await serialization(iterations)
+        async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app),  # type: ignore
+                base_url="http://localhost",
+                headers={"Authorization": f"Bearer {data.token}"},
+        ) as client:
+            await requests(client, iterations)
+    finally:
+        await cleanup(data.token)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=50, help="Responses per case")
+    asyncio.run(main(parser.parse_args().iterations))
@@ -0,0 +1,135 @@
+"""
+Latency of the search queries on `--payments` inter-user payment titles, first as plain `ILIKE` scans over the
+B-tree indexes, then through the `pg_trgm` GIN indexes with ranking and keyset paging like the search endpoints.
+
+The payments are inserted between seeded users, every tenth of them for one heavy user, inside a transaction
+which is rolled back at the end, so neither the rows nor the rebuilt indexes are left behind.
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+from sqlalchemy import or_, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app.api.pagination import paginate_ranked
+from app.config.settings import settings
+from app.core.session import async_engine
+from app.models import InterUserPayment, User
+from app.services.search import (
+    contains_pattern,
+    configure_search,
+    payment_search_statement,
+    user_search_statement,
+)
+from benchmarks.load.seed import USER_ID_OFFSET, cleanup, seed
+from benchmarks.utils import measure, print_report, summarize
+
+USERS = 10_000
+PAGE_SIZE = 20
+HEAVY_USER_ID = USER_ID_OFFSET + 1
+LIGHT_USER_ID = USER_ID_OFFSET + 2
+
+TRIGRAM_INDEXES = tuple(
+    index for table in (InterUserPayment.__table__, User.__table__) for index in table.indexes
+    if index.name.endswith("_trgm")
+)
+
+INSERT_PAYMENTS = """
+INSERT INTO inter_user_payment (title, from_user_id, to_user_id, completed)
+SELECT
+    (ARRAY['Rent', 'Dinner', 'Taxi', 'Groceries', 'Concert tickets', 'Internet', 'Gym', 'Birthday gift'])[1 + g % 8]
+        || ' ' || (ARRAY['January', 'February', 'March', 'April', 'May', 'June'])[1 + g / 8 % 6]
+        || ' #' || g,
+    CASE WHEN g % 10 = 0 THEN :heavy ELSE :offset + 1 + g % :users END,
+    :offset + 1 + (g * 7 + 1) % :users,
+    false
+FROM generate_series(1, :payments) AS g
+"""
+
+QUERIES = (
+    ("word", "groceries"),
+    ("prefix", "concer"),
+    ("substring", "#12345"),
+    ("typo", "grocerise"),
+)
+
+
+def report(title: str, samples: list[float]) -> None:
+    print_report(title, summarize(samples))
+
+
+async def ilike_baseline(connection: AsyncConnection, iterations: int) -> None:
+    for user_id, user in ((HEAVY_USER_ID, "heavy"), (LIGHT_USER_ID, "light")):
+        for name, query in QUERIES:
+            statement = select(InterUserPayment).where(
+                or_(InterUserPayment.from_user_id == user_id, InterUserPayment.to_user_id == user_id),
+                InterUserPayment.title.ilike(contains_pattern(query), escape="\\"),
+            ).order_by(InterUserPayment.id.desc()).limit(PAGE_SIZE)
+            report(f"ilike {user} {name}", await measure(lambda: connection.execute(statement), iterations))
+
+    statement = select(User).where(User.username.ilike(contains_pattern("test_42"))).limit(PAGE_SIZE)
+    report("ilike user", await measure(lambda: connection.execute(statement), iterations))
+
+
+async def trigram_search(session: AsyncSession, iterations: int) -> None:
+    await configure_search(session, settings.SEARCH_SIMILARITY_THRESHOLD)
+    for user_id, user in ((HEAVY_USER_ID, "heavy"), (LIGHT_USER_ID, "light")):
+        for name, query in QUERIES:
+            statement, rank = payment_search_statement(user_id, query)
+            page = await paginate_ranked(session, statement, rank, InterUserPayment.id, PAGE_SIZE)
+            report(f"trgm {user} {name}", await measure(
+                lambda: paginate_ranked(session, statement, rank, InterUserPayment.id, PAGE_SIZE),
+                iterations,
+            ))
+            if page["next_cursor"]:
+                cursor = page["next_cursor"]
+                report(f"trgm {user} {name} page 2", await measure(
+                    lambda: paginate_ranked(session, statement, rank, InterUserPayment.id, PAGE_SIZE, cursor),
+                    iterations,
+                ))
+
+    statement, rank = user_search_statement("test_42")
+    report("trgm user", await measure(
+        lambda: paginate_ranked(session, statement, rank, User.id, PAGE_SIZE), iterations
+    ))
+
+
+async def main(arguments: argparse.Namespace) -> None:
+    logging.disable(logging.INFO)
+    data = await seed(users=USERS, payments=0)
+    try:
+        async with async_engine.connect() as connection:
+            transaction = await connection.begin()
+            try:
+                for index in TRIGRAM_INDEXES:
+                    await connection.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+                started = time.perf_counter()
+                await connection.execute(text(INSERT_PAYMENTS), {
+                    "heavy": HEAVY_USER_ID, "offset": USER_ID_OFFSET, "users": USERS, "payments": arguments.payments,
+                })
+                await connection.execute(text("ANALYZE inter_user_payment"))
+                print_report("insert", {"payments": arguments.payments, "elapsed_s": time.perf_counter() - started})
+                await ilike_baseline(connection, arguments.iterations)
+
+                for index in TRIGRAM_INDEXES:
+                    started = time.perf_counter()
+                    await connection.run_sync(index.create)
+                    print_report(f"create {index.name}", {"elapsed_s": time.perf_counter() - started})
+                await connection.execute(text("ANALYZE inter_user_payment"))
+                await connection.execute(text("ANALYZE \"user\""))
+                async with AsyncSession(bind=connection) as session:
+                    await trigram_search(session, arguments.iterations)
+            finally:
+                await transaction.rollback()
+    finally:
+        await cleanup(data.token)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--payments", type=int, default=10_000_000, help="Inter-user payments searched")
+    parser.add_argument("--iterations", type=int, default=20, help="Queries per case")
+    asyncio.run(main(parser.parse_args()))
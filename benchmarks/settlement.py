@@ -0,0 +1,47 @@
+"""
+Debt simplification: latency of the greedy settlement for 10k users with 1M open debts and of the exact one
+for 12 users. The exact settlement is checked against brute force in `app/tests/test_settlement.py`.
+"""
+
+import argparse
+import random
+import time
+
+from app.services.settlement import net_balances, settle_exactly, settle_greedily
+
+
+def random_debts(rng: random.Random, users: int, debts: int, max_amount: int) -> list[tuple[int, int, int]]:
+    result = []
+    for _ in range(debts):
+        from_user_id, to_user_id = rng.sample(range(users), 2)
+        result.append((from_user_id, to_user_id, rng.randint(1, max_amount)))
+    return result
+
+
+def benchmark(users: int, debts: int, rng: random.Random) -> None:
+    edges = random_debts(rng, users, debts, 1_000_000)
+
+    started = time.perf_counter()
+    balances = net_balances(edges)
+    netted = time.perf_counter()
+    transfers = settle_greedily(balances)
+    settled = time.perf_counter()
+
+    print(
+        f"users={users} debts={debts} transfers={len(transfers)} "
+        f"net={(netted - started) * 1000:.1f}ms greedy={(settled - netted) * 1000:.1f}ms"
+    )
+
+    small = dict(list(net_balances(random_debts(rng, 12, 40, 1_000)).items()))
+    started = time.perf_counter()
+    transfers = settle_exactly(small)
+    print(f"exact users={len(small)} transfers={len(transfers)} elapsed={(time.perf_counter() - started) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--debts", type=int, default=1_000_000)
+    arguments = parser.parse_args()
+
+    benchmark(arguments.users, arguments.debts, random.Random(42))
@@ -0,0 +1,67 @@
+"""
+Thundering herd on a single user: bursts of concurrent `GET /user/{id}` with the same bearer token,
+each burst starting with an empty token cache, with single-flight reads disabled and enabled.
+Reports SQL statements per burst and the request latency over all bursts.
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+import httpx
+
+from app.api.deps import authentication_token_cache
+from app.config.settings import settings
+from app.core.session import async_engine, replica_set
+from app.core.singleflight import entity_reads
+from app.main import app
+from benchmarks.load.seed import cleanup, seed
+from benchmarks.utils import StatementCounter, print_report, summarize
+
+
+async def burst(client: httpx.AsyncClient, url: str, size: int) -> list[float]:
+    async def request() -> float:
+        started = time.perf_counter()
+        response = await client.get(url)
+        if response.status_code != 200:
+            raise SystemExit(f"GET {url} failed with {response.status_code}: {response.text}")
+        return time.perf_counter() - started
+
+    return list(await asyncio.gather(*(request() for _ in range(size))))
+
+
+async def main(size: int, bursts: int) -> None:
+    logging.disable(logging.INFO)
+
+    data = await seed(users=2, payments=0)
+    url = f"/user/{data.user_id(0)}"
+    try:
+        async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app),  # type: ignore
+                base_url="http://localhost",
+                headers={"Authorization": f"Bearer {data.token}"},
+        ) as client:
+            await burst(client, url, 1)
+            for enabled in (False, True):
+                settings.SINGLE_FLIGHT_ENABLED = enabled
+                samples, statements = [], 0
+                for _ in range(bursts):
+                    authentication_token_cache.clear()
+                    with StatementCounter([async_engine, *replica_set.engines]) as counter:
+                        samples += await burst(client, url, size)
+                    statements += counter.count
+                print_report(f"single-flight={'on' if enabled else 'off'}", {
+                    "statements_per_burst": statements / bursts, **summarize(samples),
+                })
+            print_report("single-flight stats", entity_reads.stats())
+    finally:
+        await cleanup(data.token)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=500, help="Concurrent requests per burst")
+    parser.add_argument("--bursts", type=int, default=20)
+    arguments = parser.parse_args()
+    asyncio.run(main(arguments.size, arguments.bursts))
@@ -0,0 +1,100 @@
+"""
+Startup cost of a fresh worker process: import of `app.main`, the warm-up phase and the first requests.
+Every sample runs in a new interpreter, so nothing is shared between them besides the database.
+The requests are authenticated with a token and a user seeded for the run, so they measure the successful path.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+import uuid
+
+from sqlalchemy import text
+
+from app.core.session import async_session
+from benchmarks.utils import USER_ID_RANGES, print_report
+
+USER_ID = USER_ID_RANGES["startup"] + 1
+
+PROBE = """
+import asyncio, json, logging, sys, time
+started = time.perf_counter()
+from app.main import app
+imported = time.perf_counter() - started
+logging.disable(logging.INFO)
+
+import httpx
+from app.core.warmup import warm_up
+
+
+async def main():
+    timings = {"import": imported}
+    if sys.argv[1] == "warm":
+        started = time.perf_counter()
+        await warm_up(app)
+        timings["warm_up"] = time.perf_counter() - started
+    paths = [f"/user/{sys.argv[3]}", f"/user/{sys.argv[3]}", "/inter-user-payment?limit=10", "/openapi.json"]
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://localhost") as client:
+        for number, path in enumerate(paths):
+            started = time.perf_counter()
+            response = await client.get(path, headers={"Authorization": f"Bearer {sys.argv[2]}"})
+            timings[f"request_{number} {path}"] = time.perf_counter() - started
+            assert response.status_code == 200, (path, response.status_code)
+    print(json.dumps(timings))
+
+asyncio.run(main())
+"""
+
+
+def probe(warm: bool, token: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE, "warm" if warm else "cold", token, str(USER_ID)],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+async def seed() -> str:
+    async with async_session() as session:
+        await session.execute(text(
+            "INSERT INTO \"user\" (id, full_name, language) VALUES (:id, 'Startup Benchmark', 'en')"
+        ), {"id": USER_ID})
+        token = str(uuid.uuid4())
+        await session.execute(text("INSERT INTO auth_token (id, title) VALUES (:id, 'startup')"), {"id": token})
+        await session.commit()
+    return token
+
+
+async def cleanup(token: str) -> None:
+    async with async_session() as session:
+        await session.execute(text("DELETE FROM auth_token WHERE id = :id"), {"id": token})
+        await session.execute(text("DELETE FROM \"user\" WHERE id = :id"), {"id": USER_ID})
+        await session.commit()
+
+
+async def main(samples: int) -> None:
+    token = await seed()
+    try:
+        report(samples, token)
+    finally:
+        await cleanup(token)
+
+
+def report(samples: int, token: str) -> None:
+    for warm in (False, True):
+        runs = [probe(warm, token) for _ in range(samples)]
+        for phase in runs[0]:
+            values = [run[phase] for run in runs]
+            print_report(f"warm={'on' if warm else 'off'} {phase}", {
+                "median_ms": statistics.median(values) * 1000,
+                "max_ms": max(values) * 1000,
+            })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--samples", type=int, default=10)
+    asyncio.run(main(parser.parse_args().samples))
@@ -0,0 +1,43 @@
+"""Bulk user upsert throughput: initial insert, update of every row and a no-op re-sync"""
+
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+from sqlalchemy import delete
+
+from app.config.settings import settings
+from app.core.session import async_session
+from app.models import User
+from app.schemas.user import UserSchema
+from app.services.user import bulk_upsert_users
+from benchmarks.utils import USER_ID_RANGE_SIZE, USER_ID_RANGES
+
+FIRST_ID = USER_ID_RANGES["user_bulk_upsert"] + 1
+
+
+async def main(users: int) -> None:
+    ids = range(FIRST_ID, FIRST_ID + users)
+    rounds = (
+        ("insert", [UserSchema(id=i, full_name=f"User {i}", username=f"user{i}") for i in ids]),
+        ("update", [UserSchema(id=i, full_name=f"Renamed {i}", username=f"user{i}") for i in ids]),
+        ("unchanged", [UserSchema(id=i, full_name=f"Renamed {i}", username=f"user{i}") for i in ids]),
+    )
+    async with async_session() as session:
+        try:
+            for title, records in rounds:
+                started = time.perf_counter()
+                statuses = await bulk_upsert_users(session, records, chunk_size=settings.USER_BULK_UPSERT_CHUNK_SIZE)
+                await session.commit()
+                elapsed = time.perf_counter() - started
+                print(f"{title:<10} users={users} elapsed={elapsed:.3f}s statuses={dict(Counter(statuses.values()))}")
+        finally:
+            await session.execute(delete(User).where(User.id >= FIRST_ID, User.id < FIRST_ID + USER_ID_RANGE_SIZE))
+            await session.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=10_000)
+    asyncio.run(main(parser.parse_args().users))
@@ -0,0 +1,69 @@
+import statistics
+import time
+from typing import Awaitable, Callable
+
+from sqlalchemy import event
+
+# Users of every benchmark have ids in a reserved range of their own, `start + 1` to `start + USER_ID_RANGE_SIZE`,
+# above the ids of real users. Benchmarks delete only users within their own range.
+USER_ID_RANGE_SIZE = 10_000_000
+USER_ID_RANGES = {
+    "load": 2_000_000_000,
+    "load_created": 2_010_000_000,
+    "user_bulk_upsert": 2_020_000_000,
+    "export": 2_030_000_000,
+    "notifications": 2_040_000_000,
+    "startup": 2_050_000_000,
+}
+
+
+def percentile(samples: list[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize(samples: list[float]) -> dict:
+    return {
+        "count": len(samples),
+        "mean_ms": statistics.fmean(samples) * 1000 if samples else 0.0,
+        "p50_ms": percentile(samples, 0.50) * 1000,
+        "p95_ms": percentile(samples, 0.95) * 1000,
+        "p99_ms": percentile(samples, 0.99) * 1000,
+    }
+
+
+async def measure(func: Callable[[], Awaitable], iterations: int) -> list[float]:
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def print_report(title: str, report: dict) -> None:
+    print(f"{title:<32} " + " ".join(
+        f"{key}={value:.3f}" if isinstance(value, float) else f"{key}={value}" for key, value in report.items()
+    ))
+
+
+class StatementCounter:
+    """Counts the statements sent to the databases of the given engines while the block runs"""
+
+    def __init__(self, engines):
+        self.engines = engines
+        self.count = 0
+
+    def _count(self, *args) -> None:
+        self.count += 1
+
+    def __enter__(self) -> "StatementCounter":
+        for engine in self.engines:
+            event.listen(engine.sync_engine, "before_cursor_execute", self._count)
+        return self
+
+    def __exit__(self, *args) -> None:
+        for engine in self.engines:
+            event.remove(engine.sync_engine, "before_cursor_execute", self._count)